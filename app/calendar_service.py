@@ -1,12 +1,88 @@
+import asyncio
+import functools
+import importlib
 import logging
-import caldav
+import threading
+import time
 import pytz
 import datetime
-from typing import List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from app.event_cache import EventCache
+from app.metrics import caldav_timer
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
+# Default size of the thread pool that runs blocking CalDAV requests
+DEFAULT_CALDAV_MAX_WORKERS = 4
+# How long (seconds) discovered principal/calendars are reused before rediscovery
+DEFAULT_CALDAV_DISCOVERY_TTL = 3600
+# Maximum number of hrefs requested in one calendar-multiget REPORT
+MULTIGET_BATCH_SIZE = 50
+# Summary prefixes that mark a treatment appointment
+DEFAULT_APPOINTMENT_PREFIXES = ("טיפול", "tipul")
+# iCalendar properties that make an event recurring
+RECURRENCE_PROPERTIES = ("rrule", "rdate", "exdate", "exrule")
+
+
+class _LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+    caldav pulls in lxml, vobject and icalendar, which is only worth paying for
+    once a calendar is actually queried, not at application startup.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(importlib.import_module(self._name), attr)
+
+
+caldav = _LazyModule("caldav")
+cdav = _LazyModule("caldav.elements.cdav")
+dav = _LazyModule("caldav.elements.dav")
+caldav_error = _LazyModule("caldav.lib.error")
+caldav_url = _LazyModule("caldav.lib.url")
+
+
+@functools.lru_cache(maxsize=None)
+def _ctag_element():
+    """The CalendarServer CTag property element (defined on first use, as caldav is lazy)."""
+    from caldav.elements.base import ValuedBaseElement
+
+    class GetCTag(ValuedBaseElement):
+        """CalendarServer CTag property: changes whenever anything in the calendar changes."""
+        tag = "{http://calendarserver.org/ns/}getctag"
+
+    return GetCTag
+
+
+class CalendarFetchError(Exception):
+    """
+    A strict fetch could not search every calendar (discovery or a calendar search failed).
+    `appointments` holds what was found in the calendars that could be searched.
+    """
+
+    def __init__(self, errors: List[str], appointments: List[Tuple]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+        self.appointments = appointments
+
+
+class Appointment(NamedTuple):
+    """
+    A treatment appointment found in the calendar.
+    The first three fields match the (summary, description, start_time) tuples
+    returned by get_tomorrow_appointments(); `start` is the full localized start.
+    """
+    summary: str
+    description: str
+    start_time: str
+    start: Optional[datetime.datetime] = None
+
 class CalendarService:
     """
     Handles interaction with a CalDAV server to fetch appointments for tomorrow.
@@ -16,70 +92,480 @@ class CalendarService:
         """
         :param config: An object that provides CALENDAR_URL, CALENDAR_USERNAME, 
                        CALENDAR_PASSWORD, TIMEZONE, etc.
+                       Optional CALDAV_MAX_WORKERS bounds the CalDAV thread pool,
+                       CALDAV_DISCOVERY_TTL sets how long calendar discovery is cached and
+                       CALENDAR_ALLOWLIST limits queries to calendars with those names or URLs.
+                       CALDAV_EVENT_CACHE enables the incremental event cache, persisted to
+                       CALDAV_EVENT_CACHE_PATH when set.
+                       APPOINTMENT_PREFIXES lists the summary prefixes of treatment events.
+                       CALDAV_SUMMARY_FILTER (default on) sends one SUMMARY-filtered query per
+                       prefix; off sends a single unfiltered query per calendar.
         """
         self.calendar_url = config.CALENDAR_URL
         self.username = config.CALENDAR_USERNAME
         self.password = config.CALENDAR_PASSWORD
         self.timezone = pytz.timezone(config.TIMEZONE)
+        self.max_workers = getattr(config, "CALDAV_MAX_WORKERS", DEFAULT_CALDAV_MAX_WORKERS)
+        self.discovery_ttl = getattr(config, "CALDAV_DISCOVERY_TTL", DEFAULT_CALDAV_DISCOVERY_TTL)
+        allowlist = getattr(config, "CALENDAR_ALLOWLIST", None) or []
+        if isinstance(allowlist, str):
+            allowlist = allowlist.split(",")
+        self.calendar_allowlist = [entry.strip() for entry in allowlist if entry.strip()]
+        prefixes = getattr(config, "APPOINTMENT_PREFIXES", None) or DEFAULT_APPOINTMENT_PREFIXES
+        if isinstance(prefixes, str):
+            prefixes = prefixes.split(",")
+        self.appointment_prefixes = tuple(p.strip().lower() for p in prefixes if p.strip())
+        self.summary_filter = getattr(config, "CALDAV_SUMMARY_FILTER", True)
+        # Calendars whose server rejected a SUMMARY text-match filter
+        self._text_match_unsupported = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # Persistent CalDAV session and cached discovery results
+        self._client = None
+        self._principal = None
+        self._calendars: Optional[List[Any]] = None
+        self._discovered_at = 0.0
+        self._discovery_lock = threading.Lock()
+
+        # Local event cache for incremental sync (optional)
+        self.event_cache: Optional[EventCache] = None
+        if getattr(config, "CALDAV_EVENT_CACHE", False):
+            self.event_cache = EventCache(getattr(config, "CALDAV_EVENT_CACHE_PATH", None) or None)
 
     def get_tomorrow_appointments(self) -> List[Tuple[str, str, str]]:
         """
         Fetch tomorrow's appointments from all calendars under the configured principal.
         Returns a list of tuples: (summary, description, start_time_string).
 
-        Only returns events whose summary starts with "טיפול" or "tipul".
+        Only returns events whose summary starts with one of APPOINTMENT_PREFIXES
+        (by default "טיפול" or "tipul").
+        This call blocks; from async code use fetch_tomorrow_appointments().
 
         :return: List[ (summary, description, start_time) ] 
                  Where start_time is a string in "HH:MM" format
         """
+        appointments = [tuple(a[:3]) for a in self.get_appointments(*self.get_tomorrow_time())]
+        if not appointments:
+            logger.debug("No appointments found for tomorrow.")
+        return appointments
+
+    def get_appointments(self, start: datetime.datetime, end: datetime.datetime) -> Iterator[Appointment]:
+        """
+        Yield appointments between start and end, calendar by calendar, as they are parsed.
+
+        Works for any window (e.g. a full week for a Sunday preview) without building
+        the whole result in memory. A calendar that fails is logged and skipped.
+        This call blocks; from async code use stream_appointments().
+
+        :param start: Localized window start.
+        :param end: Localized window end.
+        """
+        try:
+            calendars = self._get_calendars()
+        except Exception as e:
+            logger.error(f"Error retrieving appointments: {e}")
+            self._invalidate_after_error(e)
+            return
+
+        try:
+            for calendar in calendars:
+                try:
+                    yield from self._iter_calendar(calendar, start, end)
+                except Exception as e:
+                    logger.error(f"Error searching calendar {getattr(calendar, 'name', calendar)}: {e}")
+                    # The calendar may have been moved or deleted; rediscover next time
+                    self._invalidate_after_error(e)
+        finally:
+            self._save_event_cache()
+
+    async def fetch_tomorrow_appointments(self, with_start: bool = False, strict: bool = False) -> List[Tuple]:
+        """
+        Async version of get_tomorrow_appointments().
+
+        :param with_start: Return Appointment tuples, which also carry the full start datetime.
+        :param strict: Raise CalendarFetchError if discovery or any calendar search failed,
+                       instead of returning what could be found (possibly nothing).
+        :return: List[ (summary, description, start_time) ], or List[Appointment] if with_start
+        """
+        start, end = self.get_tomorrow_time()
+        errors: List[str] = []
+        appointments = [a if with_start else tuple(a[:3])
+                        async for a in self.stream_appointments(start, end, errors=errors)]
+        if errors and strict:
+            raise CalendarFetchError(errors, appointments)
+        if not appointments:
+            logger.debug("No appointments found for tomorrow.")
+        return appointments
+
+    async def stream_appointments(self, start: datetime.datetime, end: datetime.datetime,
+                                  errors: Optional[List[str]] = None) -> AsyncIterator[Appointment]:
+        """
+        Async version of get_appointments().
+
+        The blocking CalDAV requests run on a dedicated, bounded thread pool so the
+        event loop stays responsive, and every calendar is searched at the same time.
+        Appointments are yielded in calendar order as soon as each calendar is done.
+        A calendar that fails is logged and skipped.
+
+        :param errors: Optional list that failed discovery and calendar searches are appended to.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            calendars = await loop.run_in_executor(executor, self._get_calendars)
+        except Exception as e:
+            logger.error(f"Error retrieving appointments: {e}")
+            self._invalidate_after_error(e)
+            if errors is not None:
+                errors.append(f"calendar discovery failed: {e}")
+            return
+
+        searches = [
+            loop.run_in_executor(executor, self._search_calendar, calendar, start, end)
+            for calendar in calendars
+        ]
         try:
-            client = caldav.DAVClient(
+            for calendar, search in zip(calendars, searches):
+                try:
+                    appointments = await search
+                except Exception as e:
+                    logger.error(f"Error searching calendar {getattr(calendar, 'name', calendar)}: {e}")
+                    # The calendar may have been moved or deleted; rediscover next time
+                    self._invalidate_after_error(e)
+                    if errors is not None:
+                        errors.append(f"calendar {getattr(calendar, 'name', calendar)} failed: {e}")
+                    continue
+                for appointment in appointments:
+                    yield appointment
+        finally:
+            # The consumer may stop early; don't leave searches running
+            for search in searches:
+                search.cancel()
+            await loop.run_in_executor(executor, self._save_event_cache)
+
+    async def warm_up(self) -> int:
+        """
+        Import caldav and discover the calendars ahead of the first fetch.
+
+        :return: Number of calendars found.
+        """
+        loop = asyncio.get_running_loop()
+        calendars = await loop.run_in_executor(self._get_executor(), self._get_calendars)
+        return len(calendars)
+
+    def invalidate_discovery(self, reset_session: bool = False) -> None:
+        """
+        Forget the cached principal and calendar list so the next fetch rediscovers them.
+
+        :param reset_session: Also drop the authenticated CalDAV session.
+        """
+        with self._discovery_lock:
+            self._principal = None
+            self._calendars = None
+            self._discovered_at = 0.0
+            if reset_session:
+                self._client = None
+
+    def _invalidate_after_error(self, error: Exception) -> None:
+        """
+        Rediscover after a failed request. Authentication and connection errors also
+        drop the CalDAV session, so the next fetch logs in again on a fresh connection.
+        """
+        session_error = isinstance(error, (caldav_error.AuthorizationError, OSError))
+        self.invalidate_discovery(reset_session=session_error)
+
+    def shutdown(self) -> None:
+        """
+        Stop the CalDAV thread pool (called on application shutdown).
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="caldav"
+            )
+        return self._executor
+
+    def _get_client(self):
+        """
+        Return the persistent CalDAV client, creating it on first use.
+        The client keeps one authenticated HTTP session for all requests.
+        """
+        if self._client is None:
+            self._client = caldav.DAVClient(
                 url=self.calendar_url,
                 username=self.username,
                 password=self.password
             )
-            principal = client.principal()
-            calendars = principal.calendars()
+        return self._client
 
-            tomorrow_start, tomorrow_end = self.get_tomorrow_time()
-            appointments = []
+    def _get_calendars(self) -> List[Any]:
+        """
+        List the calendars to search, reusing the cached discovery while it is fresh.
+        """
+        with self._discovery_lock:
+            now = time.monotonic()
+            if self._calendars is not None and now - self._discovered_at < self.discovery_ttl:
+                return self._calendars
 
-            for calendar in calendars:
-                events = calendar.date_search(start=tomorrow_start, end=tomorrow_end)
-                if events is None:
-                    continue
+            with caldav_timer("*", "discovery"):
+                client = self._get_client()
+                if self._principal is None:
+                    self._principal = client.principal()
+                calendars = self._filter_calendars(self._principal.calendars())
+
+            self._calendars = calendars
+            self._discovered_at = now
+            logger.debug(f"Discovered {len(calendars)} calendars")
+            return calendars
+
+    def _filter_calendars(self, calendars: Iterable[Any]) -> List[Any]:
+        """
+        Keep only calendars whose name or URL is in CALENDAR_ALLOWLIST (all if it is empty).
+        """
+        calendars = list(calendars)
+        if not self.calendar_allowlist:
+            return calendars
+
+        allowed = {entry.rstrip("/").casefold() for entry in self.calendar_allowlist}
+        selected = []
+        for calendar in calendars:
+            name = (getattr(calendar, "name", None) or "").casefold()
+            url = getattr(calendar, "url", None)
+            candidates = {name}
+            if url is not None:
+                candidates.add(str(url).rstrip("/").casefold())
+                path = getattr(url, "path", None)
+                if path:
+                    candidates.add(path.rstrip("/").casefold())
+            if candidates & allowed:
+                selected.append(calendar)
+        return selected
+
+    def _search_calendar(self, calendar, start: datetime.datetime,
+                         end: datetime.datetime) -> List[Appointment]:
+        """
+        Search a single calendar for appointments between start and end.
+        """
+        with caldav_timer(getattr(calendar, "name", None) or str(calendar.url), "search"):
+            return list(self._iter_calendar(calendar, start, end))
+
+    def _iter_calendar(self, calendar, start: datetime.datetime,
+                       end: datetime.datetime) -> Iterator[Appointment]:
+        """
+        Yield the appointments of a single calendar, parsing events one at a time.
+        """
+        if self.event_cache is not None:
+            yield from self._iter_calendar_cached(calendar, start, end)
+            return
+
+        for event in self._search_events(calendar, start, end):
+            try:
+                self._expand_recurrence(event, start, end)
+                appointments = self._extract_appointments(event)
+            except Exception as e:
+                logger.warning(f"Skipping unreadable event {getattr(event, 'url', event)}: {e}")
+                continue
+            yield from appointments
+
+    def _search_events(self, calendar, start: datetime.datetime, end: datetime.datetime) -> List[Any]:
+        """
+        Fetch the events in the window whose SUMMARY matches an appointment prefix.
+        The server does the filtering; events matched by several prefixes are returned once.
+        """
+        data = cdav.CalendarData() + cdav.Expand(start, end)
+        results = self._run_window_queries(
+            calendar, start, end, data,
+            lambda query: calendar.search(xml=query, comp_class=caldav.Event) or [],
+        )
+        events, seen = [], set()
+        for result in results:
+            for event in result:
+                url = str(event.url)
+                if url not in seen:
+                    seen.add(url)
+                    events.append(event)
+        return events
+
+    def _run_window_queries(self, calendar, start: datetime.datetime, end: datetime.datetime, prop, run) -> List[Any]:
+        """
+        Call run(query) with one calendar-query per appointment prefix and return the results.
+
+        Each query pushes a SUMMARY text-match into the REPORT so the server only returns
+        likely appointments. If the server rejects the filter, the calendar is remembered
+        and searched with a single unfiltered query; _extract_appointments still checks
+        the prefix on the client in both cases.
+
+        The filter trades round trips for payload: with N prefixes it costs N REPORTs per
+        calendar instead of one. On calendars with few non-treatment events and a slow
+        server the single unfiltered query is faster; CALDAV_SUMMARY_FILTER=false selects it.
+        """
+        calendar_url = str(calendar.url)
+        if self.summary_filter and self.appointment_prefixes and calendar_url not in self._text_match_unsupported:
+            try:
+                return [run(self._build_window_query(start, end, prop, prefix)) for prefix in self.appointment_prefixes]
+            except caldav_error.ReportError as e:
+                logger.warning(f"Calendar {getattr(calendar, 'name', calendar_url)} rejected SUMMARY filter, "
+                               f"falling back to unfiltered search: {e}")
+                self._text_match_unsupported.add(calendar_url)
+        return [run(self._build_window_query(start, end, prop))]
+
+    @staticmethod
+    def _build_window_query(start: datetime.datetime, end: datetime.datetime, prop,
+                            summary_prefix: Optional[str] = None):
+        """
+        Build a calendar-query for VEVENTs in [start, end], optionally with a
+        case-insensitive SUMMARY text-match.
+        """
+        vevent = cdav.CompFilter("VEVENT") + cdav.TimeRange(start, end)
+        if summary_prefix:
+            vevent += cdav.PropFilter("SUMMARY") + cdav.TextMatch(summary_prefix, collation="i;ascii-casemap")
+        return cdav.CalendarQuery() + [
+            dav.Prop() + prop,
+            cdav.Filter() + (cdav.CompFilter("VCALENDAR") + vevent),
+        ]
+
+    @staticmethod
+    def _expand_recurrence(event, start: datetime.datetime, end: datetime.datetime) -> None:
+        """
+        Expand a recurring event into its occurrences in the window (client side),
+        as caldav's date_search does when the server did not expand it.
+        """
+        component = event.icalendar_component
+        if component is not None and any(k in component for k in RECURRENCE_PROPERTIES):
+            event.expand_rrule(start, end)
+
+    def _iter_calendar_cached(self, calendar, start: datetime.datetime,
+                              end: datetime.datetime) -> Iterator[Appointment]:
+        """
+        Incremental version of _iter_calendar backed by the event cache.
+
+        1. One Depth:0 PROPFIND reads the calendar's sync-token/CTag. If it is unchanged
+           and this window was seen before, the cached events are used as-is.
+        2. Otherwise a calendar-query asks only for the etags in the window, and
+           calendar-multiget downloads just the events whose etag changed.
+        """
+        calendar_url = str(calendar.url.canonical())
+        window_key = f"{start.isoformat()}/{end.isoformat()}/{','.join(self.appointment_prefixes)}"
+        token = self._get_collection_token(calendar)
 
-                for event in events:
-                    # Some CalDAV servers attach the raw data under event.instance
-                    # If "instance" is present, use .vevent for summary/description
-                    if hasattr(event, "instance"):
-                        vevent = event.instance.vevent
-                        summary = getattr(vevent.summary, "value", "")
-                        description = getattr(vevent.description, "value", "")
-                        dtstart = vevent.dtstart.value.astimezone(self.timezone)
-                    else:
-                        # Fallback: some servers store summary/description top-level
-                        summary = getattr(event, "summary", "") or ""
-                        description = getattr(event, "description", "") or ""
-                        # dtstart may not be accessible this way depending on the CalDAV server
-                        dtstart = None  
-
-                    # Build a readable time string if dtstart is available
-                    start_time_str = ""
-                    if dtstart:
-                        start_time_str = f"{dtstart.hour}:{dtstart.minute:02d}"
-
-                    # Filter: only if summary starts with טיפול / tipul
-                    if summary.lower().startswith("טיפול") or summary.lower().startswith("tipul"):
-                        appointments.append((summary, description, start_time_str))
-
-            if not appointments:
-                logger.debug("No appointments found for tomorrow.")
-            return appointments
+        cached = self.event_cache.get_window(calendar_url, window_key, token)
+        if cached is None:
+            etags = self._list_etags(calendar, start, end)
+            stale = self.event_cache.stale_hrefs(calendar_url, etags)
+            fetched = self._multiget(calendar, stale) if stale else {}
+            cached = self.event_cache.store_window(calendar_url, window_key, token, etags, fetched)
+            logger.debug(f"Calendar {getattr(calendar, 'name', calendar_url)}: "
+                         f"{len(etags)} events in window, {len(fetched)} downloaded")
 
+        for href, data in cached:
+            try:
+                event = caldav.Event(calendar.client, url=href, data=data, parent=calendar)
+                self._expand_recurrence(event, start, end)
+                appointments = self._extract_appointments(event)
+            except Exception as e:
+                logger.warning(f"Skipping unreadable cached event {href}: {e}")
+                continue
+            yield from appointments
+
+    def _get_collection_token(self, calendar) -> Optional[str]:
+        """
+        Read the calendar's change marker: DAV:sync-token, or the CalendarServer CTag.
+        Returns None if the server offers neither.
+        """
+        try:
+            get_ctag = _ctag_element()
+            props = calendar.get_properties([dav.SyncToken(), get_ctag()])
         except Exception as e:
-            logger.error(f"Error retrieving appointments: {e}")
-            return []
+            logger.debug(f"Could not read sync-token/CTag for {calendar.url}: {e}")
+            return None
+        return props.get(dav.SyncToken.tag) or props.get(get_ctag.tag) or None
+
+    def _list_etags(self, calendar, start: datetime.datetime, end: datetime.datetime) -> Dict[str, str]:
+        """
+        calendar-query REPORT(s) for the time window returning only hrefs and etags.
+        """
+        responses = self._run_window_queries(
+            calendar, start, end, dav.GetEtag(),
+            lambda query: calendar._query(query, 1, "report").expand_simple_props([dav.GetEtag()]),
+        )
+
+        etags = {}
+        calendar_url = calendar.url.canonical()
+        for results in responses:
+            for href, props in results.items():
+                url = calendar.url.join(caldav_url.URL.objectify(href))
+                # iCloud also lists the calendar collection itself
+                if url.canonical() == calendar_url:
+                    continue
+                etags[str(url.canonical())] = props.get(dav.GetEtag.tag)
+        return etags
+
+    def _multiget(self, calendar, hrefs: List[str]) -> Dict[str, str]:
+        """
+        Download the iCalendar data of the given hrefs with calendar-multiget REPORTs.
+        """
+        fetched = {}
+        for i in range(0, len(hrefs), MULTIGET_BATCH_SIZE):
+            batch = [caldav_url.URL.objectify(href) for href in hrefs[i:i + MULTIGET_BATCH_SIZE]]
+            for event in calendar.calendar_multiget(batch):
+                fetched[str(event.url.canonical())] = event.data
+        return fetched
+
+    def _save_event_cache(self) -> None:
+        if self.event_cache is not None:
+            self.event_cache.save()
+
+    def _extract_appointments(self, event) -> List[Appointment]:
+        """
+        Convert a CalDAV event into Appointments (summary, description, start_time, start),
+        one per VEVENT: an expanded recurring event holds one VEVENT per occurrence.
+        VEVENTs that are not treatment appointments or have no start time (all-day
+        events) are left out.
+        """
+        # Some CalDAV servers attach the raw data under event.instance
+        # If "instance" is present, use its VEVENTs for summary/description
+        if not hasattr(event, "instance"):
+            # Fallback: some servers store summary/description top-level;
+            # dtstart may not be accessible this way depending on the CalDAV server
+            appointment = self._build_appointment(
+                getattr(event, "summary", "") or "", getattr(event, "description", "") or "", None
+            )
+            return [appointment] if appointment else []
+
+        appointments = []
+        for vevent in event.instance.vevent_list:
+            summary = getattr(getattr(vevent, "summary", None), "value", "") or ""
+            description = getattr(getattr(vevent, "description", None), "value", "") or ""
+            dtstart = getattr(getattr(vevent, "dtstart", None), "value", None)
+            if not isinstance(dtstart, datetime.datetime):
+                # All-day events (DTSTART;VALUE=DATE) and events without DTSTART have no time to remind about
+                if summary.lower().startswith(self.appointment_prefixes):
+                    logger.warning(f"Skipping appointment {summary} without a start time")
+                continue
+            appointment = self._build_appointment(summary, description, dtstart.astimezone(self.timezone))
+            if appointment:
+                appointments.append(appointment)
+        return appointments
+
+    def _build_appointment(self, summary: str, description: str,
+                           dtstart: Optional[datetime.datetime]) -> Optional[Appointment]:
+        """
+        An Appointment if the summary starts with an appointment prefix, else None.
+        """
+        # Build a readable time string if dtstart is available
+        start_time_str = ""
+        if dtstart:
+            start_time_str = f"{dtstart.hour}:{dtstart.minute:02d}"
+
+        # Filter: only if summary starts with an appointment prefix (טיפול / tipul).
+        # Kept on the client for servers that ignore the SUMMARY text-match.
+        if summary.lower().startswith(self.appointment_prefixes):
+            return Appointment(summary, description, start_time_str, dtstart)
+        return None
 
     def get_tomorrow_time(self) -> Tuple[datetime.datetime, datetime.datetime]:
         """
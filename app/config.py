@@ -12,4 +12,63 @@ MY_PHONE_NUMBER = os.getenv('MY_PHONE_NUMBER')
 REMINDER_BODY = os.getenv('REMINDER_BODY', '').replace('\\n', '\n')
 TIMEZONE = 'Asia/Jerusalem'
 WA_ADAPTER_URL = os.getenv("WA_ADAPTER_URL")
-WA_SHARED_SECRET = os.getenv("WA_SHARED_SECRET")
\ No newline at end of file
+WA_SHARED_SECRET = os.getenv("WA_SHARED_SECRET")
+
+# WhatsApp adapter HTTP connection pool
+WA_HTTP_MAX_CONNECTIONS = int(os.getenv("WA_HTTP_MAX_CONNECTIONS", "10"))
+WA_HTTP_MAX_KEEPALIVE = int(os.getenv("WA_HTTP_MAX_KEEPALIVE", "5"))
+WA_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("WA_HTTP_KEEPALIVE_EXPIRY", "30"))
+WA_HTTP2 = os.getenv("WA_HTTP2", "false").lower() == "true"
+
+# Outbox for outbound WhatsApp messages (rate limited, retried, persisted in MongoDB)
+WA_OUTBOX = os.getenv("WA_OUTBOX", "false").lower() == "true"
+WA_OUTBOX_RATE = float(os.getenv("WA_OUTBOX_RATE", "1"))
+WA_OUTBOX_BURST = int(os.getenv("WA_OUTBOX_BURST", "5"))
+WA_OUTBOX_MAX_ATTEMPTS = int(os.getenv("WA_OUTBOX_MAX_ATTEMPTS", "6"))
+WA_OUTBOX_BASE_DELAY = float(os.getenv("WA_OUTBOX_BASE_DELAY", "2"))
+WA_OUTBOX_MAX_DELAY = float(os.getenv("WA_OUTBOX_MAX_DELAY", "300"))
+
+# Daily check
+DAILY_CHECK_CONCURRENCY = int(os.getenv("DAILY_CHECK_CONCURRENCY", "5"))
+# In-process scheduler (instead of an outside caller hitting POST /run-check)
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "false").lower() == "true"
+DAILY_CHECK_TIME = os.getenv("DAILY_CHECK_TIME", "20:00")
+PREFETCH_MINUTES = int(os.getenv("PREFETCH_MINUTES", "10"))
+
+# Pending confirmations expire this many seconds after they were created
+PENDING_TTL_SECONDS = int(os.getenv("PENDING_TTL_SECONDS", "172800"))
+# The in-memory cache is only correct with one worker process (see WEB_CONCURRENCY)
+PENDING_CACHE = os.getenv("PENDING_CACHE", "false").lower() == "true"
+PENDING_CACHE_MAX_ENTRIES = int(os.getenv("PENDING_CACHE_MAX_ENTRIES", "1000"))
+# Number of server worker processes (also read by uvicorn/gunicorn for --workers)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+# Inbound webhook: background workers and queue size per worker
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "4"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "100"))
+WEBHOOK_DRAIN_TIMEOUT = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", "10"))
+# Inbound message IDs remembered to drop redeliveries
+WEBHOOK_DEDUP_TTL = int(os.getenv("WEBHOOK_DEDUP_TTL", "86400"))
+WEBHOOK_DEDUP_MAX_ENTRIES = int(os.getenv("WEBHOOK_DEDUP_MAX_ENTRIES", "10000"))
+WEBHOOK_DEDUP_MONGO = os.getenv("WEBHOOK_DEDUP_MONGO", "true").lower() == "true"
+
+# CalDAV
+CALDAV_MAX_WORKERS = int(os.getenv("CALDAV_MAX_WORKERS", "4"))
+CALDAV_DISCOVERY_TTL = int(os.getenv("CALDAV_DISCOVERY_TTL", "3600"))
+CALENDAR_ALLOWLIST = [c.strip() for c in os.getenv("CALENDAR_ALLOWLIST", "").split(",") if c.strip()]
+CALDAV_EVENT_CACHE = os.getenv("CALDAV_EVENT_CACHE", "false").lower() == "true"
+CALDAV_EVENT_CACHE_PATH = os.getenv("CALDAV_EVENT_CACHE_PATH")
+APPOINTMENT_PREFIXES = [p.strip() for p in os.getenv("APPOINTMENT_PREFIXES", "טיפול,tipul").split(",") if p.strip()]
+# One SUMMARY-filtered REPORT per prefix (less payload) or one unfiltered REPORT (fewer round trips)
+CALDAV_SUMMARY_FILTER = os.getenv("CALDAV_SUMMARY_FILTER", "true").lower() == "true"
+
+# On-demand request profiling (requires the `pyinstrument` package)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILING_MAX_PROFILES = int(os.getenv("PROFILING_MAX_PROFILES", "10"))
+PROFILING_INTERVAL = float(os.getenv("PROFILING_INTERVAL", "0.001"))
+
+# Startup: run the warm-up (indexes, migrations, cache loading) in the background
+# instead of before serving, and optionally discover CalDAV calendars during it
+STARTUP_BACKGROUND_WARMUP = os.getenv("STARTUP_BACKGROUND_WARMUP", "false").lower() == "true"
+CALDAV_WARMUP = os.getenv("CALDAV_WARMUP", "false").lower() == "true"
@@ -0,0 +1,160 @@
+"""
+ConfirmationCache keeps pending confirmations in memory.
+Used by PendingConfirmationManager as a write-through cache so webhook lookups
+can be answered without reading from MongoDB.
+"""
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on cached confirmations
+DEFAULT_MAX_ENTRIES = 1000
+
+
+class ConfirmationCache:
+    """
+    In-memory copy of the pending_confirmations collection, keyed by confirmation key
+    and indexed by operator and by "HH:MM" time.
+
+    The cache only answers lookups while it is "complete", i.e. it holds every pending
+    confirmation: after warm() loaded the whole collection and as long as no entry had
+    to be evicted because of the size cap. Otherwise callers fall back to MongoDB.
+
+    The cache only sees writes made through its own process, so it is meant for a
+    single worker process (PENDING_CACHE is ignored when WEB_CONCURRENCY > 1).
+
+    Entries expire `ttl_seconds` after their `created_at`, matching the collection's
+    TTL index, so expired rows disappear from the cache when MongoDB deletes them.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        :param ttl_seconds: Lifetime of an entry after its created_at.
+        :param max_entries: Maximum number of cached confirmations.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.complete = False
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._expires: Dict[str, float] = {}
+        self._by_operator: Dict[Optional[str], Set[str]] = {}
+        self._by_time: Dict[Optional[str], Set[str]] = {}
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "warmups": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ---------- Updates ----------
+
+    def warm(self, docs: Iterable[Dict[str, Any]]) -> None:
+        """
+        Replace the cache content with the full list of pending confirmations.
+        """
+        self.clear()
+        docs = list(docs)
+        for doc in docs:
+            self.put(doc)
+        # Complete unless the size cap forced evictions while loading
+        self.complete = len(self._entries) == len(docs)
+        self.stats["warmups"] += 1
+        logger.info(f"Confirmation cache warmed with {len(self._entries)} entries (complete={self.complete})")
+
+    def put(self, doc: Dict[str, Any]) -> None:
+        """
+        Add or replace one confirmation (must contain "key").
+        """
+        key = doc["key"]
+        self.remove(key)
+        self._entries[key] = doc
+        self._expires[key] = self._expiry(doc.get("created_at"))
+        self._by_operator.setdefault(doc.get("operator"), set()).add(key)
+        self._by_time.setdefault(doc.get("time_hhmm"), set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self.remove(oldest)
+            self.stats["evictions"] += 1
+            # Some pending confirmation is no longer cached; stop answering lookups
+            self.complete = False
+
+    def remove(self, key: str) -> None:
+        """
+        Forget one confirmation (no-op if it is not cached).
+        """
+        doc = self._entries.pop(key, None)
+        self._expires.pop(key, None)
+        if doc is None:
+            return
+        for index, value in ((self._by_operator, doc.get("operator")), (self._by_time, doc.get("time_hhmm"))):
+            keys = index.get(value)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[value]
+
+    def clear(self) -> None:
+        """
+        Drop everything and mark the cache incomplete.
+        """
+        self._entries.clear()
+        self._expires.clear()
+        self._by_operator.clear()
+        self._by_time.clear()
+        self.complete = False
+
+    # ---------- Lookups ----------
+
+    def find(self, operator: Optional[str] = None, time_hhmm: Optional[str] = None,
+             date_bucket: Optional[str] = None,
+             from_date_bucket: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Pending confirmations matching the filters (same semantics as
+        PendingConfirmationManager.find_pending), ordered by day and time.
+
+        :return: Matching documents, or None when the cache cannot answer.
+        """
+        if not self.complete:
+            self.stats["misses"] += 1
+            return None
+        self._expire()
+
+        keys: Optional[Set[str]] = None
+        if operator:
+            keys = self._by_operator.get(operator, set()) | self._by_operator.get(None, set())
+        if time_hhmm:
+            time_keys = self._by_time.get(time_hhmm, set())
+            keys = time_keys if keys is None else keys & time_keys
+        if keys is None:
+            keys = set(self._entries)
+
+        docs = [self._entries[k] for k in keys]
+        if date_bucket:
+            docs = [d for d in docs if d.get("date_bucket") == date_bucket]
+        elif from_date_bucket:
+            docs = [d for d in docs if not d.get("date_bucket") or d["date_bucket"] >= from_date_bucket]
+        docs.sort(key=lambda d: (d.get("date_bucket") or "", d.get("time_hhmm") or "", d["key"]))
+        self.stats["hits"] += 1
+        return [{k: v for k, v in d.items() if k not in ("created_at", "operator")} for d in docs]
+
+    def _expiry(self, created_at: Optional[datetime]) -> float:
+        """
+        Monotonic deadline of an entry created at `created_at`.
+        """
+        age = 0.0
+        if isinstance(created_at, datetime):
+            if created_at.tzinfo is None:
+                created_at = created_at.replace(tzinfo=timezone.utc)
+            age = max(0.0, (datetime.now(timezone.utc) - created_at).total_seconds())
+        return time.monotonic() + self.ttl_seconds - age
+
+    def _expire(self) -> None:
+        """
+        Drop entries whose TTL has passed.
+        """
+        now = time.monotonic()
+        for key in [k for k, deadline in self._expires.items() if deadline <= now]:
+            self.remove(key)
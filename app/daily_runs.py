@@ -0,0 +1,102 @@
+"""
+DailyRunStore records which days' daily checks have completed, and which
+appointments of an unfinished day were already sent to the operator.
+Used by ReminderBot so a repeated trigger for the same day is a cheap no-op
+and a retry only sends what is still missing.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Set
+
+from pymongo import IndexModel
+
+logger = logging.getLogger(__name__)
+
+# Completion markers are kept this long, then removed by a TTL index
+MARKER_RETENTION_SECONDS = 30 * 24 * 3600
+
+
+class DailyRunStore:
+    """
+    One document per appointment day in the `daily_runs` collection:
+      {_id: "YYYY-MM-DD", completed_at, total, processed, skipped, failed}
+    and, for days with a partial run, one in the `daily_run_progress` collection:
+      {_id: "YYYY-MM-DD", prompted: [confirmation keys], updated_at}
+    Without a database both are kept in memory only.
+    """
+
+    def __init__(self, db=None):
+        """
+        :param db: Optional database object holding the `daily_runs` collection.
+        """
+        self.collection = db.daily_runs if db is not None else None
+        self.progress = db.daily_run_progress if db is not None else None
+        self._memory: Dict[str, Dict[str, Any]] = {}
+        self._prompted: Dict[str, Set[str]] = {}
+
+    async def ensure_indexes(self) -> None:
+        """
+        Create the TTL indexes that expire old markers and progress (idempotent).
+        """
+        if self.collection is not None:
+            await self.collection.create_indexes([
+                IndexModel([("completed_at", 1)], name="completed_at_ttl",
+                           expireAfterSeconds=MARKER_RETENTION_SECONDS),
+            ])
+            await self.progress.create_indexes([
+                IndexModel([("updated_at", 1)], name="updated_at_ttl",
+                           expireAfterSeconds=MARKER_RETENTION_SECONDS),
+            ])
+
+    async def get(self, day: str) -> Optional[Dict[str, Any]]:
+        """
+        The completion marker of a day, or None if that day's check has not completed.
+        """
+        if day in self._memory:
+            return self._memory[day]
+        if self.collection is None:
+            return None
+        marker = await self.collection.find_one({"_id": day})
+        if marker:
+            self._memory[day] = marker
+        return marker
+
+    async def mark_completed(self, day: str, summary: Dict[str, Any]) -> None:
+        """
+        Record that the check for `day` completed, with its counts.
+        """
+        marker = {
+            "_id": day,
+            "completed_at": datetime.now(timezone.utc),
+            **{k: summary.get(k) for k in ("total", "processed", "skipped", "failed")},
+        }
+        self._memory[day] = marker
+        if self.collection is not None:
+            await self.collection.replace_one({"_id": day}, marker, upsert=True)
+        logger.info(f"Daily check for {day} marked as completed")
+
+    async def get_prompted(self, day: str) -> Set[str]:
+        """
+        Confirmation keys of `day` whose approval request was already sent to the operator.
+        """
+        if self.progress is None:
+            return set(self._prompted.get(day, ()))
+        doc = await self.progress.find_one({"_id": day}, {"_id": 0, "prompted": 1})
+        return set((doc or {}).get("prompted", ()))
+
+    async def add_prompted(self, day: str, keys: Iterable[str]) -> None:
+        """
+        Record that the approval requests for `keys` of `day` were sent (one write).
+        """
+        keys = sorted(set(keys))
+        if not keys:
+            return
+        self._prompted.setdefault(day, set()).update(keys)
+        if self.progress is not None:
+            await self.progress.update_one(
+                {"_id": day},
+                {"$addToSet": {"prompted": {"$each": keys}},
+                 "$set": {"updated_at": datetime.now(timezone.utc)}},
+                upsert=True,
+            )
+        logger.info(f"Recorded {len(keys)} sent approval requests for {day}")
@@ -0,0 +1,148 @@
+"""
+EventCache keeps a local copy of CalDAV calendar objects between runs.
+Used by CalendarService to fetch only events that changed since the last check.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# How many query windows (e.g. days) to remember per calendar
+DEFAULT_MAX_WINDOWS = 14
+
+
+class EventCache:
+    """
+    Local cache of calendar objects, keyed by calendar URL and event href.
+
+    For every calendar it stores:
+      - "windows": for each searched time window, the hrefs that matched it and the
+        collection sync-token/CTag seen when that window was refreshed
+      - "events": href -> {"etag", "data"} with the raw iCalendar data
+
+    When a path is given the cache is persisted as JSON, so it survives restarts.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_windows: int = DEFAULT_MAX_WINDOWS):
+        """
+        :param path: Optional JSON file used to persist the cache. In-memory only if None.
+        :param max_windows: How many time windows to keep per calendar.
+        """
+        self.path = path
+        self.max_windows = max(1, max_windows)
+        self._calendars: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.stats = {"window_hits": 0, "window_misses": 0, "events_fetched": 0, "events_reused": 0}
+        self.load()
+
+    # ---------- Persistence ----------
+
+    def load(self) -> None:
+        """Load the cache from disk (if a path is configured and the file exists)."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._calendars = data.get("calendars", {})
+            logger.info(f"Loaded event cache for {len(self._calendars)} calendars from {self.path}")
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable event cache {self.path}: {e}")
+            self._calendars = {}
+
+    def save(self) -> None:
+        """Write the cache to disk atomically, if it changed since the last save."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps({"calendars": self._calendars}, ensure_ascii=False)
+            self._dirty = False
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".event-cache-")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error saving event cache to {self.path}: {e}")
+
+    # ---------- Lookups ----------
+
+    def get_window(self, calendar_url: str, window_key: str, token: Optional[str]) -> Optional[List[Tuple[str, str]]]:
+        """
+        Return [(href, data), ...] for a window if the calendar is unchanged since it was cached.
+
+        :param token: Current sync-token/CTag of the calendar. None means the server
+                      offers no change marker, so the window is never served blindly.
+        :return: Cached events, or None when the window must be refreshed from the server.
+        """
+        with self._lock:
+            calendar = self._calendars.get(calendar_url, {})
+            window = calendar.get("windows", {}).get(window_key)
+            if (token is None or window is None or window["token"] != token
+                    or any(href not in calendar["events"] for href in window["hrefs"])):
+                self.stats["window_misses"] += 1
+                return None
+            self.stats["window_hits"] += 1
+            return [(href, calendar["events"][href]["data"]) for href in window["hrefs"]]
+
+    def stale_hrefs(self, calendar_url: str, etags: Dict[str, str]) -> List[str]:
+        """
+        Return hrefs whose etag differs from the cached copy (or that are not cached).
+        """
+        with self._lock:
+            events = self._calendars.get(calendar_url, {}).get("events", {})
+            return [href for href, etag in etags.items() if href not in events or events[href]["etag"] != etag]
+
+    # ---------- Updates ----------
+
+    def store_window(self, calendar_url: str, window_key: str, token: Optional[str],
+                     etags: Dict[str, str], fetched: Dict[str, str]) -> List[Tuple[str, str]]:
+        """
+        Record the result of a refreshed window and return its [(href, data), ...].
+
+        :param etags: href -> etag for every object the server listed in the window.
+        :param fetched: href -> iCalendar data for the objects that were (re)downloaded.
+        """
+        with self._lock:
+            calendar = self._calendars.setdefault(calendar_url, {"windows": {}, "events": {}})
+            events = calendar["events"]
+            for href, data in fetched.items():
+                events[href] = {"etag": etags.get(href), "data": data}
+            self.stats["events_fetched"] += len(fetched)
+            self.stats["events_reused"] += len(etags) - len(fetched)
+
+            hrefs = [href for href in etags if href in events]
+            windows = calendar["windows"]
+            windows.pop(window_key, None)
+            windows[window_key] = {"token": token, "hrefs": hrefs}
+            while len(windows) > self.max_windows:
+                windows.pop(next(iter(windows)))
+
+            # Drop events no remembered window refers to
+            referenced = {href for window in windows.values() for href in window["hrefs"]}
+            for href in [h for h in events if h not in referenced]:
+                del events[href]
+
+            self._dirty = True
+            return [(href, events[href]["data"]) for href in hrefs]
+
+    def invalidate(self, calendar_urls: Optional[Iterable[str]] = None) -> None:
+        """
+        Forget cached data for the given calendars (or for all calendars).
+        """
+        with self._lock:
+            if calendar_urls is None:
+                self._calendars = {}
+            else:
+                for url in calendar_urls:
+                    self._calendars.pop(url, None)
+            self._dirty = True
@@ -0,0 +1,98 @@
+"""
+InboundDeduplicator remembers the WhatsApp message IDs the webhook already handled.
+Baileys may redeliver messages after a reconnect; duplicates are dropped before any other work.
+"""
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from pymongo import IndexModel
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 24 * 3600
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class InboundDeduplicator:
+    """
+    Bounded, TTL'd set of seen message IDs.
+
+    The in-memory set answers repeats seen by this process. When a database is given,
+    IDs are also recorded in the `inbound_messages` collection (the ID is the `_id`,
+    so the insert itself is the atomic check), which covers several workers and restarts.
+    """
+
+    def __init__(self, db=None, ttl_seconds: int = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        :param db: Optional database object for the shared `inbound_messages` collection.
+        :param ttl_seconds: How long an ID is remembered.
+        :param max_entries: Maximum number of IDs kept in memory.
+        """
+        self.collection = db.inbound_messages if db is not None else None
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self.stats = {"new": 0, "duplicates": 0}
+
+    async def ensure_indexes(self) -> None:
+        """
+        Create the TTL index that expires remembered IDs (idempotent).
+        """
+        if self.collection is not None:
+            await self.collection.create_indexes([
+                IndexModel([("seen_at", 1)], name="seen_at_ttl", expireAfterSeconds=self.ttl_seconds),
+            ])
+
+    async def seen(self, message_id: str) -> bool:
+        """
+        Record a message ID.
+
+        :return: True if the ID was already seen (the message is a duplicate).
+        """
+        now = time.monotonic()
+        self._expire(now)
+        if message_id in self._seen:
+            self.stats["duplicates"] += 1
+            return True
+
+        self._remember(message_id, now)
+        if self.collection is not None:
+            try:
+                await self.collection.insert_one({"_id": message_id, "seen_at": datetime.now(timezone.utc)})
+            except DuplicateKeyError:
+                self.stats["duplicates"] += 1
+                return True
+            except Exception as e:
+                # Fail open: better to process a rare duplicate than to drop a reply
+                logger.error(f"Error recording inbound message {message_id}: {e}")
+        self.stats["new"] += 1
+        return False
+
+    async def forget(self, message_id: str) -> None:
+        """
+        Forget an ID whose message could not be accepted, so a redelivery is processed.
+        """
+        self._seen.pop(message_id, None)
+        if self.collection is not None:
+            try:
+                await self.collection.delete_one({"_id": message_id})
+            except Exception as e:
+                logger.error(f"Error forgetting inbound message {message_id}: {e}")
+
+    def _remember(self, message_id: str, now: float) -> None:
+        """Add an ID, evicting the oldest ones above the size cap."""
+        self._seen[message_id] = now + self.ttl_seconds
+        while len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+
+    def _expire(self, now: float) -> None:
+        """Drop expired IDs (insertion order is expiry order)."""
+        while self._seen:
+            message_id, expires = next(iter(self._seen.items()))
+            if expires > now:
+                break
+            del self._seen[message_id]
@@ -1,9 +1,21 @@
+import logging
+
 from motor.motor_asyncio import AsyncIOMotorClient
 from app import config
 from app.calendar_service import CalendarService
-from app.whatsapp_messaging_service import WhatsappMessagingService
+from app.whatsapp_messaging_service import WhatsappMessagingService, _to_msisdn
 from app.pending_confirmation_manager import PendingConfirmationManager
+from app.confirmation_cache import ConfirmationCache
 from app.reminder_bot import ReminderBot
+from app.webhook_dispatcher import WebhookDispatcher
+from app.outbox import Outbox
+from app.inbound_dedup import InboundDeduplicator
+from app.scheduler import DailyScheduler
+from app.job_manager import JobManager
+from app.daily_runs import DailyRunStore
+from app.routers.webhook import process_reply
+
+logger = logging.getLogger(__name__)
 
 def initialize_services():
     """
@@ -18,14 +30,80 @@ def initialize_services():
 
     calendar_service = CalendarService(config)
     messaging_service = WhatsappMessagingService(config)
-    confirmation_manager = PendingConfirmationManager(db)
-    bot = ReminderBot(calendar_service, messaging_service, confirmation_manager)
+    outbox = None
+    if getattr(config, "WA_OUTBOX", False):
+        outbox = Outbox(
+            db,
+            messaging_service.send_text,
+            rate=getattr(config, "WA_OUTBOX_RATE", 1.0),
+            burst=getattr(config, "WA_OUTBOX_BURST", 5),
+            max_attempts=getattr(config, "WA_OUTBOX_MAX_ATTEMPTS", 6),
+            base_delay=getattr(config, "WA_OUTBOX_BASE_DELAY", 2.0),
+            max_delay=getattr(config, "WA_OUTBOX_MAX_DELAY", 300.0),
+        )
+        messaging_service.outbox = outbox
+    operator = getattr(config, "MY_PHONE_NUMBER", None)
+    pending_ttl = getattr(config, "PENDING_TTL_SECONDS", 2 * 24 * 3600)
+    confirmation_cache = None
+    web_concurrency = getattr(config, "WEB_CONCURRENCY", 1)
+    if getattr(config, "PENDING_CACHE", False) and web_concurrency > 1:
+        # Each process would only see its own writes and answer from a stale copy
+        logger.warning(
+            f"PENDING_CACHE needs a single worker process (WEB_CONCURRENCY={web_concurrency}); "
+            "the confirmation cache is disabled"
+        )
+    elif getattr(config, "PENDING_CACHE", False):
+        confirmation_cache = ConfirmationCache(
+            ttl_seconds=pending_ttl,
+            max_entries=getattr(config, "PENDING_CACHE_MAX_ENTRIES", 1000),
+        )
+    confirmation_manager = PendingConfirmationManager(
+        db,
+        operator=_to_msisdn(operator) if operator else None,
+        ttl_seconds=pending_ttl,
+        cache=confirmation_cache,
+    )
+    daily_runs = DailyRunStore(db)
+    bot = ReminderBot(
+        calendar_service,
+        messaging_service,
+        confirmation_manager,
+        max_concurrency=getattr(config, "DAILY_CHECK_CONCURRENCY", 5),
+        run_store=daily_runs,
+    )
 
-    return {
+    scheduler = None
+    if getattr(config, "SCHEDULER_ENABLED", False):
+        scheduler = DailyScheduler(
+            bot,
+            calendar_service,
+            timezone=config.TIMEZONE,
+            send_time=getattr(config, "DAILY_CHECK_TIME", "20:00"),
+            prefetch_minutes=getattr(config, "PREFETCH_MINUTES", 10),
+        )
+
+    services = {
         "config": config,
         "db": db,
         "calendar_service": calendar_service,
         "messaging_service": messaging_service,
+        "outbox": outbox,
         "confirmation_manager": confirmation_manager,
         "bot": bot,
-    }
\ No newline at end of file
+        "daily_runs": daily_runs,
+        "scheduler": scheduler,
+        "jobs": JobManager(),
+    }
+    services["inbound_dedup"] = InboundDeduplicator(
+        db if getattr(config, "WEBHOOK_DEDUP_MONGO", True) else None,
+        ttl_seconds=getattr(config, "WEBHOOK_DEDUP_TTL", 24 * 3600),
+        max_entries=getattr(config, "WEBHOOK_DEDUP_MAX_ENTRIES", 10000),
+    )
+    services["webhook_dispatcher"] = WebhookDispatcher(
+        lambda sender, reply: process_reply(services, sender, reply),
+        workers=getattr(config, "WEBHOOK_WORKERS", 4),
+        queue_size=getattr(config, "WEBHOOK_QUEUE_SIZE", 100),
+        drain_timeout=getattr(config, "WEBHOOK_DRAIN_TIMEOUT", 10),
+    )
+
+    return services
@@ -0,0 +1,180 @@
+"""
+JobManager runs long operations (the daily check) as background jobs.
+Callers get a job ID right away and follow the job by polling or through an event stream.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept for status queries
+DEFAULT_MAX_JOBS = 50
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# A job function receives an emit(event, data) callback and returns the job result
+JobFunction = Callable[[Callable[[str, Dict[str, Any]], None]], Awaitable[Any]]
+
+
+def _now() -> str:
+    """Current UTC time as ISO string."""
+    return datetime.now(timezone.utc).isoformat()
+
+
+class Job:
+    """
+    State of one background job plus the events it emitted.
+    """
+
+    def __init__(self, name: str):
+        """
+        :param name: Kind of job, e.g. "daily_check".
+        """
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.status = QUEUED
+        self.created_at = _now()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.stages: Dict[str, float] = {}
+        self.duration_ms: Optional[float] = None
+        self.events: List[Dict[str, Any]] = []
+        self._started = time.perf_counter()
+        self._subscribers: List[asyncio.Queue] = []
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def done(self) -> bool:
+        """True once the job succeeded or failed."""
+        return self.status in (SUCCEEDED, FAILED)
+
+    def emit(self, event: str, data: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Record an event and pass it to every stream subscriber.
+        Events carrying "duration_ms" also become the timing of that stage.
+        """
+        record = {"event": event, "at": _now(), "data": data or {}}
+        if "duration_ms" in record["data"]:
+            self.stages[event] = record["data"]["duration_ms"]
+        self.events.append(record)
+        for queue in self._subscribers:
+            queue.put_nowait(record)
+
+    async def stream(self) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield past events, then live ones until the job is done.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        past = list(self.events)
+        self._subscribers.append(queue)
+        try:
+            for record in past:
+                yield record
+            while not (self.done and queue.empty()):
+                yield await queue.get()
+        finally:
+            self._subscribers.remove(queue)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        JSON-friendly status of the job.
+        """
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "timings_ms": {**self.stages, "total": self.duration_ms if self.done else self._elapsed_ms()},
+            "result": self.result,
+            "error": self.error,
+        }
+
+    def _elapsed_ms(self) -> float:
+        """Milliseconds since the job was created (or started)."""
+        return round((time.perf_counter() - self._started) * 1000, 1)
+
+
+class JobManager:
+    """
+    Starts jobs as asyncio tasks and keeps the most recent ones for lookups.
+    """
+
+    def __init__(self, max_jobs: int = DEFAULT_MAX_JOBS):
+        """
+        :param max_jobs: How many jobs to remember (oldest finished jobs are dropped first).
+        """
+        self.max_jobs = max(1, max_jobs)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+    def start(self, name: str, func: JobFunction) -> Job:
+        """
+        Run `func(emit)` in the background and return its Job right away.
+        """
+        job = Job(name)
+        self._jobs[job.id] = job
+        self._prune()
+        job.task = asyncio.create_task(self._run(job, func), name=f"job-{name}-{job.id[:8]}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """The job with this ID, or None if unknown or already dropped."""
+        return self._jobs.get(job_id)
+
+    def running(self, name: str) -> Optional[Job]:
+        """
+        The job with this name that is still queued or running, if any.
+        """
+        for job in self._jobs.values():
+            if job.name == name and not job.done:
+                return job
+        return None
+
+    async def shutdown(self) -> None:
+        """
+        Cancel jobs that are still running.
+        """
+        tasks = [job.task for job in self._jobs.values() if job.task and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, job: Job, func: JobFunction) -> None:
+        """Run the job function and record its outcome."""
+        job.status = RUNNING
+        job.started_at = _now()
+        job._started = time.perf_counter()
+        job.emit("started")
+        try:
+            job.result = await func(job.emit)
+            job.status = SUCCEEDED
+        except asyncio.CancelledError:
+            job.status = FAILED
+            job.error = "cancelled"
+            raise
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+            logger.error(f"Job {job.name} {job.id} failed: {e}")
+        finally:
+            job.finished_at = _now()
+            job.duration_ms = job._elapsed_ms()
+            job.emit("finished", {"status": job.status, "error": job.error, "total_ms": job.duration_ms})
+
+    def _prune(self) -> None:
+        """Drop the oldest finished jobs above the limit."""
+        for job_id in [j.id for j in self._jobs.values() if j.done]:
+            if len(self._jobs) <= self.max_jobs:
+                break
+            del self._jobs[job_id]
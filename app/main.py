@@ -1,18 +1,90 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from app.initialization import initialize_services
-from app.routers import webhook, run_check, health
+from app import config
+from app.profiling import ProfilingMiddleware, create_profile_store
+from app.routers import webhook, run_check, health, metrics, profiles
+from app.startup import StartupReport, warmup_steps
+
+# Filled in by the lifespan; until then the routers answer "services not initialized".
+# Building the services imports Motor, caldav, etc., so it is kept out of module import.
+services = {}
+
+# Decided at import time: middleware cannot be added once the app has started
+profile_store = create_profile_store(config)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Build the services and open long-lived resources on startup; release them on shutdown.
 
-app = FastAPI()
+    Index creation, migrations and cache loading run concurrently as a warm-up phase,
+    awaited before serving or, with STARTUP_BACKGROUND_WARMUP, in the background.
+    """
+    report = StartupReport()
+    with report.stage("build_services"):
+        from app.initialization import initialize_services
+        services.update(initialize_services())
+    services["profiles"] = profile_store
+    services["startup"] = report
 
-# Initialize services (config, DB, custom classes, etc.)
-services = initialize_services()
+    with report.stage("start"):
+        await services["messaging_service"].start()
+        outbox = services["outbox"]
+        if outbox is not None:
+            await outbox.start()
+        services["webhook_dispatcher"].start()
+        if services["scheduler"] is not None:
+            services["scheduler"].start()
+
+    warmup = report.warm_up(warmup_steps(services))
+    warmup_task = None
+    if getattr(config, "STARTUP_BACKGROUND_WARMUP", False):
+        warmup_task = asyncio.create_task(warmup, name="startup-warmup")
+    else:
+        with report.stage("warmup"):
+            await warmup
+    report.ready()
+
+    try:
+        yield
+    finally:
+        if warmup_task is not None and not warmup_task.done():
+            warmup_task.cancel()
+            await asyncio.gather(warmup_task, return_exceptions=True)
+        if services["scheduler"] is not None:
+            services["scheduler"].shutdown()
+        await services["jobs"].shutdown()
+        # Finish queued replies while the messaging client is still open
+        await services["webhook_dispatcher"].stop()
+        if outbox is not None:
+            await outbox.stop()
+        await services["messaging_service"].aclose()
+        services["calendar_service"].shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Make the services accessible inside each router (simple approach).
 webhook.router.services = services
 run_check.router.services = services
 health.router.services = services
+profiles.router.services = services
 
 # Include our routers in the main FastAPI app.
 app.include_router(webhook.router)
 app.include_router(run_check.router)
 app.include_router(health.router)
+app.include_router(metrics.router)
+app.include_router(profiles.router)
+
+# Request profiling is opt-in; when off, no middleware is installed at all
+if profile_store is not None:
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=profile_store,
+        token=config.PROFILING_TOKEN,
+        interval=getattr(config, "PROFILING_INTERVAL", 0.001),
+    )
@@ -0,0 +1,148 @@
+"""
+Prometheus metrics for the external dependencies (CalDAV, MongoDB, WhatsApp adapter),
+the webhook and the daily check. Exported by GET /metrics.
+
+Recording is an in-process counter/bucket update, cheap enough to stay on in production.
+Label values are bounded: calendar names, method names, status codes and outcomes.
+"""
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Iterator, Optional, TypeVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+
+# Buckets (seconds) for calls over the network
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Buckets (seconds) for a whole daily check
+RUN_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+CALDAV_SECONDS = Histogram(
+    "reminderbot_caldav_request_seconds",
+    "Time spent in CalDAV requests",
+    ["calendar", "operation", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+MONGO_SECONDS = Histogram(
+    "reminderbot_mongo_operation_seconds",
+    "Time spent in PendingConfirmationManager operations",
+    ["method", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+ADAPTER_SECONDS = Histogram(
+    "reminderbot_adapter_request_seconds",
+    "Time spent in requests to the WhatsApp adapter",
+    ["method", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+WEBHOOK_REQUESTS = Counter(
+    "reminderbot_webhook_requests_total",
+    "Inbound webhook requests by response status",
+    ["status"],
+)
+REPLY_SECONDS = Histogram(
+    "reminderbot_reply_processing_seconds",
+    "Time spent acting on an operator reply",
+    ["status"],
+    buckets=LATENCY_BUCKETS,
+)
+DAILY_RUN_SECONDS = Histogram(
+    "reminderbot_daily_run_seconds",
+    "Duration of daily checks",
+    ["outcome"],
+    buckets=RUN_BUCKETS,
+)
+DAILY_RUN_APPOINTMENTS = Counter(
+    "reminderbot_daily_run_appointments_total",
+    "Appointments handled by daily checks",
+    ["status"],
+)
+
+# Name of the WhatsappMessagingService method behind the current adapter request
+_adapter_method: ContextVar[Optional[str]] = ContextVar("adapter_method", default=None)
+
+T = TypeVar("T")
+
+
+def render() -> bytes:
+    """The current metrics in the Prometheus text format."""
+    return generate_latest(REGISTRY)
+
+
+@contextmanager
+def caldav_timer(calendar: str, operation: str) -> Iterator[None]:
+    """
+    Time a CalDAV request; failures are recorded with outcome="error".
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        CALDAV_SECONDS.labels(calendar, operation, outcome).observe(time.perf_counter() - started)
+
+
+def timed_mongo(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """
+    Decorator for async PendingConfirmationManager methods, labelled with the method name.
+    """
+    ok = MONGO_SECONDS.labels(func.__name__, "ok")
+    error = MONGO_SECONDS.labels(func.__name__, "error")
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        started = time.perf_counter()
+        try:
+            result = await func(*args, **kwargs)
+        except BaseException:
+            error.observe(time.perf_counter() - started)
+            raise
+        ok.observe(time.perf_counter() - started)
+        return result
+
+    return wrapper
+
+
+def adapter_method(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """
+    Decorator for WhatsappMessagingService methods: adapter requests made while the
+    method runs are labelled with its name (the outermost decorated method wins).
+    """
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        if _adapter_method.get() is not None:
+            return await func(*args, **kwargs)
+        token = _adapter_method.set(func.__name__)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _adapter_method.reset(token)
+
+    return wrapper
+
+
+def observe_adapter_request(path: str, status: str, seconds: float) -> None:
+    """
+    Record one adapter request; `status` is the HTTP status code or "error".
+    """
+    ADAPTER_SECONDS.labels(_adapter_method.get() or path, status).observe(seconds)
+
+
+def observe_reply(status: str, seconds: float) -> None:
+    """Record how long acting on an operator reply took, by outcome status."""
+    REPLY_SECONDS.labels(status).observe(seconds)
+
+
+def observe_daily_run(seconds: float, summary: Optional[dict] = None) -> None:
+    """
+    Record a daily check; without a summary the run failed.
+    """
+    DAILY_RUN_SECONDS.labels("ok" if summary is not None else "error").observe(seconds)
+    if summary is not None:
+        for status in ("processed", "skipped", "failed"):
+            count = summary.get(status) or 0
+            if count:
+                DAILY_RUN_APPOINTMENTS.labels(status).inc(count)
+
@@ -0,0 +1,263 @@
+"""
+Outbox stores outbound WhatsApp messages in MongoDB and sends them in the background.
+Sends are rate limited with a token bucket and retried with jittered exponential backoff;
+messages that keep failing end up in a dead-letter state.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+from pymongo import IndexModel, ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+# Message states
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+DEAD = "dead"
+
+DEFAULT_RATE = 1.0
+DEFAULT_BURST = 5
+DEFAULT_MAX_ATTEMPTS = 6
+DEFAULT_BASE_DELAY = 2.0
+DEFAULT_MAX_DELAY = 300.0
+DEFAULT_POLL_INTERVAL = 5.0
+# Sent messages are kept this long for inspection, then removed by a TTL index
+SENT_RETENTION_SECONDS = 7 * 24 * 3600
+
+# Sender signature: (to, text) -> awaitable
+Sender = Callable[[str, str], Awaitable[Any]]
+
+
+class TokenBucket:
+    """
+    Allows `rate` operations per second on average and bursts of up to `burst`.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        """
+        :param rate: Tokens added per second.
+        :param burst: Bucket capacity.
+        """
+        self.rate = max(rate, 0.001)
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        """Add the tokens earned since the last refill."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        """
+        Wait until a token is available and take it.
+        """
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Network problems, 429 and 5xx (e.g. the adapter's 503 not_ready) are worth retrying;
+    other 4xx answers will not get better.
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+
+def backoff_delay(attempts: int, base_delay: float, max_delay: float) -> float:
+    """
+    Exponential backoff with full jitter for the given number of failed attempts.
+    """
+    return random.uniform(0, min(max_delay, base_delay * (2 ** (attempts - 1))))
+
+
+class Outbox:
+    """
+    MongoDB-backed queue of outbound messages, drained by a single background task.
+
+    Documents in the `outbox` collection:
+      {to, text, status, attempts, next_attempt_at, created_at, sent_at, last_error}
+    """
+
+    def __init__(self, db, sender: Sender, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS, base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY, poll_interval: float = DEFAULT_POLL_INTERVAL):
+        """
+        :param db: The database object holding the `outbox` collection.
+        :param sender: Coroutine function that actually sends one message.
+        :param rate: Average messages per second.
+        :param burst: Messages that may be sent back to back.
+        :param max_attempts: Attempts before a message is dead-lettered.
+        :param base_delay: First retry delay in seconds (doubles per attempt, jittered).
+        :param max_delay: Upper bound of a retry delay in seconds.
+        :param poll_interval: Seconds between checks for due retries when idle.
+        """
+        self.collection = db.outbox
+        self.sender = sender
+        self.bucket = TokenBucket(rate, burst)
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._latencies_ms: deque = deque(maxlen=500)
+        self._stats = {"enqueued": 0, "sent": 0, "retried": 0, "dead": 0}
+
+    # ---------- Lifecycle ----------
+
+    async def ensure_indexes(self) -> None:
+        """
+        Create the indexes used to pick due messages and expire sent ones (idempotent).
+        """
+        await self.collection.create_indexes([
+            IndexModel([("status", 1), ("next_attempt_at", 1)], name="status_next_attempt"),
+            IndexModel([("sent_at", 1)], name="sent_at_ttl", expireAfterSeconds=SENT_RETENTION_SECONDS),
+        ])
+
+    async def start(self) -> None:
+        """
+        Start the background sender. Messages left "sending" by a previous process are retried.
+        """
+        if self._task is not None:
+            return
+        await self.collection.update_many({"status": SENDING}, {"$set": {"status": PENDING}})
+        self._task = asyncio.create_task(self._run(), name="whatsapp-outbox")
+        logger.info("WhatsApp outbox started")
+
+    async def stop(self) -> None:
+        """
+        Stop the background sender; unsent messages stay in MongoDB for the next start.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        logger.info("WhatsApp outbox stopped")
+
+    # ---------- Public API ----------
+
+    async def enqueue(self, to: str, text: str) -> Any:
+        """
+        Store a message for sending and return its id.
+        """
+        now = datetime.now(timezone.utc)
+        result = await self.collection.insert_one({
+            "to": to,
+            "text": text,
+            "status": PENDING,
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+        })
+        self._stats["enqueued"] += 1
+        self._wakeup.set()
+        return result.inserted_id
+
+    async def stats(self) -> Dict[str, Any]:
+        """
+        Queue depth per state plus send counters and latency of recent sends.
+        """
+        depth = {PENDING: 0, SENDING: 0, DEAD: 0}
+        async for row in self.collection.aggregate([
+            {"$match": {"status": {"$in": list(depth)}}},
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+        ]):
+            depth[row["_id"]] = row["count"]
+
+        latencies = sorted(self._latencies_ms)
+        latency = {}
+        if latencies:
+            latency = {
+                "avg": round(sum(latencies) / len(latencies), 1),
+                "p50": latencies[len(latencies) // 2],
+                "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                "max": latencies[-1],
+            }
+        return {"running": self._task is not None, "depth": depth, **self._stats, "latency_ms": latency}
+
+    # ---------- Background sender ----------
+
+    async def _run(self) -> None:
+        """Send due messages one by one; sleep until woken by enqueue() or the poll interval."""
+        while True:
+            # Cleared before looking, so an enqueue() during the lookup is not missed
+            self._wakeup.clear()
+            try:
+                doc = await self._claim_next()
+            except Exception as e:
+                logger.error(f"Error reading the outbox: {e}")
+                doc = None
+            if doc is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self.bucket.acquire()
+            try:
+                await self._deliver(doc)
+            except Exception as e:
+                # Status update failed; the message is retried on the next start
+                logger.error(f"Error updating outbox message {doc.get('_id')}: {e}")
+
+    async def _claim_next(self) -> Optional[Dict[str, Any]]:
+        """
+        Atomically take the oldest due message.
+        """
+        return await self.collection.find_one_and_update(
+            {"status": PENDING, "next_attempt_at": {"$lte": datetime.now(timezone.utc)}},
+            {"$set": {"status": SENDING}},
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _deliver(self, doc: Dict[str, Any]) -> None:
+        """
+        Send one claimed message and record the outcome.
+        """
+        started = time.perf_counter()
+        try:
+            await self.sender(doc["to"], doc["text"])
+        except Exception as e:
+            await self._record_failure(doc, e)
+            return
+
+        self._latencies_ms.append(round((time.perf_counter() - started) * 1000, 1))
+        self._stats["sent"] += 1
+        await self.collection.update_one(
+            {"_id": doc["_id"]},
+            {"$set": {"status": SENT, "sent_at": datetime.now(timezone.utc)}, "$inc": {"attempts": 1}},
+        )
+
+    async def _record_failure(self, doc: Dict[str, Any], error: Exception) -> None:
+        """Schedule a retry with backoff, or dead-letter the message."""
+        attempts = doc.get("attempts", 0) + 1
+        update: Dict[str, Any] = {"attempts": attempts, "last_error": str(error)}
+        if is_retryable(error) and attempts < self.max_attempts:
+            delay = backoff_delay(attempts, self.base_delay, self.max_delay)
+            update.update(status=PENDING, next_attempt_at=datetime.now(timezone.utc) + timedelta(seconds=delay))
+            self._stats["retried"] += 1
+            logger.warning(f"Outbox send to {doc['to']} failed ({error}); retry {attempts} in {delay:.1f}s")
+        else:
+            update["status"] = DEAD
+            self._stats["dead"] += 1
+            logger.error(f"Outbox message to {doc['to']} dead-lettered after {attempts} attempts: {error}")
+        await self.collection.update_one({"_id": doc["_id"]}, {"$set": update})
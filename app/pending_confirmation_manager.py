@@ -3,23 +3,273 @@ PendingConfirmationManager manages pending confirmations in a MongoDB collection
 Handles CRUD operations for appointment confirmation requests.
 """
 import logging
-from datetime import datetime, timezone
-from typing import Optional, Dict, Any
+import re
+from datetime import date, datetime, timezone
+from typing import Optional, Dict, Any, List
+
+from pymongo import IndexModel, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from app.confirmation_cache import ConfirmationCache
+from app.metrics import timed_mongo
 
 logger = logging.getLogger(__name__)
 
+# Fields the webhook needs from a pending confirmation
+PENDING_PROJECTION = {
+    "_id": 0,
+    "key": 1,
+    "customer_name": 1,
+    "customer_number": 1,
+    "appointment_time": 1,
+    "appointment_at": 1,
+    "date_bucket": 1,
+    "time_hhmm": 1,
+}
+
+# Keep pending confirmations for two days after they were (re)created
+DEFAULT_PENDING_TTL_SECONDS = 2 * 24 * 3600
+
+# MongoDB error codes raised when an index exists with different options
+INDEX_OPTIONS_CONFLICT_CODES = (85, 86)
+
+_TIME_RE = re.compile(r"(\d{1,2}):(\d{2})")
+
+
+def normalize_hhmm(value: Optional[str]) -> Optional[str]:
+    """
+    Normalize an appointment time to zero-padded "HH:MM".
+    Accepts "9:30", "09:30" or an ISO datetime such as "2025-02-01T09:30:00+02:00".
+    """
+    if not value:
+        return None
+    text = str(value)
+    if "T" in text:
+        text = text.split("T", 1)[1]
+    m = _TIME_RE.search(text)
+    if not m:
+        return None
+    return f"{int(m.group(1)):02d}:{m.group(2)}"
+
+
+def parse_appointment_at(value: Any) -> Optional[datetime]:
+    """
+    Return the appointment start as a datetime, if it can be known.
+    Accepts a datetime or an ISO string; bare "HH:MM" times carry no date and give None.
+    """
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str) and "T" in value:
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return None
+
+
+def date_bucket_for(value: Optional[datetime]) -> Optional[str]:
+    """
+    The appointment's calendar day ("YYYY-MM-DD", in the appointment's own timezone).
+    """
+    return value.date().isoformat() if value else None
+
+
 class PendingConfirmationManager:
     """
     Manages pending confirmations in a MongoDB collection.
     """
 
-    def __init__(self, db):
+    def __init__(self, db, operator: Optional[str] = None,
+                 ttl_seconds: int = DEFAULT_PENDING_TTL_SECONDS,
+                 cache: Optional[ConfirmationCache] = None):
         """
         :param db: The database client or database object (e.g., `db = client.get_default_database()`)
+        :param operator: MSISDN of the operator who approves reminders; stored on every
+                         confirmation so replies can be looked up by sender.
+        :param ttl_seconds: How long a pending confirmation lives after `created_at`.
+        :param cache: Optional write-through cache answering find_pending() from memory.
         """
         # The collection is assumed to exist on `db` named `pending_confirmations`.
         self.collection = db.pending_confirmations
+        self.operator = operator
+        self.ttl_seconds = ttl_seconds
+        self.cache = cache
+
+    @timed_mongo
+    async def warm_cache(self) -> None:
+        """
+        Load every pending confirmation into the cache (no-op without a cache).
+        """
+        if self.cache is None:
+            return
+        projection = dict(PENDING_PROJECTION, operator=1, created_at=1)
+        docs = []
+        async for doc in self.collection.find({}, projection):
+            if not doc.get("time_hhmm"):
+                doc["time_hhmm"] = normalize_hhmm(doc.get("appointment_time"))
+            docs.append(doc)
+        self.cache.warm(docs)
+
+    def _cache_put(self, key: str, fields: Dict[str, Any]) -> None:
+        """
+        Write-through: mirror a stored confirmation in the cache.
+        """
+        if self.cache is not None:
+            doc = {k: v for k, v in fields.items() if k in PENDING_PROJECTION or k in ("operator", "created_at")}
+            doc["key"] = key
+            self.cache.put(doc)
+
+    def _cache_remove(self, key: str) -> None:
+        """
+        Write-through: forget a confirmation that left the collection.
+        """
+        if self.cache is not None:
+            self.cache.remove(key)
+
+    def index_models(self) -> List[IndexModel]:
+        """
+        The indexes this collection is expected to have.
+        """
+        return [
+            IndexModel([("key", 1)], name="key_unique", unique=True),
+            IndexModel([("customer_number", 1), ("appointment_at", 1)], name="customer_appointment_at"),
+            IndexModel([("operator", 1), ("date_bucket", 1), ("time_hhmm", 1)], name="operator_date_time"),
+            IndexModel([("created_at", 1)], name="created_at_ttl", expireAfterSeconds=self.ttl_seconds),
+        ]
+
+    @timed_mongo
+    async def ensure_indexes(self) -> Dict[str, str]:
+        """
+        Create the expected indexes (idempotent).
+
+        Each index is created on its own, so one failure (e.g. duplicate keys blocking
+        the unique index) does not prevent the others. A changed TTL is applied to the
+        existing index with collMod instead of dropping and rebuilding it.
+
+        :return: index name -> "ok" / "ttl_updated" / "error: ..."
+        """
+        results = {}
+        for model in self.index_models():
+            name = model.document["name"]
+            try:
+                await self.collection.create_indexes([model])
+                results[name] = "ok"
+            except OperationFailure as e:
+                ttl = model.document.get("expireAfterSeconds")
+                if e.code in INDEX_OPTIONS_CONFLICT_CODES and ttl is not None:
+                    await self.collection.database.command({
+                        "collMod": self.collection.name,
+                        "index": {"name": name, "expireAfterSeconds": ttl},
+                    })
+                    results[name] = "ttl_updated"
+                    logger.info(f"Updated TTL of index {name} to {ttl}s")
+                else:
+                    results[name] = f"error: {e}"
+                    logger.error(f"Could not create index {name}: {e}")
+            except Exception as e:
+                results[name] = f"error: {e}"
+                logger.error(f"Could not create index {name}: {e}")
+        return results
+
+    async def index_report(self) -> Dict[str, Any]:
+        """
+        Report which expected indexes exist and whether their build has finished.
+
+        Uses listIndexes with includeBuildUUIDs, which lists in-progress builds with a
+        buildUUID; falls back to a plain listing on servers that reject the option.
+        """
+        existing: Dict[str, Dict[str, Any]] = {}
+        try:
+            reply = await self.collection.database.command({
+                "listIndexes": self.collection.name,
+                "includeBuildUUIDs": True,
+            })
+            for entry in reply["cursor"]["firstBatch"]:
+                if "buildUUID" in entry:
+                    existing[entry["spec"]["name"]] = {"spec": entry["spec"], "ready": False}
+                else:
+                    existing[entry["name"]] = {"spec": entry, "ready": True}
+        except OperationFailure:
+            async for spec in self.collection.list_indexes():
+                existing[spec["name"]] = {"spec": spec, "ready": True}
+
+        indexes = {}
+        for model in self.index_models():
+            name = model.document["name"]
+            found = existing.get(name)
+            indexes[name] = {
+                "exists": found is not None,
+                "ready": bool(found and found["ready"]),
+                "key": dict(model.document["key"]),
+            }
+            ttl = model.document.get("expireAfterSeconds")
+            if ttl is not None:
+                indexes[name]["expire_after_seconds"] = found["spec"].get("expireAfterSeconds") if found else None
+        return {
+            "collection": self.collection.name,
+            "ready": all(i["ready"] for i in indexes.values()),
+            "indexes": indexes,
+            "other": sorted(n for n in existing if n not in indexes and n != "_id_"),
+        }
+
+    def _confirmation_fields(self, data: Dict[str, Any], created_at: datetime) -> Dict[str, Any]:
+        """
+        Build the stored fields of a confirmation from the bot's data dict.
 
+        Besides the display time, the appointment start is stored as a real date
+        ("appointment_at") with its day ("date_bucket") so lookups are equality
+        matches on indexed fields rather than parsing of the key.
+        """
+        appointment_at = parse_appointment_at(data.get("start_at") or data["start_time"])
+        return {
+            "customer_name": data["customer_name"],
+            "customer_number": data["customer_number"],
+            "appointment_time": data["start_time"],
+            "appointment_at": appointment_at,
+            # A claimed confirmation that is put back keeps its day: MongoDB returns
+            # appointment_at in UTC, whose date can differ from the local one
+            "date_bucket": data.get("date_bucket") or date_bucket_for(appointment_at),
+            "time_hhmm": normalize_hhmm(data["start_time"]),
+            "operator": data.get("operator", self.operator),
+            "created_at": created_at,
+        }
+
+    @timed_mongo
+    async def migrate_legacy_documents(self) -> int:
+        """
+        One-shot, idempotent migration of documents written before the structured
+        fields existed: fills customer_number, appointment_time, appointment_at,
+        date_bucket, time_hhmm and operator from the "<number>$<time>" key.
+
+        Legacy rows that only hold "HH:MM" keep appointment_at/date_bucket as None;
+        they are still found by operator and time, and expire via the TTL index.
+
+        :return: Number of migrated documents.
+        """
+        operations = []
+        async for doc in self.collection.find({"date_bucket": {"$exists": False}}):
+            key = doc.get("key", "")
+            number, _, time_part = key.partition("$")
+            appointment_time = doc.get("appointment_time") or time_part
+            appointment_at = parse_appointment_at(appointment_time)
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {
+                "customer_number": doc.get("customer_number") or number,
+                "appointment_time": appointment_time,
+                "appointment_at": appointment_at,
+                "date_bucket": date_bucket_for(appointment_at),
+                "time_hhmm": doc.get("time_hhmm") or normalize_hhmm(appointment_time),
+                "operator": doc.get("operator"),
+            }}))
+
+        if not operations:
+            return 0
+        result = await self.collection.bulk_write(operations, ordered=False)
+        if self.cache is not None:
+            self.cache.clear()
+        logger.info(f"Migrated {result.modified_count} legacy pending confirmations")
+        return result.modified_count
+
+    @timed_mongo
     async def add_confirmation(self, key: str, data: Dict[str, Any]) -> None:
         """
         Adds or updates a confirmation document in the database.
@@ -31,18 +281,13 @@ class PendingConfirmationManager:
           - "start_time"
         """
         try:
+            fields = self._confirmation_fields(data, datetime.now(timezone.utc))
             result = await self.collection.update_one(
                 {"key": key},
-                {
-                    "$set": {
-                        "customer_name": data["customer_name"],
-                        "customer_number": data["customer_number"],
-                        "appointment_time": data["start_time"],
-                        "created_at": datetime.now(timezone.utc)
-                    }
-                },
+                {"$set": fields},
                 upsert=True
             )
+            self._cache_put(key, fields)
             
             action = "updated" if result.matched_count > 0 else "created"
             logger.info(f"Confirmation {action} for key: {key}")
@@ -51,6 +296,54 @@ class PendingConfirmationManager:
             logger.error(f"Error adding confirmation for key {key}: {str(e)}")
             raise
 
+    @timed_mongo
+    async def add_confirmations_bulk(self, confirmations: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Adds or updates many confirmations with one unordered bulk_write.
+
+        A failing upsert does not stop the others; failures are reported per key.
+
+        :param confirmations: key -> data dict (same shape as for add_confirmation).
+        :return: {"inserted": int, "updated": int, "failed": int,
+                  "keys": {key: "inserted" / "updated" / "failed"},
+                  "errors": {key: error message}}
+        """
+        keys = list(confirmations)
+        report: Dict[str, Any] = {"inserted": 0, "updated": 0, "failed": 0, "keys": {}, "errors": {}}
+        if not keys:
+            return report
+
+        created_at = datetime.now(timezone.utc)
+        fields = {key: self._confirmation_fields(confirmations[key], created_at) for key in keys}
+        operations = [UpdateOne({"key": key}, {"$set": fields[key]}, upsert=True) for key in keys]
+
+        try:
+            result = await self.collection.bulk_write(operations, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            for error in details.get("writeErrors", []):
+                key = keys[error["index"]]
+                report["keys"][key] = "failed"
+                report["errors"][key] = error.get("errmsg", "write error")
+            if details.get("writeConcernErrors"):
+                logger.warning(f"Bulk confirmation write concern errors: {details['writeConcernErrors']}")
+
+        upserted = {u["index"] for u in details.get("upserted", [])}
+        for index, key in enumerate(keys):
+            if key not in report["keys"]:
+                report["keys"][key] = "inserted" if index in upserted else "updated"
+                self._cache_put(key, fields[key])
+        for status in report["keys"].values():
+            report[status] += 1
+
+        logger.info(
+            f"Bulk confirmations: {report['inserted']} inserted, {report['updated']} updated, "
+            f"{report['failed']} failed"
+        )
+        return report
+
+    @timed_mongo
     async def get_confirmation(self, key: str) -> Optional[Dict[str, str]]:
         """
         Retrieves and deletes a confirmation by key.
@@ -63,6 +356,7 @@ class PendingConfirmationManager:
             confirmation = await self.collection.find_one({"key": key})
             if confirmation:
                 await self.collection.delete_one({"key": key})
+                self._cache_remove(key)
                 logger.info(f"Retrieved and deleted confirmation for key: {key}")
                 return {
                     "customer_name": confirmation["customer_name"],
@@ -77,6 +371,99 @@ class PendingConfirmationManager:
             logger.error(f"Error retrieving confirmation for key {key}: {str(e)}")
             raise
 
+    @timed_mongo
+    async def claim_confirmation(self, key: str) -> Optional[Dict[str, str]]:
+        """
+        Atomically removes a confirmation and returns it, in a single round trip.
+
+        Only one caller can claim a given key: if two replies arrive at the same
+        time, the second one gets None and must not act on the confirmation.
+
+        :param key: The unique string identifier for the confirmation.
+        :return: A dictionary with "customer_name", "customer_number", "start_time",
+                 "start_at", "date_bucket" and "operator" (so add_confirmation() can put it
+                 back unchanged), or None if the confirmation does not exist (or was already claimed).
+        """
+        try:
+            confirmation = await self.collection.find_one_and_delete(
+                {"key": key},
+                projection={"_id": 0, "customer_name": 1, "customer_number": 1, "appointment_time": 1,
+                            "appointment_at": 1, "date_bucket": 1, "operator": 1},
+            )
+            self._cache_remove(key)
+            if not confirmation:
+                logger.info(f"Confirmation for key {key} was not found or already claimed")
+                return None
+
+            logger.info(f"Claimed confirmation for key: {key}")
+            return {
+                "customer_name": confirmation["customer_name"],
+                "customer_number": confirmation["customer_number"],
+                "start_time": confirmation["appointment_time"],
+                "start_at": confirmation.get("appointment_at"),
+                "date_bucket": confirmation.get("date_bucket"),
+                "operator": confirmation.get("operator", self.operator),
+            }
+
+        except Exception as e:
+            logger.error(f"Error claiming confirmation for key {key}: {str(e)}")
+            raise
+
+    @timed_mongo
+    async def find_pending(self, operator: Optional[str] = None,
+                           time_hhmm: Optional[str] = None,
+                           day: Optional[date] = None,
+                           from_day: Optional[date] = None) -> List[Dict[str, Any]]:
+        """
+        Lists pending confirmations for an operator in one indexed query,
+        or straight from the cache when it holds every pending confirmation.
+
+        :param operator: The operator's MSISDN. Rows stored without an operator
+                         (before operators were recorded) are included too.
+        :param time_hhmm: Optional appointment time filter ("9:30" and "09:30" both work).
+        :param day: Optional appointment day filter (matched on date_bucket).
+        :param from_day: Optional earliest appointment day; rows for earlier days are left out.
+                         Rows without a known day (legacy "HH:MM" rows) are kept.
+        :return: Documents with "key", "customer_name", "customer_number",
+                 "appointment_time", "appointment_at", "date_bucket" and "time_hhmm",
+                 ordered by day and time.
+        """
+        if self.cache is not None:
+            docs = self.cache.find(
+                operator=operator,
+                time_hhmm=normalize_hhmm(time_hhmm) if time_hhmm else None,
+                date_bucket=day.isoformat() if day else None,
+                from_date_bucket=from_day.isoformat() if from_day else None,
+            )
+            if docs is not None:
+                return docs
+
+        query: Dict[str, Any] = {}
+        if operator:
+            query["operator"] = {"$in": [operator, None]}
+        if day:
+            query["date_bucket"] = day.isoformat()
+        elif from_day:
+            query["$or"] = [{"date_bucket": {"$gte": from_day.isoformat()}}, {"date_bucket": None}]
+        if time_hhmm:
+            query["time_hhmm"] = normalize_hhmm(time_hhmm)
+
+        try:
+            cursor = self.collection.find(query, PENDING_PROJECTION).sort([("date_bucket", 1), ("time_hhmm", 1)])
+            docs = []
+            async for doc in cursor:
+                # Rows written before time_hhmm existed
+                if not doc.get("time_hhmm"):
+                    doc["time_hhmm"] = normalize_hhmm(doc.get("appointment_time"))
+                docs.append(doc)
+            logger.debug(f"Found {len(docs)} pending confirmations for operator {operator}")
+            return docs
+
+        except Exception as e:
+            logger.error(f"Error finding pending confirmations for operator {operator}: {str(e)}")
+            raise
+
+    @timed_mongo
     async def has_confirmation(self, key: str) -> bool:
         """
         Checks if a confirmation document exists for the given key.
@@ -87,6 +474,7 @@ class PendingConfirmationManager:
         doc = await self.collection.find_one({"key": key})
         return doc is not None
 
+    @timed_mongo
     async def list_keys_for_sender(self, sender_number: str) -> list[str]:
         """
         Lists all pending confirmation keys for a specific sender number.
@@ -95,9 +483,8 @@ class PendingConfirmationManager:
         :return: List of keys matching the sender.
         """
         try:
-            # Keys are in format: "<sender_number>$<appointment_time>"
-            pattern = f"^{sender_number}\\$"
-            cursor = self.collection.find({"key": {"$regex": pattern}})
+            # Equality match on the indexed customer_number field
+            cursor = self.collection.find({"customer_number": sender_number}, {"_id": 0, "key": 1})
             
             keys = []
             async for doc in cursor:
@@ -110,6 +497,7 @@ class PendingConfirmationManager:
             logger.error(f"Error listing keys for sender {sender_number}: {str(e)}")
             raise
 
+    @timed_mongo
     async def delete_confirmation(self, key: str) -> bool:
         """
         Deletes a confirmation document by key.
@@ -119,6 +507,7 @@ class PendingConfirmationManager:
         """
         try:
             result = await self.collection.delete_one({"key": key})
+            self._cache_remove(key)
             success = result.deleted_count > 0
             
             if success:
@@ -0,0 +1,169 @@
+"""
+On-demand profiling of single requests with pyinstrument (optional dependency).
+
+With PROFILING_ENABLED, a request to a profiled path that carries the profiling token
+(header X-Profile or query parameter ?profile=) runs under pyinstrument's sampling
+profiler. The finished profile is kept in a bounded ring and can be downloaded as
+speedscope JSON or an HTML flamegraph from /admin/profiles.
+Without PROFILING_ENABLED no middleware is installed, so requests pay nothing.
+"""
+import hmac
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import parse_qs
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_PROFILES = 10
+DEFAULT_INTERVAL = 0.001
+DEFAULT_PATHS = ("/run-check", "/webhook/wa")
+PROFILE_HEADER = "x-profile"
+PROFILE_QUERY = "profile"
+
+# Set while the current request runs under the profiler
+_profiling: ContextVar[bool] = ContextVar("profiling", default=False)
+
+
+def is_profiling() -> bool:
+    """True inside a request that is being profiled."""
+    return _profiling.get()
+
+
+def pyinstrument_available() -> bool:
+    """Whether the optional `pyinstrument` package can be imported."""
+    try:
+        import pyinstrument  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_profile_store(config) -> Optional["ProfileStore"]:
+    """
+    The store for request profiles, or None when profiling is off or cannot run.
+    """
+    if not getattr(config, "PROFILING_ENABLED", False):
+        return None
+    if not getattr(config, "PROFILING_TOKEN", ""):
+        logger.warning("PROFILING_ENABLED is set but PROFILING_TOKEN is empty; profiling stays off.")
+        return None
+    if not pyinstrument_available():
+        logger.warning("PROFILING_ENABLED is set but the 'pyinstrument' package is not installed; profiling stays off.")
+        return None
+    return ProfileStore(getattr(config, "PROFILING_MAX_PROFILES", DEFAULT_MAX_PROFILES))
+
+
+class ProfileStore:
+    """
+    The most recent profiles (pyinstrument sessions), oldest dropped first.
+    Sessions are rendered only when downloaded.
+    """
+
+    def __init__(self, max_profiles: int = DEFAULT_MAX_PROFILES):
+        """
+        :param max_profiles: How many profiles to keep.
+        """
+        self.max_profiles = max(1, max_profiles)
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def add(self, profile_id: str, session, method: str, path: str, status: Optional[int]) -> None:
+        """
+        Keep a finished profile.
+        """
+        self._profiles[profile_id] = {
+            "id": profile_id,
+            "method": method,
+            "path": path,
+            "status": status,
+            "at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(session.duration * 1000, 1),
+            "samples": session.sample_count,
+            "session": session,
+        }
+        while len(self._profiles) > self.max_profiles:
+            self._profiles.popitem(last=False)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Metadata of the kept profiles, newest first."""
+        return [{k: v for k, v in p.items() if k != "session"} for p in reversed(self._profiles.values())]
+
+    def render(self, profile_id: str, fmt: str = "speedscope") -> Optional[str]:
+        """
+        A kept profile as speedscope JSON ("speedscope") or an HTML flamegraph ("html"),
+        or None if it is unknown.
+        """
+        profile = self._profiles.get(profile_id)
+        if profile is None:
+            return None
+        from pyinstrument.renderers import HTMLRenderer, SpeedscopeRenderer
+
+        renderer = HTMLRenderer() if fmt == "html" else SpeedscopeRenderer()
+        return renderer.render(profile["session"])
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles requests carrying the profiling token.
+    The response gets an X-Profile-Id header with the ID to download the profile.
+    """
+
+    def __init__(self, app, store: ProfileStore, token: str, paths: Sequence[str] = DEFAULT_PATHS,
+                 interval: float = DEFAULT_INTERVAL):
+        """
+        :param app: The wrapped ASGI app.
+        :param store: Where finished profiles are kept.
+        :param token: Secret that requests must present to be profiled.
+        :param paths: Path prefixes that may be profiled.
+        :param interval: Sampling interval in seconds.
+        """
+        self.app = app
+        self.store = store
+        self.token = token.encode()
+        self.paths = tuple(paths)
+        self.interval = interval
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths) or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        from pyinstrument import Profiler
+
+        profile_id = uuid.uuid4().hex
+        status: Dict[str, Optional[int]] = {"code": None}
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        profiler = Profiler(interval=self.interval, async_mode="enabled")
+        token = _profiling.set(True)
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            session = profiler.stop()
+            _profiling.reset(token)
+            self.store.add(profile_id, session, scope["method"], scope["path"], status["code"])
+            logger.info(f"Profiled {scope['method']} {scope['path']} in "
+                        f"{round((time.perf_counter() - started) * 1000, 1)}ms as {profile_id}")
+
+    def _requested(self, scope) -> bool:
+        """Whether the request carries the profiling token (header or query)."""
+        presented = None
+        for name, value in scope.get("headers", []):
+            if name == PROFILE_HEADER.encode():
+                presented = value
+                break
+        if presented is None and scope.get("query_string"):
+            values = parse_qs(scope["query_string"].decode()).get(PROFILE_QUERY)
+            presented = values[0].encode() if values else None
+        return presented is not None and hmac.compare_digest(presented, self.token)
@@ -2,12 +2,23 @@
 ReminderBot coordinates daily checks for tomorrow's appointments.
 Fetches appointments, extracts contact info, and manages reminder confirmations.
 """
+import asyncio
 import logging
 import re
-from typing import List, Tuple, Optional
+import time
+from typing import Any, Callable, Dict, List, Set, Tuple, Optional
+
+from app.calendar_service import CalendarFetchError
+from app.metrics import observe_daily_run
 
 logger = logging.getLogger(__name__)
 
+# Default number of appointments processed at the same time during a daily check
+DEFAULT_CONCURRENCY = 5
+
+# Progress callback: (event, data) -> None
+Progress = Callable[[str, Dict[str, Any]], None]
+
 class ReminderBot:
     """
     Coordinates daily checks for tomorrow's appointments:
@@ -16,70 +27,289 @@ class ReminderBot:
     - Stores them in a PendingConfirmationManager
     - Sends messages via a MessagingService
     """
-    def __init__(self, calendar_service, messaging_service, confirmation_manager):
+    def __init__(self, calendar_service, messaging_service, confirmation_manager,
+                 max_concurrency: int = DEFAULT_CONCURRENCY, run_store=None):
         """
-        :param calendar_service: An instance with a method get_tomorrow_appointments() -> List[(summary, description, start_time)]
+        :param calendar_service: An instance with an async method fetch_tomorrow_appointments(with_start=True, strict=True)
+                                 -> List[(summary, description, start_time[, start])]
         :param messaging_service: An instance with async methods to send WhatsApp messages.
         :param confirmation_manager: Manages "pending confirmations" in storage (async).
+        :param max_concurrency: How many appointments may be processed at the same time.
+        :param run_store: Optional DailyRunStore with per-day completion markers (used by run_once()).
         """
         self.calendar_service = calendar_service
         self.messaging_service = messaging_service
         self.confirmation_manager = confirmation_manager
+        self.max_concurrency = max(1, int(max_concurrency or 1))
+        self.run_store = run_store
+        self._inflight: Optional[asyncio.Task] = None
 
-    async def run_daily_check(self) -> None:
+    async def run_once(self, force: bool = False, appointments: Optional[List[Tuple]] = None,
+                       progress: Optional[Progress] = None) -> Dict[str, Any]:
         """
-        Fetch tomorrow's appointments. If none, notify that no appointments exist.
-        Otherwise, for each appointment:
-         - Extract phone number from description
-         - Derive a customer name from summary
-         - Add a pending confirmation record
-         - Send a WhatsApp approval request to the operator
+        Single-flight wrapper around run_daily_check().
+
+         - If a check is already running in this process, wait for it and return its result
+         - Otherwise, if tomorrow's check already completed (per-day marker), return the
+           marker without doing any work, unless `force` is set
+         - Otherwise run the check and record the completion marker, but only if every
+           calendar could be searched and no appointment failed, so a re-trigger retries the day.
+           A retry only sends the approval requests that were not sent by an earlier run
+
+        :return: The run summary with "run" set to "executed", "joined" or "skipped".
         """
+        if self._inflight is not None and not self._inflight.done():
+            logger.info("Daily check already running; joining it")
+            summary = await asyncio.shield(self._inflight)
+            return {**summary, "run": "joined" if summary["run"] == "executed" else summary["run"]}
+
+        # Claimed before the first await: the marker lookup runs inside the shielded task,
+        # so a trigger arriving while it is pending joins it instead of starting a second run
+        self._inflight = asyncio.ensure_future(self._run_and_mark(force, appointments, progress))
         try:
-            appointments: List[Tuple[str, str, str]] = self.calendar_service.get_tomorrow_appointments()
+            return await asyncio.shield(self._inflight)
+        finally:
+            if self._inflight is not None and self._inflight.done():
+                self._inflight = None
+
+    async def _run_and_mark(self, force: bool, appointments: Optional[List[Tuple]],
+                            progress: Optional[Progress]) -> Dict[str, Any]:
+        """
+        Skip the day if its completion marker exists (unless forced); otherwise run the
+        daily check for the appointments not prompted by an earlier partial run, and record
+        the marker if nothing failed, or the keys that were prompted if something did.
+        """
+        day = None
+        prompted: Set[str] = set()
+        if self.run_store is not None:
+            day = self.calendar_service.get_tomorrow_time()[0].date().isoformat()
+            marker = None if force else await self.run_store.get(day)
+            if marker:
+                logger.info(f"Daily check for {day} already completed; skipping")
+                return {**{k: v for k, v in marker.items() if k != "_id"}, "date": day, "run": "skipped"}
+            if not force:
+                prompted = await self.run_store.get_prompted(day)
+
+        summary = await self.run_daily_check(appointments=appointments, progress=progress,
+                                             already_prompted=prompted)
+        if day is not None and (summary.get("fetch_errors") or summary.get("failed")):
+            logger.warning(f"Daily check for {day} had failures; not marking it completed so it can be retried")
+            try:
+                await self.run_store.add_prompted(
+                    day, (r["key"] for r in summary["results"] if r["status"] == "processed")
+                )
+            except Exception as e:
+                logger.error(f"Could not record the progress of the daily check for {day}: {str(e)}")
+        elif day is not None:
+            try:
+                await self.run_store.mark_completed(day, summary)
+            except Exception as e:
+                logger.error(f"Could not record completion of the daily check for {day}: {str(e)}")
+        return {**summary, "run": "executed"}
+
+    async def run_daily_check(self, appointments: Optional[List[Tuple]] = None,
+                              progress: Optional[Progress] = None,
+                              already_prompted: Optional[Set[str]] = None) -> Dict[str, Any]:
+        """
+        Fetch tomorrow's appointments (unless already prefetched and passed in).
+        If none, notify that no appointments exist.
+        Otherwise:
+         - Extract phone number from description and a customer name from summary
+         - Store all pending confirmations in one bulk write
+         - Send a WhatsApp approval request to the operator for every stored
+           confirmation (up to `max_concurrency` at a time)
+
+        A failure in one appointment does not affect the others. If some calendars could
+        not be searched, the appointments of the others are still processed and the failures
+        are listed in "fetch_errors"; if nothing could be read, the check fails instead of
+        reporting that there are no appointments.
+
+        :param appointments: Tomorrow's appointments, if they were fetched ahead of time.
+        :param progress: Optional callback receiving "fetched", "stored" and "sent" events.
+        :param already_prompted: Confirmation keys whose approval request an earlier run of the
+                                 same day already sent; they are skipped, not stored or sent again.
+        :return: Summary dict with "total", "processed", "skipped", "failed" counts,
+                 "fetch_errors", "timings_ms" ("fetch", "store", "send", "total") and
+                 per-appointment "results" in calendar order.
+        """
+        started = time.perf_counter()
+        fetch_errors: List[str] = []
+        try:
+            if appointments is None:
+                try:
+                    appointments = await self.calendar_service.fetch_tomorrow_appointments(with_start=True, strict=True)
+                except CalendarFetchError as e:
+                    if not e.appointments:
+                        raise
+                    logger.warning(f"Continuing with {len(e.appointments)} appointments; some calendars failed: {e}")
+                    appointments, fetch_errors = e.appointments, e.errors
+            fetched = time.perf_counter()
             logger.info(f"Found {len(appointments)} appointments for tomorrow")
-            
+            self._emit(progress, "fetched", {"appointments": len(appointments),
+                                             "duration_ms": round((fetched - started) * 1000, 1)})
+
             if not appointments:
                 await self.messaging_service.send_no_appointments_message()
-                return
+                results = []
+                stored = fetched
+            else:
+                results, confirmations = self._prepare_confirmations(appointments, already_prompted)
+                await self._store_confirmations(results, confirmations)
+                stored = time.perf_counter()
+                self._emit(progress, "stored", {
+                    "stored": sum(1 for r in results if r["status"] == "stored"),
+                    "duration_ms": round((stored - fetched) * 1000, 1),
+                })
+
+                semaphore = asyncio.Semaphore(self.max_concurrency)
+                await asyncio.gather(
+                    *(self._send_request(semaphore, result, progress)
+                      for result in results if result["status"] == "stored")
+                )
+
+            finished = time.perf_counter()
+            await self._warm_confirmation_cache()
+            summary = {
+                "total": len(results),
+                "processed": sum(1 for r in results if r["status"] == "processed"),
+                "skipped": sum(1 for r in results if r["status"] == "skipped"),
+                "failed": sum(1 for r in results if r["status"] == "failed"),
+                "fetch_errors": fetch_errors,
+                "timings_ms": {
+                    "fetch": round((fetched - started) * 1000, 1),
+                    "store": round((stored - fetched) * 1000, 1),
+                    "send": round((finished - stored) * 1000, 1),
+                    "total": round((finished - started) * 1000, 1),
+                },
+                "results": results,
+            }
+            logger.info(
+                f"Daily check completed. Processed {summary['processed']}, skipped {summary['skipped']}, "
+                f"failed {summary['failed']} appointments in {summary['timings_ms']['total']}ms"
+            )
+            observe_daily_run(finished - started, summary)
+            return summary
 
-            processed_count = 0
-            for summary, description, start_time in appointments:
-                try:
-                    customer_number = self.extract_phone_number(description)
-                    customer_name = self._extract_customer_name(summary)
-
-                    if customer_number:
-                        # Unique key with phone number + start_time
-                        key = f"{customer_number}${start_time}"
-
-                        # Store in DB (pending confirmation)
-                        await self.confirmation_manager.add_confirmation(
-                            key,
-                            {
-                                "customer_name": customer_name,
-                                "customer_number": customer_number,
-                                "start_time": start_time,
-                            },
-                        )
-
-                        # Ask the operator for approval
-                        await self.messaging_service.send_confirmation_request(start_time, customer_name)
-                        processed_count += 1
-                        logger.info(f"Added confirmation request for {customer_name} at {start_time}")
-                    else:
-                        logger.warning(f"No phone number found for appointment: {summary} at {start_time}")
-                        
-                except Exception as e:
-                    logger.error(f"Error processing appointment {summary}: {str(e)}")
-                    continue
-                    
-            logger.info(f"Daily check completed. Processed {processed_count} appointments")
-            
         except Exception as e:
             logger.error(f"Error during daily check: {str(e)}")
+            observe_daily_run(time.perf_counter() - started)
             raise
 
+    @staticmethod
+    def _emit(progress: Optional[Progress], event: str, data: Dict[str, Any]) -> None:
+        """
+        Report progress; a failing callback never affects the run.
+        """
+        if progress is None:
+            return
+        try:
+            progress(event, data)
+        except Exception as e:
+            logger.warning(f"Progress callback failed for {event}: {str(e)}")
+
+    async def _warm_confirmation_cache(self) -> None:
+        """
+        Reload the confirmation cache after a run; a failure only costs cache hits.
+        """
+        try:
+            await self.confirmation_manager.warm_cache()
+        except Exception as e:
+            logger.warning(f"Could not warm the confirmation cache: {str(e)}")
+
+    def _prepare_confirmations(self, appointments: List[Tuple], already_prompted: Optional[Set[str]] = None
+                               ) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """
+        Parse appointments into per-appointment results and the confirmations to store.
+        Appointments whose key is in `already_prompted` are skipped.
+
+        :return: (results in calendar order, key -> confirmation data)
+        """
+        results: List[Dict[str, Any]] = []
+        confirmations: Dict[str, Dict[str, Any]] = {}
+        for appointment in appointments:
+            summary, description, start_time = appointment[:3]
+            # Full start datetime, when the calendar provides an Appointment
+            start_at = getattr(appointment, "start", None)
+            result: Dict[str, Any] = {"summary": summary, "start_time": start_time, "status": "skipped"}
+            results.append(result)
+            try:
+                customer_number = self.extract_phone_number(description)
+                customer_name = self._extract_customer_name(summary)
+                result["customer_name"] = customer_name
+
+                if not customer_number:
+                    result["reason"] = "no phone number"
+                    logger.warning(f"No phone number found for appointment: {summary} at {start_time}")
+                    continue
+
+                # Unique key with phone number + start_time
+                key = f"{customer_number}${start_time}"
+                if key in confirmations:
+                    result["reason"] = "duplicate appointment"
+                    logger.warning(f"Duplicate appointment for {customer_name} at {start_time}")
+                    continue
+                if already_prompted and key in already_prompted:
+                    # Stored and sent by an earlier run; storing it again could revive a handled reply
+                    result["key"] = key
+                    result["reason"] = "already prompted"
+                    continue
+
+                confirmations[key] = {
+                    "customer_name": customer_name,
+                    "customer_number": customer_number,
+                    "start_time": start_time,
+                    "start_at": start_at,
+                }
+                result["key"] = key
+                result["status"] = "stored"
+
+            except Exception as e:
+                result["status"] = "failed"
+                result["error"] = str(e)
+                logger.error(f"Error processing appointment {summary}: {str(e)}")
+        return results, confirmations
+
+    async def _store_confirmations(self, results: List[Dict[str, Any]],
+                                   confirmations: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Store all pending confirmations in one bulk write; results whose
+        confirmation could not be stored are marked as failed.
+        """
+        if not confirmations:
+            return
+        try:
+            report = await self.confirmation_manager.add_confirmations_bulk(confirmations)
+            statuses, errors = report["keys"], report["errors"]
+        except Exception as e:
+            logger.error(f"Error storing pending confirmations: {str(e)}")
+            statuses, errors = {key: "failed" for key in confirmations}, {key: str(e) for key in confirmations}
+
+        for result in results:
+            key = result.get("key")
+            if key and result["status"] == "stored" and statuses.get(key, "failed") == "failed":
+                result["status"] = "failed"
+                result["error"] = errors.get(key, "confirmation not stored")
+
+    async def _send_request(self, semaphore: asyncio.Semaphore, result: Dict[str, Any],
+                            progress: Optional[Progress] = None) -> None:
+        """
+        Ask the operator for approval of one stored confirmation.
+        Never raises; the outcome is recorded in `result`.
+        """
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await self.messaging_service.send_confirmation_request(result["start_time"], result["customer_name"])
+                result["status"] = "processed"
+                logger.info(f"Added confirmation request for {result['customer_name']} at {result['start_time']}")
+            except Exception as e:
+                result["status"] = "failed"
+                result["error"] = str(e)
+                logger.error(f"Error processing appointment {result['summary']}: {str(e)}")
+            finally:
+                result["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                self._emit(progress, "sent", {k: result.get(k) for k in ("summary", "start_time", "status")})
+
     @staticmethod
     def extract_phone_number(description: str) -> Optional[str]:
         """
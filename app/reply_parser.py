@@ -0,0 +1,74 @@
+"""
+Parsing of operator replies to confirmation requests.
+Extracts the yes/no intent and the appointment times mentioned in a WhatsApp message.
+"""
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+YES_CONFIRMATION = "yes_confirmation"
+NO_CONFIRMATION = "no_confirmation"
+
+YES_WORDS = frozenset({"כן", "y", "yes", "ok", "approve", "אשר", "מאשר", "מאשרת"})
+NO_WORDS = frozenset({"לא", "n", "no", "cancel", "בטל", "ביטול"})
+
+# One token per match: a time ("9:30", "09:30", "9.30" - not part of a longer number
+# such as "110:00" or "10:000") or a word made of letters only
+_TOKEN_RE = re.compile(r"(?<!\d)(?P<hour>[01]?\d|2[0-3])[:.](?P<minute>[0-5]\d)(?!\d)|(?P<word>[^\W\d_]+)")
+
+
+class ParsedReply(NamedTuple):
+    """
+    Intent and times found in a reply.
+    action: YES_CONFIRMATION / NO_CONFIRMATION / None
+    times: zero-padded "HH:MM" strings, in message order, without duplicates
+    """
+    action: Optional[str]
+    times: List[str]
+
+
+def parse_reply(text: str) -> ParsedReply:
+    """
+    Parse a reply such as "כן", "לא 14:30" or "yes 9:30, 11:00" in one pass.
+
+    Apart from times, numbers and punctuation the message must consist only of yes
+    words or only of no words; anything else ("לא בטוח") has no intent.
+    """
+    times: List[str] = []
+    words = set()
+    for m in _TOKEN_RE.finditer((text or "").lower()):
+        if m.group("word"):
+            words.add(m.group("word"))
+            continue
+        hhmm = f"{int(m.group('hour')):02d}:{m.group('minute')}"
+        if hhmm not in times:
+            times.append(hhmm)
+
+    action = None
+    if words and words <= YES_WORDS:
+        action = YES_CONFIRMATION
+    elif words and words <= NO_WORDS:
+        action = NO_CONFIRMATION
+    return ParsedReply(action, times)
+
+
+def build_time_index(pending: Iterable[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Map "HH:MM" -> pending confirmation documents at that time (in input order).
+    """
+    index: Dict[str, List[Dict[str, Any]]] = {}
+    for doc in pending:
+        hhmm = doc.get("time_hhmm")
+        if hhmm:
+            index.setdefault(hhmm, []).append(doc)
+    return index
+
+
+def match_pending(times: Iterable[str], time_index: Dict[str, List[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """
+    Return the pending confirmation for the first mentioned time that has one.
+    """
+    for hhmm in times:
+        docs = time_index.get(hhmm)
+        if docs:
+            return docs[0]
+    return None
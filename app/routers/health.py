@@ -1,5 +1,5 @@
 import logging
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 
 logging.basicConfig(level=logging.INFO)
 
@@ -9,3 +9,59 @@ router = APIRouter()
 async def health_check():
     logging.info("Health check endpoint was called")
     return {"status": "ok"}
+
+@router.get("/health/wa-pool")
+async def wa_pool_stats():
+    """
+    Connection pool statistics for the WhatsApp adapter client.
+    """
+    services = getattr(router, "services", None)
+    if not services:
+        raise HTTPException(status_code=500, detail="services not initialized")
+    return services["messaging_service"].pool_stats()
+
+@router.get("/health/indexes")
+async def index_report():
+    """
+    Which pending_confirmations indexes exist and whether their build has finished.
+    """
+    services = getattr(router, "services", None)
+    if not services:
+        raise HTTPException(status_code=500, detail="services not initialized")
+    return await services["confirmation_manager"].index_report()
+
+@router.get("/health/outbox")
+async def outbox_stats():
+    """
+    Queue depth, send counters and send latency of the WhatsApp outbox.
+    """
+    services = getattr(router, "services", None)
+    if not services:
+        raise HTTPException(status_code=500, detail="services not initialized")
+    outbox = services.get("outbox")
+    if outbox is None:
+        return {"enabled": False}
+    return {"enabled": True, **await outbox.stats()}
+
+@router.get("/health/scheduler")
+async def scheduler_status():
+    """
+    Next and last run times of the in-process daily check scheduler.
+    """
+    services = getattr(router, "services", None)
+    if not services:
+        raise HTTPException(status_code=500, detail="services not initialized")
+    scheduler = services.get("scheduler")
+    if scheduler is None:
+        return {"enabled": False}
+    return {"enabled": True, **scheduler.status()}
+
+@router.get("/health/startup")
+async def startup_report():
+    """
+    How long startup took, stage by stage, and the outcome of each warm-up step.
+    """
+    services = getattr(router, "services", None)
+    if not services or services.get("startup") is None:
+        raise HTTPException(status_code=500, detail="services not initialized")
+    return services["startup"].to_dict()
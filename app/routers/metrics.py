@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app import metrics
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def prometheus_metrics():
+    """
+    Prometheus metrics: latency of CalDAV, MongoDB and WhatsApp adapter calls,
+    webhook outcomes and daily check durations.
+    """
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE_LATEST)
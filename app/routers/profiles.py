@@ -0,0 +1,43 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import HTMLResponse, Response
+
+router = APIRouter()
+
+def _get_store(x_profile: Optional[str], profile: Optional[str]):
+    services = getattr(router, "services", None)
+    if not services:
+        raise HTTPException(status_code=500, detail="services not initialized")
+    store = services.get("profiles")
+    if store is None:
+        raise HTTPException(status_code=404, detail="profiling is disabled")
+    token = getattr(services["config"], "PROFILING_TOKEN", "") or ""
+    presented = x_profile or profile or ""
+    if not hmac.compare_digest(presented.encode(), token.encode()):
+        raise HTTPException(status_code=401, detail="bad token")
+    return store
+
+@router.get("/admin/profiles")
+async def list_profiles(x_profile: Optional[str] = Header(None), profile: Optional[str] = Query(None)):
+    """
+    Recently recorded request profiles, newest first.
+    """
+    return {"profiles": _get_store(x_profile, profile).list()}
+
+@router.get("/admin/profiles/{profile_id}")
+async def download_profile(profile_id: str, format: str = "speedscope",
+                           x_profile: Optional[str] = Header(None), profile: Optional[str] = Query(None)):
+    """
+    Download a profile as speedscope JSON (open it at https://www.speedscope.app)
+    or, with ?format=html, as an HTML flamegraph.
+    """
+    rendered = _get_store(x_profile, profile).render(profile_id, format)
+    if rendered is None:
+        raise HTTPException(status_code=404, detail="profile not found")
+    if format == "html":
+        return HTMLResponse(rendered)
+    return Response(rendered, media_type="application/json", headers={
+        "Content-Disposition": f'attachment; filename="profile-{profile_id}.speedscope.json"',
+    })
@@ -1,18 +1,79 @@
+import json
 import logging
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.profiling import is_profiling
 
 logging.basicConfig(level=logging.INFO)
 
 router = APIRouter()
 
 @router.post("/run-check")
-async def run_check():
+async def run_check(wait: bool = False, force: bool = False):
+    """
+    Start the daily check as a background job and return its ID right away (202).
+    Follow it with GET /run-check/{id} or the event stream GET /run-check/{id}/events.
+
+    While a check is running, another call joins it and gets the same job ID.
+    Once tomorrow's check has completed, calls return without sending anything again,
+    unless ?force=true.
+
+    With ?wait=true the request waits for the check to finish and returns its summary.
+    Profiled requests always wait, so the profile covers the whole check.
+    """
     logging.info("Run check endpoint was called")
     bot = router.services["bot"]
-    try:
-        await bot.run_daily_check()
-        logging.info("Daily check completed successfully")
-        return {"status": "Check completed successfully"}
-    except Exception as e:
-        logging.error(f"Error during run-check: {e}")
-        return {"status": "error", "message": str(e)}
+    jobs = router.services["jobs"] if not (wait or is_profiling()) else None
+
+    if jobs is None:
+        try:
+            summary = await bot.run_once(force=force)
+            logging.info("Daily check completed successfully")
+            return {"status": "Check completed successfully", "summary": summary}
+        except Exception as e:
+            logging.error(f"Error during run-check: {e}")
+            return {"status": "error", "message": str(e)}
+
+    job = jobs.running("daily_check")
+    joined = job is not None
+    if joined:
+        logging.info(f"Daily check already running as job {job.id}; joining it")
+    else:
+        job = jobs.start("daily_check", lambda emit: bot.run_once(force=force, progress=emit))
+        logging.info(f"Daily check started as job {job.id}")
+    return JSONResponse(status_code=202, content={
+        "status": "accepted",
+        "job_id": job.id,
+        "joined": joined,
+        "status_url": f"/run-check/{job.id}",
+        "events_url": f"/run-check/{job.id}/events",
+    })
+
+def _get_job(job_id: str):
+    jobs = router.services["jobs"]
+    job = jobs.get(job_id) if jobs is not None else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job
+
+@router.get("/run-check/{job_id}")
+async def run_check_status(job_id: str):
+    """
+    Status, per-stage timings and (when finished) the summary of a daily check job.
+    """
+    return _get_job(job_id).to_dict()
+
+@router.get("/run-check/{job_id}/events")
+async def run_check_events(job_id: str):
+    """
+    Server-sent events with the progress of a daily check job; ends when the job finishes.
+    """
+    job = _get_job(job_id)
+
+    async def event_source():
+        async for record in job.stream():
+            yield f"event: {record['event']}\ndata: {json.dumps(record, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(event_source(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
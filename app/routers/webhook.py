@@ -2,10 +2,17 @@
 import logging
 import os
 import re
-from typing import Any, Dict, Optional
+import time
+from datetime import datetime
+from typing import Any, Dict
 
+import pytz
 from fastapi import APIRouter, Header, HTTPException, Request
 
+from app.metrics import WEBHOOK_REQUESTS, observe_reply
+from app.profiling import is_profiling
+from app.reply_parser import ParsedReply, build_time_index, match_pending, parse_reply
+
 router = APIRouter()
 log = logging.getLogger(__name__)
 
@@ -19,19 +26,6 @@ def _normalize_msisdn(from_field: str) -> str:
     return re.sub(r"\D", "", from_field or "")
 
 
-def _infer_action_from_text(text: str) -> Optional[str]:
-    """
-    Map free-text replies to yes/no actions (Hebrew & English).
-    Returns 'yes_confirmation' / 'no_confirmation' / None.
-    """
-    t = (text or "").strip().lower()
-    if t in {"כן", "כן.", "y", "yes", "ok", "approve", "אשר", "מאשר", "מאשרת"}:
-        return "yes_confirmation"
-    if t in {"לא", "לא.", "n", "no", "cancel", "בטל", "ביטול"}:
-        return "no_confirmation"
-    return None
-
-
 @router.post("/webhook/wa")
 async def wa_inbound(request: Request, x_token: str = Header(None)) -> Dict[str, Any]:
     """
@@ -41,20 +35,33 @@ async def wa_inbound(request: Request, x_token: str = Header(None)) -> Dict[str,
       - Requires header: X-Token = WA_SHARED_SECRET (must match backend config)
 
     Behavior:
-      - If a button payload is received, parse 'button.id' -> "<action>$<appointment_time>"
-      - If a text payload is received, try to infer yes/no from the text
-      - When action is determined, look up the pending confirmation by key "<from_number>$<appointment_time>"
-      - If found and action is 'yes_confirmation' -> send patient reminder + ack to operator
-        else -> send decline ack to operator
+      - Messages whose WhatsApp message ID ("id") was already seen are dropped
+      - The text is parsed for a yes/no intent and appointment times; other text is ignored
+      - Replies are queued on the webhook dispatcher and answered immediately with
+        {"status": "queued"}; a full queue answers 429 so the adapter can retry later
+      - Without a running dispatcher (e.g. in tests), or when the request is being
+        profiled, the reply is processed inline, see process_reply()
     """
+    status = "error"
+    try:
+        result = await _handle_inbound(request, x_token)
+        status = result.get("status", "ok")
+        return result
+    except HTTPException as e:
+        status = str(e.status_code)
+        raise
+    finally:
+        WEBHOOK_REQUESTS.labels(status).inc()
+
+
+async def _handle_inbound(request: Request, x_token: str) -> Dict[str, Any]:
+    """Body of wa_inbound()."""
     # Access shared services (set this in app startup code)
     services = getattr(router, "services", None)
     if not services:
         raise HTTPException(status_code=500, detail="services not initialized")
 
     config = services["config"]
-    confirmation_manager = services["confirmation_manager"]
-    messaging_service = services["messaging_service"]
 
     # Validate shared secret
     shared = getattr(config, "WA_SHARED_SECRET", None) or os.getenv("WA_SHARED_SECRET")
@@ -64,84 +71,93 @@ async def wa_inbound(request: Request, x_token: str = Header(None)) -> Dict[str,
     payload = await request.json()
     log.info("WA inbound payload: %s", payload)
 
+    # Redelivered messages (e.g. after an adapter reconnect) stop here
+    message_id = payload.get("id")
+    dedup = services.get("inbound_dedup")
+    if message_id and dedup is not None and await dedup.seen(message_id):
+        log.info(f"Duplicate inbound message {message_id} ignored")
+        return {"status": "duplicate", "id": message_id}
+
     from_raw = payload.get("from", "")
     from_number = _normalize_msisdn(from_raw)
     if not from_number:
         return {"status": "ignored", "reason": "missing from"}
 
-    # Text message handling: try to infer action from text
-    action = _infer_action_from_text(payload.get("text", ""))
-    if not action:
-        log.info(f"Unrecognized text message: {payload.get('text', '')}")
+    # Text message handling: intent and mentioned times in one pass
+    message_text = payload.get("text", "")
+    reply = parse_reply(message_text)
+    if not reply.action:
+        log.info(f"Unrecognized text message: {message_text}")
         return {"status": "ignored", "reason": "unrecognized text"}
     
-    log.info(f"Detected action '{action}' from text: {payload.get('text', '')}")
-    appointment_time: Optional[str] = None
-
-    # For text responses, we need to find all pending confirmations 
-    # and match them by checking if any appointment_time appears in the message text
-    all_keys = []
-    cursor = confirmation_manager.collection.find({})
-    async for doc in cursor:
-        all_keys.append(doc["key"])
-    
-    if not all_keys:
+    log.info(f"Detected action '{reply.action}' from text: {message_text}")
+
+    # A profiled request skips the queue so the lookup, claim and sends land in its profile
+    dispatcher = services.get("webhook_dispatcher")
+    if dispatcher is not None and dispatcher.running and not is_profiling():
+        if not dispatcher.submit(from_number, reply):
+            # The adapter will retry this message; let the retry through
+            if message_id and dedup is not None:
+                await dedup.forget(message_id)
+            raise HTTPException(status_code=429, detail="webhook queue full", headers={"Retry-After": "1"})
+        return {"status": "queued"}
+
+    return await process_reply(services, from_number, reply)
+
+
+async def process_reply(services: Dict[str, Any], from_number: str, reply: ParsedReply) -> Dict[str, Any]:
+    """
+    Act on an operator reply (see _act_on_reply()) and record its duration by outcome.
+    """
+    started = time.perf_counter()
+    status = "error"
+    try:
+        result = await _act_on_reply(services, from_number, reply)
+        status = result.get("status", "ok")
+        return result
+    finally:
+        observe_reply(status, time.perf_counter() - started)
+
+
+async def _act_on_reply(services: Dict[str, Any], from_number: str, reply: ParsedReply) -> Dict[str, Any]:
+    """
+    Act on an operator reply.
+
+      - Look up the operator's pending confirmations from today on (in TIMEZONE) and pick
+        the one whose time was mentioned (or the only one); with several candidates, ask
+        the operator to clarify
+      - The confirmation is claimed atomically (find_one_and_delete), so duplicate replies
+        cannot send the customer reminder twice
+      - If claimed and action is 'yes_confirmation' -> send patient reminder + ack to operator
+        else -> send decline ack to operator
+    """
+    confirmation_manager = services["confirmation_manager"]
+    messaging_service = services["messaging_service"]
+    action = reply.action
+
+    # One indexed query returns every pending confirmation of this operator
+    # with the fields needed below (no per-key lookups). Rows for days that already
+    # passed (kept until the TTL removes them) must not match "כן 10:00" for today.
+    today = datetime.now(pytz.timezone(getattr(services["config"], "TIMEZONE", "UTC"))).date()
+    pending = await confirmation_manager.find_pending(operator=from_number, from_day=today)
+    if not pending:
         return {"status": "ignored", "reason": "no pending confirmations"}
-    
-    # Try to extract time from the user's message (like "כן 10:00" or "לא 14:30")
-    message_text = payload.get("text", "")
-    time_match = None
-    for key in all_keys:
-        try:
-            customer_num, key_time = key.split("$", 1)
-            # Extract just the hour:minute part from the full datetime
-            # key_time might be like "2025-01-30T11:00:00" or just "11:00"
-            if "T" in key_time:
-                # ISO format: extract time part after T and before any timezone
-                time_part = key_time.split("T")[1].split("+")[0].split("-")[0].split("Z")[0]
-                # Take only HH:MM
-                short_time = ":".join(time_part.split(":")[:2])
-            else:
-                # Assume it's already in short format
-                short_time = key_time
-            
-            # Check if the short time appears in the message
-            if short_time in message_text:
-                appointment_time = key_time
-                time_match = True
-                log.info(f"Time match found: {short_time} in message: {message_text}")
-                break
-        except Exception as e:
-            log.warning(f"Error parsing time from key {key}: {str(e)}")
-            continue
-    
-    if not time_match:
-        if len(all_keys) > 1:
+
+    # Match the times in the message (like "כן 10:00" or "לא 14:30") against the pending times
+    match = match_pending(reply.times, build_time_index(pending))
+    if match:
+        log.info(f"Time match found: {match.get('time_hhmm')} in reply from {from_number}")
+
+    if not match:
+        if len(pending) > 1:
             # Multiple pending - send list to user to clarify
-            appointments_list = []
-            for key in all_keys:
-                try:
-                    customer_num, time_part = key.split("$", 1)
-                    
-                    # Extract short time format for display
-                    if "T" in time_part:
-                        # ISO format: extract time part after T
-                        time_display = time_part.split("T")[1].split("+")[0].split("-")[0].split("Z")[0]
-                        # Take only HH:MM
-                        short_time_display = ":".join(time_display.split(":")[:2])
-                    else:
-                        short_time_display = time_part
-                    
-                    # Get customer name from database
-                    confirmation = await confirmation_manager.collection.find_one({"key": key})
-                    customer_name = confirmation.get("customer_name", "Unknown") if confirmation else "Unknown"
-                    appointments_list.append(f"• {short_time_display} - {customer_name}")
-                except Exception as e:
-                    log.warning(f"Error formatting appointment list item for key {key}: {str(e)}")
-                    continue
-            
+            appointments_list = [
+                f"• {doc.get('time_hhmm') or doc.get('appointment_time')} - {doc.get('customer_name', 'Unknown')}"
+                for doc in pending
+            ]
+
             clarification_text = (
-                f"📋 נמצאו {len(all_keys)} טיפולים הממתינים לאישור:\n\n"
+                f"📋 נמצאו {len(pending)} טיפולים הממתינים לאישור:\n\n"
                 + "\n".join(appointments_list) + 
                 "\n\n💡 אנא ציין/י את השעה המדויקת עם התשובה, למשל:\n"
                 "*כן 10:00* או *לא 14:30*"
@@ -149,36 +165,21 @@ async def wa_inbound(request: Request, x_token: str = Header(None)) -> Dict[str,
             
             await messaging_service.send_acknowledgement("", "", clarification_text)
             return {"status": "multiple_pending", "reason": "sent clarification message"}
-        else:
-            # Single pending confirmation - use it
-            try:
-                _, appointment_time = all_keys[0].split("$", 1)
-            except Exception:
-                return {"status": "ignored", "reason": "invalid pending key format"}
+        # Single pending confirmation - use it
+        match = pending[0]
 
-    # Must have both action & appointment_time by here
-    if not action or not appointment_time:
-        return {"status": "ignored", "reason": "missing action or appointment_time"}
+    matching_key = match.get("key")
+    appointment_time = match.get("appointment_time")
 
-    # Find the correct key by appointment_time since keys are stored as customer_number$appointment_time
-    matching_key = None
-    cursor = confirmation_manager.collection.find({})
-    async for doc in cursor:
-        try:
-            stored_key = doc["key"]
-            _, stored_time = stored_key.split("$", 1)
-            if stored_time == appointment_time:
-                matching_key = stored_key
-                break
-        except Exception:
-            continue
-    
-    if not matching_key:
-        return {"status": "ignored", "reason": "no matching confirmation for appointment time"}
+    # Must have both action & appointment_time by here
+    if not matching_key or not appointment_time:
+        return {"status": "ignored", "reason": "invalid pending confirmation"}
 
-    reminder = await confirmation_manager.get_confirmation(matching_key)
+    # Atomically take ownership of the confirmation (one round trip); a concurrent
+    # reply for the same key gets None here and does nothing
+    reminder = await confirmation_manager.claim_confirmation(matching_key)
     if not reminder:
-        return {"status": "ignored", "reason": "failed to retrieve confirmation"}
+        return {"status": "ignored", "reason": "already handled", "key": matching_key}
         
     customer_name = reminder.get("customer_name", "Unknown")
     customer_number = reminder.get("customer_number")
@@ -186,13 +187,15 @@ async def wa_inbound(request: Request, x_token: str = Header(None)) -> Dict[str,
 
     if action == "yes_confirmation":
         # Send reminder to patient, then ack to operator
-        await messaging_service.send_customer_whatsapp_reminder(customer_number, start_time)
+        try:
+            await messaging_service.send_customer_whatsapp_reminder(customer_number, start_time)
+        except Exception:
+            # Put the confirmation back so the operator can reply again
+            await confirmation_manager.add_confirmation(matching_key, reminder)
+            raise
         await messaging_service.send_acknowledgement(customer_name, appointment_time, action)
-        # Delete confirmation now that it's handled
-        await confirmation_manager.delete_confirmation(matching_key)
         return {"status": "reminder_sent", "key": matching_key}
 
     # Decline path: send ack only
     await messaging_service.send_acknowledgement(customer_name, appointment_time, action)
-    await confirmation_manager.delete_confirmation(matching_key)
-    return {"status": "declined", "key": matching_key}
\ No newline at end of file
+    return {"status": "declined", "key": matching_key}
@@ -0,0 +1,158 @@
+"""
+DailyScheduler runs the daily check inside the app process.
+Tomorrow's calendar is fetched a few minutes before the send time, so the run itself
+does not wait on CalDAV.
+"""
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEND_TIME = "20:00"
+DEFAULT_PREFETCH_MINUTES = 10
+# A late job still runs if it is at most this many seconds behind schedule
+MISFIRE_GRACE_SECONDS = 15 * 60
+
+
+def parse_hhmm(value: str) -> Tuple[int, int]:
+    """
+    Parse "HH:MM" into (hour, minute).
+    """
+    hour, minute = (int(part) for part in value.strip().split(":", 1))
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"invalid time of day: {value!r}")
+    return hour, minute
+
+
+class DailyScheduler:
+    """
+    Two cron jobs in the configured timezone:
+      - "prefetch" at send time minus `prefetch_minutes`: fetch and parse tomorrow's appointments
+      - "daily_check" at send time: run the bot with the prefetched appointments
+        (or let it fetch itself if the prefetch failed or is for another day)
+    """
+
+    def __init__(self, bot, calendar_service, timezone: str, send_time: str = DEFAULT_SEND_TIME,
+                 prefetch_minutes: int = DEFAULT_PREFETCH_MINUTES):
+        """
+        :param bot: ReminderBot whose run_once() is triggered.
+        :param calendar_service: CalendarService used for the prefetch.
+        :param timezone: Timezone name the send time refers to (e.g. "Asia/Jerusalem").
+        :param send_time: "HH:MM" at which the operator's messages go out.
+        :param prefetch_minutes: How long before the send time the calendar is fetched (0 = no prefetch).
+        """
+        self.bot = bot
+        self.calendar_service = calendar_service
+        self.timezone = timezone
+        self.send_time = send_time
+        self.prefetch_minutes = max(0, prefetch_minutes)
+        self.scheduler = AsyncIOScheduler(timezone=timezone)
+
+        self._prefetched: Optional[Tuple[date, List[Tuple]]] = None
+        self.last_prefetch: Optional[Dict[str, Any]] = None
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    # ---------- Lifecycle ----------
+
+    def start(self) -> None:
+        """
+        Register the jobs and start the scheduler (must be called inside the event loop).
+        """
+        hour, minute = parse_hhmm(self.send_time)
+        job_options = {"coalesce": True, "max_instances": 1, "misfire_grace_time": MISFIRE_GRACE_SECONDS}
+        self.scheduler.add_job(
+            self.run_daily_check, CronTrigger(hour=hour, minute=minute, timezone=self.timezone),
+            id="daily_check", replace_existing=True, **job_options,
+        )
+        if self.prefetch_minutes:
+            prefetch_at = datetime(2000, 1, 1, hour, minute) - timedelta(minutes=self.prefetch_minutes)
+            self.scheduler.add_job(
+                self.prefetch, CronTrigger(hour=prefetch_at.hour, minute=prefetch_at.minute, timezone=self.timezone),
+                id="prefetch", replace_existing=True, **job_options,
+            )
+        self.scheduler.start()
+        logger.info(f"Scheduler started: daily check at {self.send_time} {self.timezone}, "
+                    f"prefetch {self.prefetch_minutes} minutes before")
+
+    def shutdown(self) -> None:
+        """
+        Stop the scheduler without waiting for running jobs.
+        """
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+
+    # ---------- Jobs ----------
+
+    async def prefetch(self) -> None:
+        """
+        Fetch and parse tomorrow's appointments and keep them for the next run.
+        """
+        started = time.perf_counter()
+        target = self._tomorrow()
+        record: Dict[str, Any] = {"at": datetime.now().astimezone().isoformat(), "for_date": target.isoformat()}
+        try:
+            appointments = await self.calendar_service.fetch_tomorrow_appointments(with_start=True, strict=True)
+            self._prefetched = (target, appointments)
+            record["appointments"] = len(appointments)
+            logger.info(f"Prefetched {len(appointments)} appointments for {target}")
+        except Exception as e:
+            self._prefetched = None
+            record["error"] = str(e)
+            logger.error(f"Calendar prefetch failed, the daily check will fetch itself: {e}")
+        finally:
+            record["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            self.last_prefetch = record
+
+    async def run_daily_check(self) -> None:
+        """
+        Run the bot, using the prefetched appointments when they are for tomorrow.
+        """
+        started = time.perf_counter()
+        record: Dict[str, Any] = {"at": datetime.now().astimezone().isoformat(), "prefetched": False}
+        appointments = None
+        if self._prefetched and self._prefetched[0] == self._tomorrow():
+            appointments = self._prefetched[1]
+            record["prefetched"] = True
+        self._prefetched = None
+
+        try:
+            summary = await self.bot.run_once(appointments=appointments)
+            record.update({k: summary.get(k) for k in ("run", "total", "processed", "skipped", "failed")})
+            record["timings_ms"] = summary.get("timings_ms")
+        except Exception as e:
+            record["error"] = str(e)
+            logger.error(f"Scheduled daily check failed: {e}")
+        finally:
+            record["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            self.last_run = record
+
+    # ---------- Status ----------
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Next and last run times of the scheduled jobs.
+        """
+        next_runs = {}
+        for job_id in ("prefetch", "daily_check"):
+            job = self.scheduler.get_job(job_id) if self.scheduler.running else None
+            next_run = getattr(job, "next_run_time", None)
+            next_runs[job_id] = next_run.isoformat() if next_run else None
+        return {
+            "running": self.scheduler.running,
+            "timezone": self.timezone,
+            "send_time": self.send_time,
+            "prefetch_minutes": self.prefetch_minutes,
+            "next_prefetch": next_runs["prefetch"],
+            "next_run": next_runs["daily_check"],
+            "last_prefetch": self.last_prefetch,
+            "last_run": self.last_run,
+        }
+
+    def _tomorrow(self) -> date:
+        """Tomorrow's date in the calendar's timezone."""
+        return self.calendar_service.get_tomorrow_time()[0].date()
@@ -0,0 +1,108 @@
+"""
+Startup timing and the warm-up phase run from the FastAPI lifespan.
+
+Warm-up steps (index creation, migrations, cache loading, optional CalDAV discovery)
+are independent of each other, so they run concurrently; each is timed and a failing
+step is logged without affecting the others.
+"""
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+WarmupStep = Callable[[], Awaitable[Any]]
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+class StartupReport:
+    """
+    Durations of the startup stages and warm-up steps, in milliseconds.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.warmup: Dict[str, Dict[str, Any]] = {}
+        self.ready_ms: Optional[float] = None
+        self.warmup_ms: Optional[float] = None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a startup stage."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = _ms(time.perf_counter() - started)
+
+    def ready(self) -> None:
+        """Mark the app as ready to serve requests."""
+        self.ready_ms = _ms(time.perf_counter() - self.started)
+        logger.info(f"Startup finished in {self.ready_ms}ms: {self.stages}")
+
+    async def warm_up(self, steps: Dict[str, WarmupStep]) -> None:
+        """
+        Run the warm-up steps concurrently and record how long each took.
+        """
+        started = time.perf_counter()
+
+        async def run(name: str, step: WarmupStep) -> None:
+            step_started = time.perf_counter()
+            record: Dict[str, Any] = {"status": "ok"}
+            try:
+                result = await step()
+                if result is not None:
+                    record["result"] = result
+            except Exception as e:
+                record.update(status="error", error=str(e))
+                logger.error(f"Warm-up step {name} failed: {e}")
+            finally:
+                record["duration_ms"] = _ms(time.perf_counter() - step_started)
+                self.warmup[name] = record
+
+        await asyncio.gather(*(run(name, step) for name, step in steps.items()))
+        self.warmup_ms = _ms(time.perf_counter() - started)
+        logger.info(f"Warm-up finished in {self.warmup_ms}ms: "
+                    f"{ {name: r['duration_ms'] for name, r in self.warmup.items()} }")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-friendly report."""
+        return {
+            "ready_ms": self.ready_ms,
+            "stages_ms": self.stages,
+            "warmup_ms": self.warmup_ms,
+            "warmup": self.warmup,
+        }
+
+
+def warmup_steps(services: Dict[str, Any]) -> Dict[str, WarmupStep]:
+    """
+    The warm-up steps for the given services. Work that depends on other work
+    (loading the cache after migrating documents) runs in one step.
+    """
+    config = services["config"]
+    confirmation_manager = services["confirmation_manager"]
+
+    async def pending_confirmations_cache() -> Dict[str, Any]:
+        migrated = await confirmation_manager.migrate_legacy_documents()
+        await confirmation_manager.warm_cache()
+        return {"migrated": migrated}
+
+    steps: Dict[str, WarmupStep] = {
+        "pending_confirmations_indexes": confirmation_manager.ensure_indexes,
+        "pending_confirmations_cache": pending_confirmations_cache,
+        "daily_runs": services["daily_runs"].ensure_indexes,
+        "inbound_dedup": services["inbound_dedup"].ensure_indexes,
+    }
+    outbox = services.get("outbox")
+    if outbox is not None:
+        steps["outbox_indexes"] = outbox.ensure_indexes
+    if getattr(config, "CALDAV_WARMUP", False):
+        steps["caldav"] = services["calendar_service"].warm_up
+    return steps
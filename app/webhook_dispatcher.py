@@ -0,0 +1,117 @@
+"""
+WebhookDispatcher processes inbound WhatsApp messages in the background.
+The webhook only validates and enqueues, so the adapter gets its answer right away.
+"""
+import asyncio
+import logging
+import zlib
+from typing import Any, Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 100
+DEFAULT_DRAIN_TIMEOUT = 10.0
+
+# Handler signature: (sender, item) -> awaitable
+Handler = Callable[[str, Any], Awaitable[Any]]
+
+
+class WebhookDispatcher:
+    """
+    A fixed pool of asyncio workers, each draining its own bounded queue.
+
+    Messages are sharded by sender, so all messages of one sender are handled by the
+    same worker in arrival order, while different senders are processed in parallel.
+    """
+
+    def __init__(self, handler: Handler, workers: int = DEFAULT_WORKERS,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, drain_timeout: float = DEFAULT_DRAIN_TIMEOUT):
+        """
+        :param handler: Coroutine function called as handler(sender, item) for every message.
+        :param workers: Number of worker tasks (and queues).
+        :param queue_size: Maximum number of waiting messages per worker.
+        :param drain_timeout: Seconds to wait for queued messages on shutdown.
+        """
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.drain_timeout = drain_timeout
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self._accepting = False
+        self.stats = {"accepted": 0, "rejected": 0, "processed": 0, "failed": 0}
+
+    @property
+    def running(self) -> bool:
+        """
+        True while workers run and new messages are accepted (not while draining).
+        """
+        return self._accepting and bool(self._tasks)
+
+    def start(self) -> None:
+        """
+        Create the queues and worker tasks (must be called inside the event loop).
+        """
+        if self._tasks:
+            return
+        self._queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(self.workers)]
+        self._tasks = [
+            asyncio.create_task(self._worker(queue), name=f"webhook-worker-{i}")
+            for i, queue in enumerate(self._queues)
+        ]
+        self._accepting = True
+        logger.info(f"Webhook dispatcher started with {self.workers} workers")
+
+    def submit(self, sender: str, item: Any) -> bool:
+        """
+        Queue a message for processing.
+
+        :return: False if the sender's queue is full (the caller should answer 429).
+        """
+        queue = self._queues[zlib.crc32(sender.encode()) % len(self._queues)]
+        try:
+            queue.put_nowait((sender, item))
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            logger.warning(f"Webhook queue full, rejecting message from {sender}")
+            return False
+        self.stats["accepted"] += 1
+        return True
+
+    def queued(self) -> int:
+        """
+        Number of messages waiting in all queues.
+        """
+        return sum(queue.qsize() for queue in self._queues)
+
+    async def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Let the workers finish the queued messages, then stop them.
+        Workers still busy after `timeout` seconds are cancelled.
+        """
+        if not self._tasks:
+            return
+        self._accepting = False
+        timeout = self.drain_timeout if timeout is None else timeout
+        try:
+            await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self._queues)), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Webhook dispatcher did not drain in {timeout}s; {self.queued()} messages dropped")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info(f"Webhook dispatcher stopped: {self.stats}")
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            sender, item = await queue.get()
+            try:
+                await self.handler(sender, item)
+                self.stats["processed"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(f"Error processing webhook message from {sender}: {e}")
+            finally:
+                queue.task_done()
@@ -5,10 +5,14 @@ Handles sending reminders, confirmations, and acknowledgements.
 """
 import logging
 import os
+import time
+import weakref
 from typing import Any, Optional, Dict
 
 import httpx
 
+from app.metrics import adapter_method, observe_adapter_request
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
@@ -16,6 +20,12 @@ logger.setLevel(logging.DEBUG)
 WA_ADAPTER_URL = os.getenv("WA_ADAPTER_URL", "http://wa-adapter:3001")
 WA_SHARED_SECRET = os.getenv("WA_SHARED_SECRET", "change_me_strong_shared_secret")
 
+# Connection pool defaults (override via app config)
+WA_HTTP_MAX_CONNECTIONS = 10
+WA_HTTP_MAX_KEEPALIVE = 5
+WA_HTTP_KEEPALIVE_EXPIRY = 30.0
+WA_HTTP2 = False
+
 
 def _to_msisdn(jid_or_number: str) -> str:
     """
@@ -32,11 +42,14 @@ class WhatsappMessagingService:
     Preserves the previous public API used by your app.
     """
 
-    def __init__(self, config: Any) -> None:
+    def __init__(self, config: Any, transport: Optional[httpx.AsyncBaseTransport] = None) -> None:
         """
         :param config: object/dict with:
             - MY_PHONE_NUMBER
             - REMINDER_BODY (format string supporting {start_time})
+            - WA_HTTP_MAX_CONNECTIONS / WA_HTTP_MAX_KEEPALIVE / WA_HTTP_KEEPALIVE_EXPIRY (pool limits)
+            - WA_HTTP2 (negotiate HTTP/2 with the adapter, requires the `h2` package)
+        :param transport: Optional httpx transport to use instead of the pooled default (tests).
         """
         # Keep the same fields you previously relied on:
         self.my_phone_number: Optional[str] = getattr(config, "MY_PHONE_NUMBER", None)
@@ -53,6 +66,97 @@ class WhatsappMessagingService:
         if not self.shared_token or self.shared_token == "change_me_strong_shared_secret":
             logger.warning("WA_SHARED_SECRET is not set to a strong value.")
 
+        # Pooled HTTP client, shared by every request this service makes
+        self.limits = httpx.Limits(
+            max_connections=getattr(config, "WA_HTTP_MAX_CONNECTIONS", WA_HTTP_MAX_CONNECTIONS),
+            max_keepalive_connections=getattr(config, "WA_HTTP_MAX_KEEPALIVE", WA_HTTP_MAX_KEEPALIVE),
+            keepalive_expiry=getattr(config, "WA_HTTP_KEEPALIVE_EXPIRY", WA_HTTP_KEEPALIVE_EXPIRY),
+        )
+        self.http2: bool = bool(getattr(config, "WA_HTTP2", WA_HTTP2))
+        if self.http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("WA_HTTP2 is enabled but the 'h2' package is not installed; using HTTP/1.1.")
+                self.http2 = False
+
+        self._transport: Optional[httpx.AsyncBaseTransport] = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._pool_transport: Optional[httpx.AsyncBaseTransport] = None
+        self._seen_streams: "weakref.WeakSet" = weakref.WeakSet()
+        self._stats: Dict[str, int] = {
+            "requests": 0,
+            "connections_opened": 0,
+            "connections_reused": 0,
+        }
+        # Optional Outbox; when attached, messages to the operator are enqueued instead of
+        # sent directly (customer reminders are always sent directly)
+        self.outbox = None
+
+    # ---------- Connection pool lifecycle ----------
+
+    async def start(self) -> None:
+        """Open the pooled HTTP client (called from the FastAPI lifespan)."""
+        self._get_client()
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client and release its connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("WhatsApp adapter HTTP pool closed")
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared client, creating it on first use."""
+        if self._client is None or self._client.is_closed:
+            transport = self._transport or httpx.AsyncHTTPTransport(limits=self.limits, http2=self.http2)
+            self._client = httpx.AsyncClient(transport=transport, timeout=20)
+            self._pool_transport = transport
+            logger.info(
+                "WhatsApp adapter HTTP pool opened (max_connections=%s, keepalive=%s, http2=%s)",
+                self.limits.max_connections, self.limits.max_keepalive_connections, self.http2,
+            )
+        return self._client
+
+    def _record_connection(self, resp: httpx.Response) -> None:
+        """Count whether a response was served over a new or a reused connection."""
+        self._stats["requests"] += 1
+        stream = resp.extensions.get("network_stream")
+        if stream is None:
+            return
+        try:
+            if stream in self._seen_streams:
+                self._stats["connections_reused"] += 1
+            else:
+                self._seen_streams.add(stream)
+                self._stats["connections_opened"] += 1
+        except TypeError:
+            # Stream type does not support weak references; skip reuse accounting
+            pass
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the adapter connection pool.
+        Returns counts of open/idle connections plus opened/reused totals since startup.
+        """
+        pool = getattr(self._pool_transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        idle = 0
+        for conn in connections:
+            try:
+                idle += 1 if conn.is_idle() else 0
+            except Exception:
+                continue
+        return {
+            "client_open": self._client is not None and not self._client.is_closed,
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "connections_open": len(connections),
+            "connections_idle": idle,
+            **self._stats,
+        }
+
     # ---------- Low-level HTTP helpers ----------
 
     async def _post(self, path: str, json: Dict) -> Dict:
@@ -61,13 +165,16 @@ class WhatsappMessagingService:
         headers = {"X-Token": self.shared_token}
         logger.debug("POST %s payload=%s", url, json)
         
+        started = time.perf_counter()
+        status = "error"
         try:
-            async with httpx.AsyncClient(timeout=20, headers=headers) as client:
-                resp = await client.post(url, json=json)
-                resp.raise_for_status()
-                data = resp.json()
-                logger.debug("Response %s -> %s", url, data)
-                return data
+            resp = await self._get_client().post(url, json=json, headers=headers)
+            status = str(resp.status_code)
+            self._record_connection(resp)
+            resp.raise_for_status()
+            data = resp.json()
+            logger.debug("Response %s -> %s", url, data)
+            return data
         except httpx.HTTPStatusError as e:
             logger.error("HTTP error %s for %s: %s", e.response.status_code, url, e.response.text)
             raise
@@ -77,19 +184,24 @@ class WhatsappMessagingService:
         except Exception as e:
             logger.error("Unexpected error calling WhatsApp adapter %s: %s", url, str(e))
             raise
+        finally:
+            observe_adapter_request(path, status, time.perf_counter() - started)
 
     async def _get(self, path: str) -> Dict:
         """Send GET request to WhatsApp adapter."""
         url = f"{self.base_url}{path}"
         logger.debug("GET %s", url)
         
+        started = time.perf_counter()
+        status = "error"
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                resp = await client.get(url)
-                resp.raise_for_status()
-                data = resp.json()
-                logger.debug("Response %s -> %s", url, data)
-                return data
+            resp = await self._get_client().get(url, timeout=10)
+            status = str(resp.status_code)
+            self._record_connection(resp)
+            resp.raise_for_status()
+            data = resp.json()
+            logger.debug("Response %s -> %s", url, data)
+            return data
         except httpx.HTTPStatusError as e:
             logger.error("HTTP error %s for %s: %s", e.response.status_code, url, e.response.text)
             raise
@@ -99,13 +211,17 @@ class WhatsappMessagingService:
         except Exception as e:
             logger.error("Unexpected error calling WhatsApp adapter %s: %s", url, str(e))
             raise
+        finally:
+            observe_adapter_request(path, status, time.perf_counter() - started)
 
     # ---------- Optional utilities you may use elsewhere ----------
 
+    @adapter_method
     async def health(self) -> Dict:
         """Check adapter readiness."""
         return await self._get("/health")
 
+    @adapter_method
     async def get_qr(self) -> Dict:
         """
         Get current QR if not logged in. Useful to render in an admin page.
@@ -113,8 +229,27 @@ class WhatsappMessagingService:
         """
         return await self._get("/qr")
 
+    # ---------- Sending ----------
+
+    @adapter_method
+    async def send_text(self, to: str, text: str) -> Dict:
+        """
+        Send a text message right away (used by the outbox to deliver queued messages).
+        """
+        return await self._post("/send/text", {"to": _to_msisdn(to), "text": text})
+
+    async def _send_text(self, to: str, text: str) -> None:
+        """
+        Deliver a text message through the outbox if one is attached, otherwise directly.
+        """
+        if self.outbox is not None:
+            await self.outbox.enqueue(_to_msisdn(to), text)
+        else:
+            await self.send_text(to, text)
+
     # ---------- Public API (same names as before) ----------
 
+    @adapter_method
     async def send_confirmation_request(self, appointment_time: str, customer_name: str) -> None:
         """
         Sends an approval prompt as text message to your own WhatsApp (MY_PHONE_NUMBER).
@@ -134,21 +269,20 @@ class WhatsappMessagingService:
             f"👤 לקוח: {customer_name}"
         )
 
-        payload = {
-            "to": _to_msisdn(self.my_phone_number),
-            "text": body_text
-        }
-
-        await self._post("/send/text", payload)
+        await self._send_text(self.my_phone_number, body_text)
 
+    @adapter_method
     async def send_customer_whatsapp_reminder(self, customer_number: str, appointment_time: str) -> None:
         """
         Sends a reminder text to the given customer number.
+
+        Always sent directly, even with an outbox: the caller acknowledges the reminder
+        to the operator (or puts the confirmation back) based on whether this returns.
         """
         text = self.reminder_body.format(start_time=appointment_time)
-        payload = {"to": _to_msisdn(customer_number), "text": text}
-        await self._post("/send/text", payload)
+        await self.send_text(customer_number, text)
 
+    @adapter_method
     async def send_acknowledgement(self, customer_name: str, appointment_time: str, user_response: str) -> None:
         """
         Sends an acknowledgement to your own WhatsApp indicating whether a reminder was sent.
@@ -168,23 +302,22 @@ class WhatsappMessagingService:
             # For other custom messages
             text_body = user_response
 
-        payload = {"to": _to_msisdn(self.my_phone_number), "text": text_body}
-        await self._post("/send/text", payload)
+        await self._send_text(self.my_phone_number, text_body)
 
+    @adapter_method
     async def send_no_appointments_message(self) -> None:
         """
         Notifies you that no appointments were found for tomorrow.
         """
         if not self.my_phone_number:
             raise ValueError("MY_PHONE_NUMBER is required to send notifications.")
-        payload = {"to": _to_msisdn(self.my_phone_number), "text": "לא נמצאו טיפולים למחר."}
-        await self._post("/send/text", payload)
+        await self._send_text(self.my_phone_number, "לא נמצאו טיפולים למחר.")
 
+    @adapter_method
     async def test(self) -> None:
         """
         Sends a simple test message to your own WhatsApp.
         """
         if not self.my_phone_number:
             raise ValueError("MY_PHONE_NUMBER is required to send test messages.")
-        payload = {"to": _to_msisdn(self.my_phone_number), "text": "This is a test message."}
-        await self._post("/send/text", payload)
\ No newline at end of file
+        await self._send_text(self.my_phone_number, "This is a test message.")
\ No newline at end of file
@@ -0,0 +1,164 @@
+"""
+Microbenchmarks for CalendarService's event-extraction path, without any network.
+
+Each scenario times one step of what happens to an event after it was downloaded:
+  - parse_vobject / parse_icalendar: parsing the iCalendar text (event.instance / event.icalendar_component)
+  - vevent_access: reading summary, description and dtstart from event.instance.vevent
+  - tz_convert: dtstart.astimezone(<configured timezone>)
+  - summary_filter: the appointment prefix check
+  - expand_recurrence: CalendarService._expand_recurrence on recurring events
+  - extract: _expand_recurrence + _extract_appointments on freshly downloaded events,
+    i.e. the per-event cost of get_tomorrow_appointments()
+
+    python -m benchmarks.calendar_parsing --sizes 100,1000,5000 --output parsing.json
+"""
+import argparse
+import datetime
+import json
+import sys
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import caldav
+import pytz
+
+from app.calendar_service import DEFAULT_APPOINTMENT_PREFIXES, CalendarService
+from benchmarks.common import DEFAULT_TOLERANCE, compare, report, summarize, write_json
+from benchmarks.ical_generator import GeneratedEvent, generate_events
+
+
+def _measure(items: Sequence[Any], func: Callable[[Any], Any], repeats: int,
+             setup: Optional[Callable[[Sequence[Any]], Sequence[Any]]] = None) -> Dict[str, Any]:
+    """
+    Time `func` over all items, `repeats` times. Latencies are per batch, throughput per item.
+    Exceptions are counted (by the item's kind when it has one) instead of stopping the run.
+    """
+    batches: List[float] = []
+    errors: Dict[str, int] = {}
+    for _ in range(repeats):
+        prepared = setup(items) if setup else items
+        started = time.perf_counter()
+        for item in prepared:
+            try:
+                func(item)
+            except Exception as e:
+                key = f"{getattr(item, 'kind', '')}:{type(e).__name__}".lstrip(":")
+                errors[key] = errors.get(key, 0) + 1
+        batches.append(time.perf_counter() - started)
+    stats = summarize(batches, elapsed_s=sum(batches), items=len(items) * repeats)
+    stats["items"] = len(items)
+    if errors:
+        stats["errors"] = {k: v // repeats for k, v in errors.items()}
+    return stats
+
+
+class _Downloaded(SimpleNamespace):
+    """A caldav.Event as it looks right after download, tagged with its generator kind."""
+
+
+def _download(events: Sequence[GeneratedEvent]) -> List[_Downloaded]:
+    return [
+        _Downloaded(kind=e.kind, event=caldav.Event(client=None, url=f"http://bench/cal/{e.uid}.ics", data=e.data))
+        for e in events
+    ]
+
+
+def run_size(calendar_service: CalendarService, events: List[GeneratedEvent], day: datetime.date,
+             repeats: int) -> Dict[str, Dict[str, Any]]:
+    """All scenarios for one set of events."""
+    tz = calendar_service.timezone
+    start = tz.localize(datetime.datetime.combine(day, datetime.time.min))
+    end = tz.localize(datetime.datetime.combine(day, datetime.time.max))
+    prefixes = calendar_service.appointment_prefixes
+
+    results = {
+        "parse_vobject": _measure(events, lambda e: e.event.instance.vevent, repeats, setup=_download),
+        "parse_icalendar": _measure(events, lambda e: e.event.icalendar_component, repeats, setup=_download),
+    }
+
+    parsed = _download(events)
+    vevents = []
+    for item in parsed:
+        vevents.append(SimpleNamespace(kind=item.kind, vevent=item.event.instance.vevent))
+
+    def access(item):
+        vevent = item.vevent
+        return getattr(vevent.summary, "value", ""), getattr(vevent.description, "value", ""), vevent.dtstart.value
+
+    results["vevent_access"] = _measure(vevents, access, repeats)
+
+    starts = [v.vevent.dtstart.value for v in vevents
+              if "dtstart" in v.vevent.contents and isinstance(v.vevent.dtstart.value, datetime.datetime)]
+    results["tz_convert"] = _measure(starts, lambda dt: dt.astimezone(tz), repeats)
+
+    summaries = [getattr(v.vevent.summary, "value", "") for v in vevents]
+    results["summary_filter"] = _measure(summaries, lambda s: s.lower().startswith(prefixes), repeats)
+
+    recurring = [e for e in events if e.kind == "recurring"]
+    if recurring:
+        def parsed_recurring(items):
+            downloaded = _download(items)
+            for item in downloaded:
+                item.event.icalendar_component
+            return downloaded
+
+        results["expand_recurrence"] = _measure(
+            recurring, lambda e: calendar_service._expand_recurrence(e.event, start, end), repeats,
+            setup=parsed_recurring,
+        )
+
+    def extract(item):
+        calendar_service._expand_recurrence(item.event, start, end)
+        return calendar_service._extract_appointments(item.event)
+
+    results["extract"] = _measure(events, extract, repeats, setup=_download)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,500", help="comma-separated event counts")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--history-days", type=int, default=3 * 365)
+    parser.add_argument("--notes-length", type=int, default=200, help="free text per description")
+    parser.add_argument("--timezone", default="Asia/Jerusalem")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="compare with this report and exit 1 on regression")
+    parser.add_argument("--save-baseline", action="store_true", help="write the report to --baseline instead")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    config = SimpleNamespace(CALENDAR_URL="http://bench/", CALENDAR_USERNAME="bench", CALENDAR_PASSWORD="bench",
+                             TIMEZONE=args.timezone, APPOINTMENT_PREFIXES=list(DEFAULT_APPOINTMENT_PREFIXES))
+    calendar_service = CalendarService(config)
+    day = datetime.datetime.now(pytz.timezone(args.timezone)).date() + datetime.timedelta(days=1)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        events = generate_events(size, day, args.timezone, args.history_days,
+                                 notes_length=args.notes_length, seed=args.seed)
+        for scenario, stats in run_size(calendar_service, events, day, args.repeats).items():
+            results[f"{scenario}/{size}"] = stats
+
+    params = {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "save_baseline")}
+    result = report("calendar_parsing", params, results)
+    if args.output:
+        write_json(args.output, result)
+    else:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+
+    if args.baseline and args.save_baseline:
+        write_json(args.baseline, result)
+    elif args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Helpers shared by the benchmark scripts: latency summaries, JSON reports and
+baseline comparison.
+"""
+import json
+import platform
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+# Default allowed slowdown against the baseline before a metric counts as a regression
+DEFAULT_TOLERANCE = 0.2
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies_s: Sequence[float], elapsed_s: Optional[float] = None, items: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Latency statistics in milliseconds, plus throughput when the wall time is given.
+
+    :param latencies_s: One latency per operation, in seconds.
+    :param elapsed_s: Wall time of all operations, in seconds.
+    :param items: Items handled in `elapsed_s` (defaults to the number of operations).
+    """
+    values = sorted(v * 1000 for v in latencies_s)
+    stats: Dict[str, Any] = {"count": len(values)}
+    if values:
+        stats.update({
+            "mean_ms": round(sum(values) / len(values), 3),
+            "p50_ms": round(percentile(values, 50), 3),
+            "p95_ms": round(percentile(values, 95), 3),
+            "p99_ms": round(percentile(values, 99), 3),
+            "max_ms": round(values[-1], 3),
+        })
+    if elapsed_s:
+        stats["throughput_per_s"] = round((items if items is not None else len(values)) / elapsed_s, 2)
+    return stats
+
+
+def report(name: str, params: Dict[str, Any], results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    A benchmark report with the parameters and environment it ran with.
+    """
+    return {
+        "benchmark": name,
+        "at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "params": params,
+        "results": results,
+    }
+
+
+def write_json(path: str, data: Dict[str, Any]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """
+    Compare two reports scenario by scenario.
+
+    Latency percentiles (p50/p95/p99) regress when they grow by more than `tolerance`,
+    throughput when it drops by more than `tolerance`.
+
+    :return: One line per regression (empty if none).
+    """
+    regressions = []
+    for scenario, stats in current.get("results", {}).items():
+        base = baseline.get("results", {}).get(scenario)
+        if not base:
+            continue
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if key in stats and base.get(key) and stats[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{scenario}.{key}: {stats[key]} > {base[key]} (+{tolerance:.0%})")
+        key = "throughput_per_s"
+        if key in stats and base.get(key) and stats[key] < base[key] * (1 - tolerance):
+            regressions.append(f"{scenario}.{key}: {stats[key]} < {base[key]} (-{tolerance:.0%})")
+    return regressions
@@ -0,0 +1,222 @@
+"""
+Offline end-to-end benchmark: the daily check and bursts of /webhook/wa replies,
+run against local stand-ins for CalDAV, MongoDB and the WhatsApp adapter.
+
+    python -m benchmarks.e2e --events 200 --calendars 4 --runs 5 --output e2e.json
+    python -m benchmarks.e2e --baseline benchmarks/baselines/e2e.json   # exit 1 on regression
+
+Without --mongo-uri, MongoDB is replaced by mongomock-motor (pip install -r benchmarks/requirements.txt).
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import httpx
+import pytz
+from fastapi import FastAPI
+
+from app.calendar_service import CalendarService
+from app.inbound_dedup import InboundDeduplicator
+from app.pending_confirmation_manager import PendingConfirmationManager
+from app.reminder_bot import ReminderBot
+from app.routers import webhook
+from app.whatsapp_messaging_service import WhatsappMessagingService, _to_msisdn
+from benchmarks.common import DEFAULT_TOLERANCE, compare, report, summarize, write_json
+from benchmarks.fake_adapter import FakeAdapterTransport
+from benchmarks.fake_caldav import FakeCalDAVServer, generate_calendars
+
+OPERATOR = "972500000000"
+SHARED_SECRET = "bench-secret"
+
+
+def _database(mongo_uri: str):
+    """A real MongoDB database when a URI is given, otherwise an in-memory stand-in."""
+    if mongo_uri:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        return AsyncIOMotorClient(mongo_uri).get_default_database("remindersbot_bench")
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("mongomock-motor is not installed; pip install -r benchmarks/requirements.txt or pass --mongo-uri")
+    return AsyncMongoMockClient()["remindersbot_bench"]
+
+
+async def _build_services(args, calendar_url: str) -> Dict[str, Any]:
+    """The services the daily check and the webhook use, wired to the stand-ins."""
+    config = SimpleNamespace(
+        CALENDAR_URL=calendar_url,
+        CALENDAR_USERNAME="bench",
+        CALENDAR_PASSWORD="bench",
+        TIMEZONE=args.timezone,
+        CALDAV_MAX_WORKERS=args.caldav_workers,
+        CALDAV_SUMMARY_FILTER=not args.no_summary_filter,
+        MY_PHONE_NUMBER=OPERATOR,
+        WA_ADAPTER_URL="http://wa-adapter.bench",
+        WA_SHARED_SECRET=SHARED_SECRET,
+    )
+    adapter = FakeAdapterTransport(latency=args.adapter_latency, jitter=args.adapter_jitter)
+    db = _database(args.mongo_uri)
+    confirmation_manager = PendingConfirmationManager(db, operator=_to_msisdn(OPERATOR))
+    try:
+        await confirmation_manager.ensure_indexes()
+    except Exception as e:
+        logging.warning(f"Could not create indexes on the benchmark database: {e}")
+
+    calendar_service = CalendarService(config)
+    messaging_service = WhatsappMessagingService(config, transport=adapter)
+    await messaging_service.start()
+    return {
+        "config": config,
+        "db": db,
+        "adapter": adapter,
+        "calendar_service": calendar_service,
+        "messaging_service": messaging_service,
+        "confirmation_manager": confirmation_manager,
+        "inbound_dedup": InboundDeduplicator(None),
+        "bot": ReminderBot(calendar_service, messaging_service, confirmation_manager,
+                           max_concurrency=args.concurrency),
+    }
+
+
+async def _daily_check(services: Dict[str, Any]) -> Dict[str, Any]:
+    """One daily check on an empty pending_confirmations collection."""
+    await services["db"].pending_confirmations.delete_many({})
+    started = time.perf_counter()
+    summary = await services["bot"].run_daily_check()
+    return {"seconds": time.perf_counter() - started, "summary": summary}
+
+
+async def _webhook_burst(client: httpx.AsyncClient, services: Dict[str, Any], burst: int) -> Dict[str, Any]:
+    """
+    Reply "yes" to every pending confirmation, `burst` requests at a time.
+    """
+    pending = await services["confirmation_manager"].find_pending(operator=_to_msisdn(OPERATOR))
+    texts = [f"כן {doc.get('time_hhmm') or doc.get('appointment_time')}" for doc in pending]
+    semaphore = asyncio.Semaphore(burst)
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    async def reply(text: str) -> None:
+        payload = {"id": uuid.uuid4().hex, "from": f"{OPERATOR}@s.whatsapp.net", "text": text}
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post("/webhook/wa", json=payload, headers={"X-Token": SHARED_SECRET})
+            latencies.append(time.perf_counter() - started)
+        status = response.json().get("status", str(response.status_code)) if response.status_code == 200 \
+            else str(response.status_code)
+        statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(reply(text) for text in texts))
+    return {"latencies": latencies, "seconds": time.perf_counter() - started, "statuses": statuses}
+
+
+async def run(args) -> Dict[str, Any]:
+    """Run the scenarios and return the report."""
+    tz = pytz.timezone(args.timezone)
+    day = datetime.date.today() + datetime.timedelta(days=1)
+    calendars = generate_calendars(day, tz, args.events, args.calendars, other_ratio=args.other_ratio)
+
+    with FakeCalDAVServer(calendars, latency=args.caldav_latency) as caldav_server:
+        services = await _build_services(args, caldav_server.url)
+        app = FastAPI()
+        app.include_router(webhook.router)
+        webhook.router.services = services
+        transport = httpx.ASGITransport(app=app)
+
+        check_seconds: List[float] = []
+        appointments = 0
+        reply_latencies: List[float] = []
+        reply_seconds = 0.0
+        reply_statuses: Dict[str, int] = {}
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                for round_no in range(args.warmup + args.runs):
+                    check = await _daily_check(services)
+                    burst = await _webhook_burst(client, services, args.burst)
+                    if round_no < args.warmup:
+                        continue
+                    check_seconds.append(check["seconds"])
+                    appointments += check["summary"]["total"]
+                    reply_latencies.extend(burst["latencies"])
+                    reply_seconds += burst["seconds"]
+                    for status, count in burst["statuses"].items():
+                        reply_statuses[status] = reply_statuses.get(status, 0) + count
+        finally:
+            await services["messaging_service"].aclose()
+            services["calendar_service"].shutdown()
+
+    # Daily check throughput is appointments per second
+    daily_check = summarize(check_seconds, elapsed_s=sum(check_seconds), items=appointments)
+    daily_check.update({
+        "appointments_per_run": appointments // max(1, args.runs),
+        "caldav_requests": caldav_server.requests,
+    })
+    webhook_stats = summarize(reply_latencies, elapsed_s=reply_seconds)
+    webhook_stats["statuses"] = reply_statuses
+
+    params = {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "save_baseline", "mongo_uri")}
+    params["mongo"] = "mongodb" if args.mongo_uri else "mongomock"
+    return report("e2e", params, {"daily_check": daily_check, "webhook": webhook_stats})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=100, help="synthetic events for tomorrow")
+    parser.add_argument("--calendars", type=int, default=3, help="calendars the events are spread over")
+    parser.add_argument("--other-ratio", type=float, default=0.1, help="share of events that are not treatments")
+    parser.add_argument("--runs", type=int, default=5, help="measured rounds (daily check + reply burst)")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured rounds first")
+    parser.add_argument("--burst", type=int, default=20, help="concurrent webhook requests")
+    parser.add_argument("--concurrency", type=int, default=5, help="ReminderBot max_concurrency")
+    parser.add_argument("--caldav-workers", type=int, default=4, help="CALDAV_MAX_WORKERS")
+    parser.add_argument("--caldav-latency", type=float, default=0.0, help="seconds added to CalDAV responses")
+    parser.add_argument("--no-summary-filter", action="store_true",
+                        help="CALDAV_SUMMARY_FILTER=false: one unfiltered REPORT per calendar")
+    parser.add_argument("--adapter-latency", type=float, default=0.02, help="seconds per adapter /send/text")
+    parser.add_argument("--adapter-jitter", type=float, default=0.005, help="± seconds on adapter latency")
+    parser.add_argument("--timezone", default="Asia/Jerusalem")
+    parser.add_argument("--mongo-uri", default=os.getenv("BENCH_MONGO_URI", ""),
+                        help="use this MongoDB instead of the in-memory stand-in")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="compare with this report and exit 1 on regression")
+    parser.add_argument("--save-baseline", action="store_true", help="write the report to --baseline instead")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed relative slowdown before a regression is reported")
+    args = parser.parse_args()
+
+    if args.events > 16 * 60:
+        parser.error("--events must be at most 960 (one start time per minute from 07:00)")
+    logging.basicConfig(level=logging.WARNING)
+    # Some app modules set DEBUG on their own loggers
+    for name in list(logging.root.manager.loggerDict):
+        if name.split(".", 1)[0] in ("app", "httpx", "caldav"):
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+    result = asyncio.run(run(args))
+    if args.output:
+        write_json(args.output, result)
+    else:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+
+    if args.baseline and args.save_baseline:
+        write_json(args.baseline, result)
+    elif args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
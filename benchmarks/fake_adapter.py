@@ -0,0 +1,37 @@
+"""
+Fake WhatsApp adapter for benchmarks: an httpx transport answering /send/text
+after a configurable latency, passed to WhatsappMessagingService(transport=...).
+"""
+import asyncio
+import json
+import random
+from typing import Any, Dict, List
+
+import httpx
+
+
+class FakeAdapterTransport(httpx.AsyncBaseTransport):
+    """
+    Answers POST /send/text with {"ok": true} after `latency` seconds (± `jitter`),
+    and GET /health with {"ready": true}.
+    """
+
+    def __init__(self, latency: float = 0.02, jitter: float = 0.0):
+        """
+        :param latency: Mean response time in seconds.
+        :param jitter: Maximum deviation from the mean in seconds.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.sent: List[Dict[str, Any]] = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        delay = self.latency + (random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if request.url.path == "/send/text":
+            self.sent.append(json.loads(request.content))
+            return httpx.Response(200, json={"ok": True, "id": f"bench-{len(self.sent)}"})
+        if request.url.path == "/health":
+            return httpx.Response(200, json={"ready": True})
+        return httpx.Response(404, json={"error": "not found"})
@@ -0,0 +1,181 @@
+"""
+Minimal local CalDAV server for benchmarks.
+
+Serves M calendars with N synthetic events for one day, enough of the protocol for
+caldav's discovery (current-user-principal, calendar-home-set, calendar listing) and the
+calendar-query REPORTs CalendarService sends. SUMMARY text-match filters are honoured;
+time ranges are not (all events are on the served day).
+"""
+import datetime
+import re
+import threading
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+PRINCIPAL_PATH = "/principals/bench/"
+HOME_PATH = "/calendars/bench/"
+
+# Share of events that are not treatments (filtered out by the summary prefix)
+DEFAULT_OTHER_RATIO = 0.1
+
+_TEXT_MATCH_RE = re.compile(r"<[^>]*text-match[^>]*>(.*?)</[^>]*text-match>", re.S)
+
+_MULTISTATUS = '<?xml version="1.0" encoding="utf-8"?>\n' \
+    '<d:multistatus xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:caldav" ' \
+    'xmlns:cs="http://calendarserver.org/ns/">{}</d:multistatus>'
+_RESPONSE = '<d:response><d:href>{href}</d:href><d:propstat><d:prop>{props}</d:prop>' \
+    '<d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>'
+
+
+def build_event(uid: str, summary: str, description: str, start: datetime.datetime,
+                minutes: int = 45) -> str:
+    """
+    A VCALENDAR with one timed VEVENT (times in UTC).
+    """
+    end = start + datetime.timedelta(minutes=minutes)
+    fmt = "%Y%m%dT%H%M%SZ"
+    return "\r\n".join([
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//RemindersBot//bench//EN",
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{start.strftime(fmt)}",
+        f"DTSTART:{start.strftime(fmt)}",
+        f"DTEND:{end.strftime(fmt)}",
+        f"SUMMARY:{summary}",
+        f"DESCRIPTION:{description}",
+        "END:VEVENT",
+        "END:VCALENDAR",
+        "",
+    ])
+
+
+def generate_calendars(day: datetime.date, tz: datetime.tzinfo, events: int, calendars: int,
+                       other_ratio: float = DEFAULT_OTHER_RATIO) -> Dict[str, List[Dict[str, str]]]:
+    """
+    Spread `events` events over `calendars` calendars, one minute apart from 07:00
+    local time so every appointment has its own start time.
+
+    :return: calendar name -> [{"href", "summary", "data"}]
+    """
+    result: Dict[str, List[Dict[str, str]]] = {f"cal{c}": [] for c in range(calendars)}
+    first = datetime.datetime.combine(day, datetime.time(7, 0))
+    for i in range(events):
+        name = f"cal{i % calendars}"
+        local = first + datetime.timedelta(minutes=i)
+        start = tz.localize(local) if hasattr(tz, "localize") else local.replace(tzinfo=tz)
+        # Spread the non-treatment events evenly at any ratio
+        if int((i + 1) * other_ratio) > int(i * other_ratio):
+            summary = f"פגישה {i}"
+        else:
+            summary = f"טיפול Customer{i}" if i % 2 else f"tipul לקוח{i}"
+        description = f"טלפון: 05{i % 10}-{1000000 + i:07d}"
+        href = f"{HOME_PATH}{name}/event{i}.ics"
+        result[name].append({
+            "href": href,
+            "summary": summary,
+            "data": build_event(f"bench-{i}", summary, description, start.astimezone(datetime.timezone.utc)),
+        })
+    return result
+
+
+class FakeCalDAVServer:
+    """
+    Threaded HTTP server on 127.0.0.1; use as a context manager.
+    """
+
+    def __init__(self, calendars: Dict[str, List[Dict[str, str]]], latency: float = 0.0):
+        """
+        :param calendars: Output of generate_calendars().
+        :param latency: Seconds added to every response.
+        """
+        self.calendars = calendars
+        self.latency = latency
+        self.requests = 0
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def __enter__(self) -> "FakeCalDAVServer":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-caldav", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def _body(self) -> str:
+                length = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(length).decode("utf-8") if length else ""
+
+            def _reply(self, body: str) -> None:
+                if server.latency:
+                    threading.Event().wait(server.latency)
+                server.requests += 1
+                data = body.encode("utf-8")
+                self.send_response(207)
+                self.send_header("Content-Type", 'application/xml; charset="utf-8"')
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_OPTIONS(self) -> None:
+                self.send_response(200)
+                self.send_header("DAV", "1, 2, calendar-access")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_PROPFIND(self) -> None:
+                self._body()
+                path = self.path.split("?", 1)[0]
+                if path == HOME_PATH and self.headers.get("Depth") == "1":
+                    responses = [_RESPONSE.format(href=HOME_PATH, props="<d:resourcetype><d:collection/></d:resourcetype>")]
+                    for name in server.calendars:
+                        responses.append(_RESPONSE.format(
+                            href=f"{HOME_PATH}{name}/",
+                            props=f"<d:displayname>{name}</d:displayname>"
+                                  "<d:resourcetype><d:collection/><c:calendar/></d:resourcetype>",
+                        ))
+                    self._reply(_MULTISTATUS.format("".join(responses)))
+                    return
+                props = (
+                    f"<d:current-user-principal><d:href>{PRINCIPAL_PATH}</d:href></d:current-user-principal>"
+                    f"<c:calendar-home-set><d:href>{HOME_PATH}</d:href></c:calendar-home-set>"
+                    "<d:resourcetype><d:collection/></d:resourcetype>"
+                )
+                self._reply(_MULTISTATUS.format(_RESPONSE.format(href=path, props=props)))
+
+            def do_REPORT(self) -> None:
+                body = self._body()
+                name = self.path.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+                prefixes = [m.strip().lower() for m in _TEXT_MATCH_RE.findall(body)]
+                responses = []
+                for event in server.calendars.get(name, []):
+                    if prefixes and not any(p in event["summary"].lower() for p in prefixes):
+                        continue
+                    responses.append(_RESPONSE.format(
+                        href=event["href"],
+                        props=f'<d:getetag>"{hash(event["data"]) & 0xffffffff:x}"</d:getetag>'
+                              f"<c:calendar-data>{escape(event['data'])}</c:calendar-data>",
+                    ))
+                self._reply(_MULTISTATUS.format("".join(responses)))
+
+        return Handler
@@ -0,0 +1,150 @@
+"""
+Synthetic iCalendar data at configurable scale, for benchmarking CalendarService.
+
+Every event is its own VCALENDAR (one CalDAV resource). The mix covers:
+  - "timed": UTC DTSTART on the target day
+  - "timed_tzid": local DTSTART with a TZID parameter
+  - "recurring": weekly or daily RRULE that started up to `history_days` before the target day
+  - "all_day": DTSTART;VALUE=DATE
+  - "no_dtstart": no DTSTART at all
+Summaries are Hebrew or English, treatments ("טיפול"/"tipul") or other events.
+
+    python -m benchmarks.ical_generator --events 5000 --history-days 1095 --output big.ics
+"""
+import argparse
+import datetime
+import random
+from typing import Dict, List, NamedTuple, Optional
+
+import pytz
+
+KINDS = ("timed", "timed_tzid", "recurring", "all_day", "no_dtstart")
+DEFAULT_MIX = {"timed": 0.5, "timed_tzid": 0.2, "recurring": 0.2, "all_day": 0.05, "no_dtstart": 0.05}
+
+_HEBREW_NAMES = ("נועה", "דניאל", "מיכל", "יוסי", "שירה", "אורי", "תמר", "איתי")
+_ENGLISH_NAMES = ("Noa", "Daniel", "Michal", "Yossi", "Shira", "Uri", "Tamar", "Itai")
+_UTC = "%Y%m%dT%H%M%SZ"
+_LOCAL = "%Y%m%dT%H%M%S"
+
+
+class GeneratedEvent(NamedTuple):
+    """One synthetic event: its kind, summary and iCalendar text."""
+    uid: str
+    kind: str
+    summary: str
+    data: str
+
+
+def _summary(rng: random.Random, hebrew: bool, treatment: bool) -> str:
+    name = rng.choice(_HEBREW_NAMES if hebrew else _ENGLISH_NAMES)
+    if treatment:
+        return f"טיפול {name}" if hebrew else f"{rng.choice(('Tipul', 'tipul', 'TIPUL'))} {name}"
+    return f"פגישה עם {name}" if hebrew else f"Meeting with {name}"
+
+
+def _description(rng: random.Random, notes_length: int) -> str:
+    phone = f"05{rng.randint(0, 9)}-{rng.randint(1000000, 9999999)}"
+    notes = ("הערות " * (notes_length // 6 + 1))[:notes_length] if notes_length else ""
+    return f"טלפון: {phone}" + (f"\\n{notes}" if notes else "")
+
+
+def _vcalendar(lines: List[str]) -> str:
+    return "\r\n".join([
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//RemindersBot//bench//EN",
+        "BEGIN:VEVENT",
+        *lines,
+        "END:VEVENT",
+        "END:VCALENDAR",
+        "",
+    ])
+
+
+def generate_events(count: int, day: datetime.date, timezone: str = "Asia/Jerusalem",
+                    history_days: int = 365, mix: Optional[Dict[str, float]] = None,
+                    hebrew_ratio: float = 0.5, treatment_ratio: float = 0.8,
+                    notes_length: int = 0, seed: int = 0) -> List[GeneratedEvent]:
+    """
+    Generate `count` events that all occur on `day` (recurring ones through their RRULE).
+
+    :param count: Number of events.
+    :param day: The day every event falls on.
+    :param timezone: Timezone of the local (TZID) start times.
+    :param history_days: How far back recurring events may have started.
+    :param mix: Share of each kind (see KINDS); defaults to DEFAULT_MIX.
+    :param hebrew_ratio: Share of Hebrew summaries.
+    :param treatment_ratio: Share of treatment summaries (the rest is filtered out by prefix).
+    :param notes_length: Characters of free text added to each description.
+    :param seed: Random seed, for reproducible payloads.
+    """
+    rng = random.Random(seed)
+    tz = pytz.timezone(timezone)
+    mix = mix or DEFAULT_MIX
+    kinds, weights = zip(*mix.items())
+    events = []
+    for i in range(count):
+        kind = rng.choices(kinds, weights)[0]
+        summary = _summary(rng, rng.random() < hebrew_ratio, rng.random() < treatment_ratio)
+        local = datetime.datetime.combine(day, datetime.time(7, 0)) + datetime.timedelta(minutes=rng.randrange(14 * 60))
+        start = tz.localize(local)
+        end = start + datetime.timedelta(minutes=45)
+        uid = f"bench-{seed}-{i}"
+        lines = [f"UID:{uid}", f"DTSTAMP:{start.astimezone(pytz.utc).strftime(_UTC)}"]
+
+        if kind == "timed":
+            lines += [f"DTSTART:{start.astimezone(pytz.utc).strftime(_UTC)}",
+                      f"DTEND:{end.astimezone(pytz.utc).strftime(_UTC)}"]
+        elif kind == "timed_tzid":
+            lines += [f"DTSTART;TZID={timezone}:{local.strftime(_LOCAL)}",
+                      f"DTEND;TZID={timezone}:{end.replace(tzinfo=None).strftime(_LOCAL)}"]
+        elif kind == "recurring":
+            weekly = rng.random() < 0.7
+            back = rng.randrange(max(1, history_days // 7)) * 7 if weekly else rng.randrange(max(1, history_days))
+            first = local - datetime.timedelta(days=back)
+            lines += [f"DTSTART;TZID={timezone}:{first.strftime(_LOCAL)}",
+                      f"DTEND;TZID={timezone}:{(first + datetime.timedelta(minutes=45)).strftime(_LOCAL)}",
+                      "RRULE:FREQ=WEEKLY" if weekly else "RRULE:FREQ=DAILY"]
+        elif kind == "all_day":
+            lines += [f"DTSTART;VALUE=DATE:{day.strftime('%Y%m%d')}",
+                      f"DTEND;VALUE=DATE:{(day + datetime.timedelta(days=1)).strftime('%Y%m%d')}"]
+        lines += [f"SUMMARY:{summary}", f"DESCRIPTION:{_description(rng, notes_length)}"]
+        events.append(GeneratedEvent(uid, kind, summary, _vcalendar(lines)))
+    return events
+
+
+def to_single_calendar(events: List[GeneratedEvent]) -> str:
+    """
+    All events in one VCALENDAR (e.g. to import into a real CalDAV server).
+    """
+    bodies = []
+    for event in events:
+        lines = event.data.split("\r\n")
+        bodies.extend(lines[lines.index("BEGIN:VEVENT"):lines.index("END:VEVENT") + 1])
+    return "\r\n".join(["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//RemindersBot//bench//EN",
+                        *bodies, "END:VCALENDAR", ""])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--day", type=datetime.date.fromisoformat,
+                        default=datetime.date.today() + datetime.timedelta(days=1), help="YYYY-MM-DD (default: tomorrow)")
+    parser.add_argument("--timezone", default="Asia/Jerusalem")
+    parser.add_argument("--history-days", type=int, default=365)
+    parser.add_argument("--hebrew-ratio", type=float, default=0.5)
+    parser.add_argument("--treatment-ratio", type=float, default=0.8)
+    parser.add_argument("--notes-length", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", required=True, help="write one .ics file with all events")
+    args = parser.parse_args()
+
+    events = generate_events(args.events, args.day, args.timezone, args.history_days,
+                             hebrew_ratio=args.hebrew_ratio, treatment_ratio=args.treatment_ratio,
+                             notes_length=args.notes_length, seed=args.seed)
+    with open(args.output, "w", encoding="utf-8", newline="") as f:
+        f.write(to_single_calendar(events))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 import pytest
 import datetime
+import threading
 import pytz
 from freezegun import freeze_time
-from unittest.mock import patch, MagicMock
-from app.calendar_service import CalendarService
+from unittest.mock import patch, MagicMock, PropertyMock
+from app.calendar_service import CalendarFetchError, CalendarService
 
 class MockConfig:
     CALENDAR_URL = "http://fake-calendar-url.com"
@@ -76,8 +77,9 @@ def test_get_tomorrow_appointments_no_tipul(mock_dav_client, calendar_service):
 
     tz = pytz.timezone("Asia/Jerusalem")
     fake_event.instance.vevent.dtstart.value = tz.localize(datetime.datetime(2025, 1, 2, 10, 0))
+    fake_event.instance.vevent_list = [fake_event.instance.vevent]
 
-    mock_calendar.date_search.return_value = [fake_event]
+    mock_calendar.search.return_value = [fake_event]
 
     appointments = calendar_service.get_tomorrow_appointments()
     assert appointments == []
@@ -103,19 +105,22 @@ def test_get_tomorrow_appointments_tipul_events(mock_dav_client, calendar_servic
     fake_event_1.instance.vevent.description.value = "John's therapy session"
     # Attach tzinfo=Asia/Jerusalem so it stays at 9:30 local
     fake_event_1.instance.vevent.dtstart.value = tz.localize(datetime.datetime(2025, 1, 2, 9, 30))
+    fake_event_1.instance.vevent_list = [fake_event_1.instance.vevent]
 
     fake_event_2 = MagicMock()
     fake_event_2.instance.vevent.summary.value = "tipul Mary"
     fake_event_2.instance.vevent.description.value = "Mary's appointment"
     fake_event_2.instance.vevent.dtstart.value = tz.localize(datetime.datetime(2025, 1, 2, 14, 45))
+    fake_event_2.instance.vevent_list = [fake_event_2.instance.vevent]
 
     # Non-matching event
     fake_event_3 = MagicMock()
     fake_event_3.instance.vevent.summary.value = "Meeting with Bob"
     fake_event_3.instance.vevent.description.value = "Project discussion"
     fake_event_3.instance.vevent.dtstart.value = tz.localize(datetime.datetime(2025, 1, 2, 11, 15))
+    fake_event_3.instance.vevent_list = [fake_event_3.instance.vevent]
 
-    mock_calendar.date_search.return_value = [fake_event_1, fake_event_2, fake_event_3]
+    mock_calendar.search.return_value = [fake_event_1, fake_event_2, fake_event_3]
 
     appointments = calendar_service.get_tomorrow_appointments()
     assert len(appointments) == 2  # Only the ones starting with 'טיפול' or 'tipul'
@@ -134,3 +139,449 @@ def test_get_tomorrow_appointments_exception(mock_dav_client, calendar_service):
     """
     appointments = calendar_service.get_tomorrow_appointments()
     assert appointments == []
+
+
+def _tipul_event(summary, hour, minute):
+    tz = pytz.timezone("Asia/Jerusalem")
+    event = MagicMock()
+    event.instance.vevent.summary.value = summary
+    event.instance.vevent.description.value = "0501234567"
+    event.instance.vevent.dtstart.value = tz.localize(datetime.datetime(2025, 1, 2, hour, minute))
+    event.instance.vevent_list = [event.instance.vevent]
+    return event
+
+
+@pytest.mark.asyncio
+@patch("app.calendar_service.caldav.DAVClient")
+async def test_fetch_tomorrow_appointments_searches_calendars_in_parallel(mock_dav_client, calendar_service):
+    """
+    The async API searches every calendar at the same time on the CalDAV thread pool
+    and keeps calendar order in the result.
+    """
+    barrier = threading.Barrier(2, timeout=5)
+
+    def search(event):
+        def _search(**kwargs):
+            # Both searches must be running at once to pass the barrier
+            barrier.wait()
+            return [event]
+        return _search
+
+    cal_1, cal_2 = MagicMock(), MagicMock()
+    cal_1.search.side_effect = search(_tipul_event("טיפול A", 9, 0))
+    cal_2.search.side_effect = search(_tipul_event("tipul B", 10, 30))
+    mock_dav_client.return_value.principal.return_value.calendars.return_value = [cal_1, cal_2]
+
+    appointments = await calendar_service.fetch_tomorrow_appointments()
+    calendar_service.shutdown()
+
+    assert appointments == [
+        ("טיפול A", "0501234567", "9:00"),
+        ("tipul B", "0501234567", "10:30"),
+    ]
+
+
+@pytest.mark.asyncio
+@patch("app.calendar_service.caldav.DAVClient")
+async def test_fetch_tomorrow_appointments_skips_failing_calendar(mock_dav_client, calendar_service):
+    cal_ok, cal_bad = MagicMock(), MagicMock()
+    cal_ok.search.return_value = [_tipul_event("טיפול A", 9, 0)]
+    cal_bad.search.side_effect = Exception("timeout")
+    mock_dav_client.return_value.principal.return_value.calendars.return_value = [cal_bad, cal_ok]
+
+    appointments = await calendar_service.fetch_tomorrow_appointments()
+    calendar_service.shutdown()
+
+    assert appointments == [("טיפול A", "0501234567", "9:00")]
+
+
+@pytest.mark.asyncio
+@patch("app.calendar_service.caldav.DAVClient", side_effect=Exception("Connection error"))
+async def test_strict_fetch_reports_discovery_failure(mock_dav_client, calendar_service):
+    """
+    A failed discovery reads as "no appointments" by default; a strict fetch raises instead.
+    """
+    assert await calendar_service.fetch_tomorrow_appointments() == []
+
+    with pytest.raises(CalendarFetchError) as raised:
+        await calendar_service.fetch_tomorrow_appointments(strict=True)
+    calendar_service.shutdown()
+
+    assert raised.value.appointments == []
+    assert raised.value.errors == ["calendar discovery failed: Connection error"]
+
+
+@pytest.mark.asyncio
+@patch("app.calendar_service.caldav.DAVClient")
+async def test_strict_fetch_keeps_appointments_of_working_calendars(mock_dav_client, calendar_service):
+    cal_ok, cal_bad = MagicMock(), MagicMock()
+    cal_bad.name = "Work"
+    cal_ok.search.return_value = [_tipul_event("טיפול A", 9, 0)]
+    cal_bad.search.side_effect = Exception("timeout")
+    mock_dav_client.return_value.principal.return_value.calendars.return_value = [cal_bad, cal_ok]
+
+    with pytest.raises(CalendarFetchError) as raised:
+        await calendar_service.fetch_tomorrow_appointments(strict=True)
+    calendar_service.shutdown()
+
+    assert raised.value.appointments == [("טיפול A", "0501234567", "9:00")]
+    assert raised.value.errors == ["calendar Work failed: timeout"]
+
+
+@patch("app.calendar_service.caldav.DAVClient")
+def test_discovery_is_cached_between_fetches(mock_dav_client, calendar_service):
+    """
+    The CalDAV session, principal and calendar list are reused until invalidated.
+    """
+    mock_principal = mock_dav_client.return_value.principal.return_value
+    mock_principal.calendars.return_value = [MagicMock(search=MagicMock(return_value=[]))]
+
+    calendar_service.get_tomorrow_appointments()
+    calendar_service.get_tomorrow_appointments()
+
+    assert mock_dav_client.call_count == 1
+    assert mock_dav_client.return_value.principal.call_count == 1
+    assert mock_principal.calendars.call_count == 1
+
+    calendar_service.invalidate_discovery()
+    calendar_service.get_tomorrow_appointments()
+
+    assert mock_dav_client.call_count == 1
+    assert mock_principal.calendars.call_count == 2
+
+
+@patch("app.calendar_service.caldav.DAVClient")
+def test_session_is_reset_after_connection_error(mock_dav_client, calendar_service):
+    """
+    A failed calendar search only forces rediscovery; an authentication or connection
+    error also drops the CalDAV session so the next fetch logs in again.
+    """
+    from caldav.lib.error import AuthorizationError
+
+    calendar = MagicMock()
+    calendar.search.side_effect = Exception("calendar gone")
+    mock_dav_client.return_value.principal.return_value.calendars.return_value = [calendar]
+
+    calendar_service.get_tomorrow_appointments()
+    calendar_service.get_tomorrow_appointments()
+    assert mock_dav_client.call_count == 1
+
+    calendar.search.side_effect = AuthorizationError("401 Unauthorized")
+    calendar_service.get_tomorrow_appointments()
+    calendar.search.side_effect = ConnectionError("connection reset")
+    calendar_service.get_tomorrow_appointments()
+    calendar.search.side_effect = None
+    calendar.search.return_value = []
+    calendar_service.get_tomorrow_appointments()
+
+    assert mock_dav_client.call_count == 3
+
+
+@patch("app.calendar_service.caldav.DAVClient")
+def test_discovery_expires_after_ttl(mock_dav_client):
+    class ShortTTLConfig(MockConfig):
+        CALDAV_DISCOVERY_TTL = 0
+
+    service = CalendarService(ShortTTLConfig())
+    mock_principal = mock_dav_client.return_value.principal.return_value
+    mock_principal.calendars.return_value = []
+
+    service.get_tomorrow_appointments()
+    service.get_tomorrow_appointments()
+
+    assert mock_principal.calendars.call_count == 2
+
+
+@patch("app.calendar_service.caldav.DAVClient")
+def test_calendar_allowlist_by_name_or_url(mock_dav_client):
+    class AllowlistConfig(MockConfig):
+        CALENDAR_ALLOWLIST = ["Clinic", "https://caldav.example.com/123/calendars/work/"]
+
+    clinic = MagicMock()
+    clinic.name = "clinic"
+    clinic.url = "https://caldav.example.com/123/calendars/home/"
+    work = MagicMock()
+    work.name = "Work"
+    work.url = "https://caldav.example.com/123/calendars/work/"
+    personal = MagicMock()
+    personal.name = "Personal"
+    personal.url = "https://caldav.example.com/123/calendars/personal/"
+    for calendar in (clinic, work, personal):
+        calendar.search.return_value = []
+    mock_dav_client.return_value.principal.return_value.calendars.return_value = [clinic, work, personal]
+
+    service = CalendarService(AllowlistConfig())
+    service.get_tomorrow_appointments()
+
+    assert clinic.search.called
+    assert work.search.called
+    personal.search.assert_not_called()
+
+
+ICS_TEMPLATE = """BEGIN:VCALENDAR
+VERSION:2.0
+PRODID:-//test//EN
+BEGIN:VEVENT
+UID:{uid}
+DTSTAMP:20250101T000000Z
+DTSTART:{dtstart}
+DTEND:{dtend}
+SUMMARY:{summary}
+DESCRIPTION:0501234567
+END:VEVENT
+END:VCALENDAR
+"""
+
+
+def _cached_calendar(token, etags, data):
+    """
+    A calendar double answering the PROPFIND/REPORT calls of the cached search path.
+    """
+    from caldav.elements import dav
+    from caldav.lib.url import URL
+
+    calendar = MagicMock()
+    calendar.url = URL.objectify("https://caldav.example.com/1/calendars/home/")
+    calendar.name = "home"
+    calendar.get_properties.side_effect = lambda props: {dav.SyncToken.tag: token["value"]}
+
+    def query(xml, depth, method):
+        response = MagicMock()
+        response.expand_simple_props.return_value = {
+            f"/1/calendars/home/{name}": {dav.GetEtag.tag: etag} for name, etag in etags.items()
+        }
+        return response
+    calendar._query.side_effect = query
+
+    def multiget(urls):
+        events = []
+        for url in urls:
+            name = str(url).rsplit("/", 1)[-1]
+            event = MagicMock()
+            event.url = calendar.url.join(url)
+            event.data = data[name]
+            events.append(event)
+        return events
+    calendar.calendar_multiget.side_effect = multiget
+    return calendar
+
+
+@freeze_time("2025-01-01")
+@patch("app.calendar_service.caldav.DAVClient")
+def test_event_cache_fetches_only_changed_events(mock_dav_client):
+    """
+    With the event cache on, an unchanged calendar is served from the cache and only
+    events with a new etag are downloaded again.
+    """
+    class CachedConfig(MockConfig):
+        CALDAV_EVENT_CACHE = True
+        APPOINTMENT_PREFIXES = ["טיפול"]
+
+    token = {"value": "sync-1"}
+    etags = {"a.ics": "e1", "b.ics": "e1"}
+    data = {
+        "a.ics": ICS_TEMPLATE.format(uid="a", dtstart="20250102T073000Z", dtend="20250102T083000Z", summary="טיפול Dana"),
+        "b.ics": ICS_TEMPLATE.format(uid="b", dtstart="20250102T100000Z", dtend="20250102T110000Z", summary="Lunch"),
+    }
+    calendar = _cached_calendar(token, etags, data)
+    mock_dav_client.return_value.principal.return_value.calendars.return_value = [calendar]
+
+    service = CalendarService(CachedConfig())
+    first = service.get_tomorrow_appointments()
+    assert first == [("טיפול Dana", "0501234567", "9:30")]
+    assert calendar.calendar_multiget.call_count == 1
+    assert calendar._query.call_count == 1
+
+    # Same token: nothing but the PROPFIND goes to the server
+    assert service.get_tomorrow_appointments() == first
+    assert calendar._query.call_count == 1
+    assert calendar.calendar_multiget.call_count == 1
+
+    # One event changed: list etags again, download only that event
+    token["value"] = "sync-2"
+    etags["a.ics"] = "e2"
+    data["a.ics"] = data["a.ics"].replace("T073000Z", "T080000Z")
+    second = service.get_tomorrow_appointments()
+
+    assert second == [("טיפול Dana", "0501234567", "10:00")]
+    assert calendar._query.call_count == 2
+    multiget_urls = calendar.calendar_multiget.call_args[0][0]
+    assert [str(u).rsplit("/", 1)[-1] for u in multiget_urls] == ["a.ics"]
+
+
+@patch("app.calendar_service.caldav.DAVClient")
+def test_summary_filter_is_sent_to_server(mock_dav_client, calendar_service):
+    """
+    One REPORT per appointment prefix, each with a case-insensitive SUMMARY text-match.
+    """
+    calendar = MagicMock()
+    calendar.search.return_value = []
+    mock_dav_client.return_value.principal.return_value.calendars.return_value = [calendar]
+
+    calendar_service.get_tomorrow_appointments()
+
+    queries = [str(c.kwargs["xml"]) for c in calendar.search.call_args_list]
+    assert len(queries) == 2
+    assert 'name="SUMMARY"' in queries[0]
+    assert "טיפול" in queries[0]
+    assert "tipul" in queries[1]
+    assert 'collation="i;ascii-casemap"' in queries[1]
+    assert "time-range" in queries[0]
+
+
+@patch("app.calendar_service.caldav.DAVClient")
+def test_summary_filter_can_be_turned_off(mock_dav_client):
+    class NoFilterConfig(MockConfig):
+        CALDAV_SUMMARY_FILTER = False
+
+    service = CalendarService(NoFilterConfig())
+    calendar = MagicMock()
+    calendar.search.return_value = [_tipul_event("טיפול A", 9, 0), _tipul_event("Meeting", 10, 0)]
+    mock_dav_client.return_value.principal.return_value.calendars.return_value = [calendar]
+
+    assert service.get_tomorrow_appointments() == [("טיפול A", "0501234567", "9:00")]
+    assert calendar.search.call_count == 1
+    assert "SUMMARY" not in str(calendar.search.call_args.kwargs["xml"])
+
+
+@patch("app.calendar_service.caldav.DAVClient")
+def test_summary_filter_falls_back_when_rejected(mock_dav_client, calendar_service):
+    """
+    A server that rejects text-match is searched unfiltered; the client-side prefix check still applies.
+    """
+    from caldav.lib.error import ReportError
+
+    calls = []
+
+    def search(xml, comp_class):
+        calls.append(str(xml))
+        if "SUMMARY" in str(xml):
+            raise ReportError("400 Bad Request")
+        return [_tipul_event("טיפול A", 9, 0), _tipul_event("Dentist", 11, 0)]
+
+    calendar = MagicMock()
+    calendar.search.side_effect = search
+    mock_dav_client.return_value.principal.return_value.calendars.return_value = [calendar]
+
+    assert calendar_service.get_tomorrow_appointments() == [("טיפול A", "0501234567", "9:00")]
+    # Remembered: the next run goes straight to the unfiltered query
+    calls.clear()
+    calendar_service.get_tomorrow_appointments()
+    assert len(calls) == 1 and "SUMMARY" not in calls[0]
+
+
+def test_appointment_prefixes_are_configurable():
+    class PrefixConfig(MockConfig):
+        APPOINTMENT_PREFIXES = "Session, Therapy"
+
+    service = CalendarService(PrefixConfig())
+    event = _tipul_event("therapy Dana", 9, 0)
+    assert [a[:3] for a in service._extract_appointments(event)] == [("therapy Dana", "0501234567", "9:00")]
+    assert service._extract_appointments(_tipul_event("טיפול Dana", 9, 0)) == []
+
+
+@patch("app.calendar_service.caldav.DAVClient")
+def test_get_appointments_is_lazy_across_calendars(mock_dav_client, calendar_service):
+    """
+    get_appointments yields calendar by calendar: the second calendar is only searched
+    once the first one's appointments have been consumed.
+    """
+    cal_1, cal_2 = MagicMock(), MagicMock()
+    cal_1.search.return_value = [_tipul_event("טיפול A", 9, 0)]
+    cal_2.search.return_value = [_tipul_event("טיפול B", 10, 0)]
+    mock_dav_client.return_value.principal.return_value.calendars.return_value = [cal_1, cal_2]
+
+    tz = pytz.timezone("Asia/Jerusalem")
+    week_start = tz.localize(datetime.datetime(2025, 1, 5))
+    week_end = week_start + datetime.timedelta(days=7)
+    appointments = calendar_service.get_appointments(week_start, week_end)
+
+    first = next(appointments)
+    assert first.summary == "טיפול A"
+    assert first.start == tz.localize(datetime.datetime(2025, 1, 2, 9, 0))
+    cal_2.search.assert_not_called()
+
+    rest = list(appointments)
+    assert [a.summary for a in rest] == ["טיפול B"]
+    query = str(cal_1.search.call_args.kwargs["xml"])
+    assert 'start="20250104T220000Z" end="20250111T220000Z"' in query
+
+
+@pytest.mark.asyncio
+@patch("app.calendar_service.caldav.DAVClient")
+async def test_stream_appointments_yields_in_calendar_order(mock_dav_client, calendar_service):
+    cal_1, cal_2 = MagicMock(), MagicMock()
+    cal_1.search.return_value = [_tipul_event("טיפול A", 9, 0)]
+    cal_2.search.return_value = [_tipul_event("טיפול B", 8, 0)]
+    mock_dav_client.return_value.principal.return_value.calendars.return_value = [cal_1, cal_2]
+
+    start, end = calendar_service.get_tomorrow_time()
+    summaries = [a.summary async for a in calendar_service.stream_appointments(start, end)]
+    calendar_service.shutdown()
+
+    assert summaries == ["טיפול A", "טיפול B"]
+
+
+def _ics_event(uid, summary, dtstart_line, *extra_lines):
+    import caldav
+
+    data = "\r\n".join([
+        "BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//test//EN", "BEGIN:VEVENT",
+        f"UID:{uid}", "DTSTAMP:20250101T000000Z", *([dtstart_line] if dtstart_line else []),
+        f"SUMMARY:{summary}", *extra_lines, "END:VEVENT", "END:VCALENDAR", "",
+    ])
+    return caldav.Event(client=None, url=f"http://fake-calendar-url.com/cal/{uid}.ics", data=data)
+
+
+@pytest.mark.asyncio
+@patch("app.calendar_service.caldav.DAVClient")
+async def test_events_without_start_time_are_skipped(mock_dav_client, calendar_service):
+    """
+    All-day events and events without DTSTART are skipped one by one instead of
+    failing the whole calendar; a missing DESCRIPTION is read as empty.
+    """
+    calendar = MagicMock()
+    calendar.search.return_value = [
+        _ics_event("all-day", "טיפול Dana", "DTSTART;VALUE=DATE:20250102"),
+        _ics_event("no-start", "טיפול Noa", None),
+        _ics_event("timed", "טיפול Yossi", "DTSTART:20250102T073000Z"),
+    ]
+    mock_dav_client.return_value.principal.return_value.calendars.return_value = [calendar]
+
+    appointments = await calendar_service.fetch_tomorrow_appointments()
+    calendar_service.shutdown()
+
+    assert appointments == [("טיפול Yossi", "", "9:30")]
+    assert calendar_service.get_tomorrow_appointments() == [("טיפול Yossi", "", "9:30")]
+
+
+@patch("app.calendar_service.caldav.DAVClient")
+def test_unreadable_event_does_not_hide_the_rest_of_the_calendar(mock_dav_client, calendar_service):
+    broken = MagicMock()
+    type(broken).icalendar_component = PropertyMock(side_effect=ValueError("unparsable iCalendar"))
+    calendar = MagicMock()
+    calendar.search.return_value = [broken, _tipul_event("טיפול A", 9, 0)]
+    mock_dav_client.return_value.principal.return_value.calendars.return_value = [calendar]
+
+    assert calendar_service.get_tomorrow_appointments() == [("טיפול A", "0501234567", "9:00")]
+
+
+@patch("app.calendar_service.caldav.DAVClient")
+def test_recurring_event_yields_every_occurrence_in_window(mock_dav_client, calendar_service):
+    """
+    A daily treatment searched over a week gives one appointment per day, not just
+    the first occurrence.
+    """
+    calendar = MagicMock()
+    calendar.search.return_value = [
+        _ics_event("daily", "טיפול Dana", "DTSTART:20241001T063000Z", "RRULE:FREQ=DAILY", "DESCRIPTION:0501234567"),
+    ]
+    mock_dav_client.return_value.principal.return_value.calendars.return_value = [calendar]
+
+    tz = pytz.timezone("Asia/Jerusalem")
+    week_start = tz.localize(datetime.datetime(2024, 10, 18))
+    week_end = tz.localize(datetime.datetime(2024, 10, 24, 23, 59))
+    appointments = list(calendar_service.get_appointments(week_start, week_end))
+
+    assert [a.start.day for a in appointments] == [18, 19, 20, 21, 22, 23, 24]
+    assert {a[:3] for a in appointments} == {("טיפול Dana", "0501234567", "9:30")}
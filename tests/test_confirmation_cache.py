@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta, timezone
+from app.confirmation_cache import ConfirmationCache
+
+OPERATOR = "972500000000"
+
+
+def _doc(key, time_hhmm, operator=OPERATOR, created_at=None, date_bucket="2025-02-01"):
+    return {
+        "key": key,
+        "customer_name": key,
+        "time_hhmm": time_hhmm,
+        "date_bucket": date_bucket,
+        "operator": operator,
+        "created_at": created_at or datetime.now(timezone.utc),
+    }
+
+
+def test_find_requires_complete_cache():
+    cache = ConfirmationCache(ttl_seconds=3600)
+    cache.put(_doc("a", "09:30"))
+
+    assert cache.find(operator=OPERATOR) is None
+    assert cache.stats["misses"] == 1
+
+    cache.warm([_doc("a", "09:30")])
+    assert [d["key"] for d in cache.find(operator=OPERATOR)] == ["a"]
+
+
+def test_find_by_operator_and_time():
+    cache = ConfirmationCache(ttl_seconds=3600)
+    cache.warm([
+        _doc("b", "14:00"),
+        _doc("a", "09:30"),
+        _doc("legacy", "09:30", operator=None),
+        _doc("other", "09:30", operator="972599999999"),
+    ])
+
+    assert [d["key"] for d in cache.find(operator=OPERATOR)] == ["a", "legacy", "b"]
+    assert sorted(d["key"] for d in cache.find(operator=OPERATOR, time_hhmm="09:30")) == ["a", "legacy"]
+    assert "operator" not in cache.find(operator=OPERATOR)[0]
+
+    cache.remove("a")
+    assert [d["key"] for d in cache.find(operator=OPERATOR, time_hhmm="09:30")] == ["legacy"]
+
+
+def test_entries_expire_with_collection_ttl():
+    cache = ConfirmationCache(ttl_seconds=60)
+    old = datetime.now(timezone.utc) - timedelta(seconds=120)
+    cache.warm([_doc("old", "09:30", created_at=old), _doc("new", "10:00")])
+
+    assert [d["key"] for d in cache.find()] == ["new"]
+    assert len(cache) == 1
+
+
+def test_size_cap_eviction_marks_cache_incomplete():
+    cache = ConfirmationCache(ttl_seconds=3600, max_entries=2)
+    cache.warm([_doc("a", "09:00"), _doc("b", "10:00")])
+    assert cache.complete
+
+    cache.put(_doc("c", "11:00"))
+
+    assert cache.stats["evictions"] == 1
+    assert cache.find(operator=OPERATOR) is None
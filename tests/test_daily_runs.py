@@ -0,0 +1,50 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.daily_runs import DailyRunStore
+
+
+@pytest.mark.asyncio
+async def test_marker_is_written_to_mongo_and_cached():
+    db = MagicMock()
+    db.daily_runs.replace_one = AsyncMock()
+    db.daily_runs.find_one = AsyncMock(return_value=None)
+    store = DailyRunStore(db)
+
+    assert await store.get("2025-01-02") is None
+    await store.mark_completed("2025-01-02", {"total": 2, "processed": 2, "skipped": 0, "failed": 0, "results": []})
+
+    filter_, marker = db.daily_runs.replace_one.await_args.args
+    assert filter_ == {"_id": "2025-01-02"}
+    assert marker["processed"] == 2
+    assert "results" not in marker
+    assert db.daily_runs.replace_one.await_args.kwargs == {"upsert": True}
+
+    assert (await store.get("2025-01-02"))["total"] == 2
+    db.daily_runs.find_one.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_marker_written_by_another_process_is_found():
+    db = MagicMock()
+    db.daily_runs.find_one = AsyncMock(return_value={"_id": "2025-01-02", "total": 4})
+    store = DailyRunStore(db)
+
+    assert (await store.get("2025-01-02"))["total"] == 4
+
+
+@pytest.mark.asyncio
+async def test_prompted_keys_are_added_in_one_write_and_read_back():
+    db = MagicMock()
+    db.daily_run_progress.update_one = AsyncMock()
+    db.daily_run_progress.find_one = AsyncMock(return_value={"prompted": ["b$10:00", "a$9:00"]})
+    store = DailyRunStore(db)
+
+    await store.add_prompted("2025-01-02", ["b$10:00", "a$9:00", "a$9:00"])
+    await store.add_prompted("2025-01-02", [])
+
+    db.daily_run_progress.update_one.assert_awaited_once()
+    filter_, update = db.daily_run_progress.update_one.await_args.args
+    assert filter_ == {"_id": "2025-01-02"}
+    assert update["$addToSet"] == {"prompted": {"$each": ["a$9:00", "b$10:00"]}}
+    assert db.daily_run_progress.update_one.await_args.kwargs == {"upsert": True}
+    assert await store.get_prompted("2025-01-02") == {"a$9:00", "b$10:00"}
@@ -0,0 +1,46 @@
+import json
+from app.event_cache import EventCache
+
+CAL = "https://caldav.example.com/1/calendars/home/"
+WINDOW = "2025-01-02T00:00:00+02:00/2025-01-02T23:59:59+02:00"
+
+
+def test_window_served_only_with_same_token():
+    cache = EventCache()
+    cache.store_window(CAL, WINDOW, "token-1", {"a.ics": "e1"}, {"a.ics": "DATA-A"})
+
+    assert cache.get_window(CAL, WINDOW, "token-1") == [("a.ics", "DATA-A")]
+    assert cache.get_window(CAL, WINDOW, "token-2") is None
+    assert cache.get_window(CAL, WINDOW, None) is None
+    assert cache.stats["window_hits"] == 1
+    assert cache.stats["window_misses"] == 2
+
+
+def test_stale_hrefs_compares_etags():
+    cache = EventCache()
+    cache.store_window(CAL, WINDOW, "t", {"a.ics": "e1", "b.ics": "e1"}, {"a.ics": "A", "b.ics": "B"})
+
+    stale = cache.stale_hrefs(CAL, {"a.ics": "e1", "b.ics": "e2", "c.ics": "e1"})
+
+    assert stale == ["b.ics", "c.ics"]
+
+
+def test_unreferenced_events_are_pruned():
+    cache = EventCache(max_windows=1)
+    cache.store_window(CAL, "day-1", "t", {"a.ics": "e1"}, {"a.ics": "A"})
+    cache.store_window(CAL, "day-2", "t", {"b.ics": "e1"}, {"b.ics": "B"})
+
+    assert cache.stale_hrefs(CAL, {"a.ics": "e1"}) == ["a.ics"]
+    assert cache.get_window(CAL, "day-1", "t") is None
+    assert cache.get_window(CAL, "day-2", "t") == [("b.ics", "B")]
+
+
+def test_cache_persists_to_disk(tmp_path):
+    path = str(tmp_path / "events.json")
+    cache = EventCache(path)
+    cache.store_window(CAL, WINDOW, "t", {"a.ics": "e1"}, {"a.ics": "טיפול"})
+    cache.save()
+
+    with open(path, encoding="utf-8") as f:
+        assert CAL in json.load(f)["calendars"]
+    assert EventCache(path).get_window(CAL, WINDOW, "t") == [("a.ics", "טיפול")]
@@ -0,0 +1,51 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from pymongo.errors import DuplicateKeyError
+from app.inbound_dedup import InboundDeduplicator
+
+
+@pytest.mark.asyncio
+async def test_memory_only_dedup_with_size_cap():
+    dedup = InboundDeduplicator(max_entries=2)
+
+    assert await dedup.seen("a") is False
+    assert await dedup.seen("a") is True
+    assert await dedup.seen("b") is False
+    assert await dedup.seen("c") is False
+    # "a" was evicted by the size cap
+    assert await dedup.seen("a") is False
+    assert dedup.stats == {"new": 4, "duplicates": 1}
+
+
+@pytest.mark.asyncio
+async def test_ids_expire_after_ttl():
+    dedup = InboundDeduplicator(ttl_seconds=0)
+
+    assert await dedup.seen("a") is False
+    assert await dedup.seen("a") is False
+
+
+@pytest.mark.asyncio
+async def test_mongo_catches_duplicates_from_other_workers():
+    db = MagicMock()
+    db.inbound_messages = AsyncMock()
+    db.inbound_messages.insert_one.side_effect = [None, DuplicateKeyError("E11000")]
+    dedup = InboundDeduplicator(db)
+
+    assert await dedup.seen("a") is False
+    # Seen by another worker: not in this process's memory, but already in Mongo
+    assert await dedup.seen("b") is True
+    assert db.inbound_messages.insert_one.await_args_list[0][0][0]["_id"] == "a"
+
+
+@pytest.mark.asyncio
+async def test_forget_lets_a_redelivery_through():
+    db = MagicMock()
+    db.inbound_messages = AsyncMock()
+    dedup = InboundDeduplicator(db)
+
+    await dedup.seen("a")
+    await dedup.forget("a")
+
+    db.inbound_messages.delete_one.assert_awaited_once_with({"_id": "a"})
+    assert await dedup.seen("a") is False
@@ -0,0 +1,85 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from prometheus_client import REGISTRY
+
+from app import metrics
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.asyncio
+async def test_timed_mongo_records_outcome_by_method():
+    @metrics.timed_mongo
+    async def find_things():
+        return 1
+
+    @metrics.timed_mongo
+    async def break_things():
+        raise RuntimeError("down")
+
+    await find_things()
+    with pytest.raises(RuntimeError):
+        await break_things()
+
+    assert _sample("reminderbot_mongo_operation_seconds_count", method="find_things", outcome="ok") == 1
+    assert _sample("reminderbot_mongo_operation_seconds_count", method="break_things", outcome="error") == 1
+
+
+@pytest.mark.asyncio
+async def test_adapter_requests_are_labelled_with_outermost_method():
+    class Service:
+        @metrics.adapter_method
+        async def send_text(self):
+            metrics.observe_adapter_request("/send/text", "200", 0.01)
+
+        @metrics.adapter_method
+        async def send_reminder_for_test(self):
+            await self.send_text()
+
+    before = _sample("reminderbot_adapter_request_seconds_count", method="send_reminder_for_test", status="200")
+    await Service().send_reminder_for_test()
+    after = _sample("reminderbot_adapter_request_seconds_count", method="send_reminder_for_test", status="200")
+    assert after - before == 1
+
+
+def test_caldav_timer_records_errors():
+    with pytest.raises(ValueError):
+        with metrics.caldav_timer("Test calendar", "search"):
+            raise ValueError("boom")
+    assert _sample("reminderbot_caldav_request_seconds_count",
+                   calendar="Test calendar", operation="search", outcome="error") == 1
+
+
+def test_daily_run_counts_appointments():
+    before = _sample("reminderbot_daily_run_appointments_total", status="processed")
+    metrics.observe_daily_run(1.5, {"processed": 3, "skipped": 1, "failed": 0})
+    assert _sample("reminderbot_daily_run_appointments_total", status="processed") - before == 3
+
+
+@pytest.mark.asyncio
+async def test_process_reply_records_outcome():
+    from app.reply_parser import parse_reply
+    from app.routers.webhook import process_reply
+
+    confirmation_manager = AsyncMock()
+    confirmation_manager.find_pending.return_value = []
+    services = {"config": SimpleNamespace(TIMEZONE="Asia/Jerusalem"),
+                "confirmation_manager": confirmation_manager, "messaging_service": AsyncMock()}
+
+    before = _sample("reminderbot_reply_processing_seconds_count", status="ignored")
+    result = await process_reply(services, "972501234567", parse_reply("כן"))
+    assert result["status"] == "ignored"
+    assert _sample("reminderbot_reply_processing_seconds_count", status="ignored") - before == 1
+
+
+def test_metrics_endpoint():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    response = TestClient(app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "reminderbot_caldav_request_seconds" in response.text
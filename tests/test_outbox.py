@@ -0,0 +1,88 @@
+import asyncio
+import time
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.outbox import DEAD, PENDING, SENT, Outbox, TokenBucket, backoff_delay, is_retryable
+
+
+def _status_error(status):
+    request = httpx.Request("POST", "http://wa-adapter/send/text")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status, request=request))
+
+
+def _outbox(sender, **kwargs):
+    db = MagicMock()
+    db.outbox = AsyncMock()
+    return Outbox(db, sender, **kwargs), db.outbox
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate_after_burst():
+    bucket = TokenBucket(rate=50, burst=2)
+    started = time.monotonic()
+    for _ in range(4):
+        await bucket.acquire()
+
+    # Two tokens are available at once, the next two take 1/50s each
+    assert time.monotonic() - started >= 0.035
+
+
+def test_retryable_errors_and_backoff():
+    assert is_retryable(_status_error(503))
+    assert is_retryable(_status_error(429))
+    assert is_retryable(httpx.ConnectError("refused"))
+    assert not is_retryable(_status_error(400))
+    assert not is_retryable(ValueError("bad"))
+
+    for attempts in range(1, 10):
+        assert 0 <= backoff_delay(attempts, 2.0, 30.0) <= min(30.0, 2.0 * 2 ** (attempts - 1))
+
+
+@pytest.mark.asyncio
+async def test_deliver_marks_sent_and_records_latency():
+    sender = AsyncMock()
+    outbox, collection = _outbox(sender)
+
+    await outbox._deliver({"_id": 1, "to": "972501111111", "text": "hi", "attempts": 0})
+
+    sender.assert_awaited_once_with("972501111111", "hi")
+    update = collection.update_one.await_args[0][1]
+    assert update["$set"]["status"] == SENT
+    assert len(outbox._latencies_ms) == 1
+
+
+@pytest.mark.asyncio
+async def test_retryable_failure_is_rescheduled_then_dead_lettered():
+    sender = AsyncMock(side_effect=_status_error(503))
+    outbox, collection = _outbox(sender, max_attempts=2, base_delay=0.01)
+
+    await outbox._deliver({"_id": 1, "to": "972501111111", "text": "hi", "attempts": 0})
+    first = collection.update_one.await_args[0][1]["$set"]
+    assert first["status"] == PENDING
+    assert first["attempts"] == 1
+    assert "next_attempt_at" in first
+
+    await outbox._deliver({"_id": 1, "to": "972501111111", "text": "hi", "attempts": 1})
+    second = collection.update_one.await_args[0][1]["$set"]
+    assert second["status"] == DEAD
+    assert outbox._stats["retried"] == 1
+    assert outbox._stats["dead"] == 1
+
+
+@pytest.mark.asyncio
+async def test_background_sender_drains_enqueued_messages():
+    sender = AsyncMock()
+    outbox, collection = _outbox(sender, rate=100, poll_interval=0.05)
+    collection.find_one_and_update.side_effect = [
+        {"_id": 1, "to": "972501111111", "text": "a", "attempts": 0},
+        {"_id": 2, "to": "972502222222", "text": "b", "attempts": 0},
+    ] + [None] * 100
+
+    await outbox.start()
+    await outbox.enqueue("972501111111", "a")
+    await asyncio.sleep(0.02)
+    await outbox.stop()
+
+    assert [c.args for c in sender.await_args_list] == [("972501111111", "a"), ("972502222222", "b")]
+    assert outbox._stats["sent"] == 2
@@ -1,7 +1,7 @@
 import pytest
 from unittest.mock import MagicMock, AsyncMock
-from datetime import datetime
-from app.pending_confirmation_manager import PendingConfirmationManager
+from datetime import date, datetime, timedelta, timezone
+from app.pending_confirmation_manager import PendingConfirmationManager, normalize_hhmm
 
 @pytest.mark.asyncio
 async def test_add_confirmation():
@@ -129,3 +129,365 @@ async def test_has_confirmation_false():
 
     mock_collection.find_one.assert_awaited_once_with({"key": "some_key"})
     assert exists is False
+
+
+class _AsyncCursor:
+    """Minimal async cursor stand-in supporting sort() and `async for`."""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def __aiter__(self):
+        self._it = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._it)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def test_normalize_hhmm():
+    assert normalize_hhmm("9:30") == "09:30"
+    assert normalize_hhmm("09:30") == "09:30"
+    assert normalize_hhmm("2025-02-01T10:00:00+02:00") == "10:00"
+    assert normalize_hhmm("") is None
+    assert normalize_hhmm("no time") is None
+
+
+@pytest.mark.asyncio
+async def test_add_confirmation_stores_lookup_fields():
+    mock_db = MagicMock()
+    mock_collection = AsyncMock()
+    mock_db.pending_confirmations = mock_collection
+
+    mock_collection.update_one.return_value = MagicMock(matched_count=0)
+
+    manager = PendingConfirmationManager(mock_db, operator="972500000000")
+    await manager.add_confirmation("972501234567$9:30", {
+        "customer_name": "Dana",
+        "customer_number": "972501234567",
+        "start_time": "9:30",
+    })
+
+    set_operation = mock_collection.update_one.await_args[0][1]["$set"]
+    assert set_operation["time_hhmm"] == "09:30"
+    assert set_operation["operator"] == "972500000000"
+
+
+@pytest.mark.asyncio
+async def test_find_pending_single_projected_query():
+    mock_db = MagicMock()
+    mock_collection = MagicMock()
+    mock_db.pending_confirmations = mock_collection
+    mock_collection.find.return_value = _AsyncCursor([
+        {"key": "a$9:30", "customer_name": "Dana", "appointment_time": "9:30", "time_hhmm": "09:30"},
+        # Legacy row without time_hhmm
+        {"key": "b$11:00", "customer_name": "Avi", "appointment_time": "11:00"},
+    ])
+
+    manager = PendingConfirmationManager(mock_db)
+    docs = await manager.find_pending(operator="972500000000", time_hhmm="9:30")
+
+    query, projection = mock_collection.find.call_args[0]
+    assert query == {"operator": {"$in": ["972500000000", None]}, "time_hhmm": "09:30"}
+    assert projection["_id"] == 0
+    assert [d["time_hhmm"] for d in docs] == ["09:30", "11:00"]
+
+
+@pytest.mark.asyncio
+async def test_find_pending_from_day_leaves_out_earlier_days():
+    """A row left over from yesterday at the same HH:MM must not match today's reply."""
+    from app.confirmation_cache import ConfirmationCache
+
+    rows = [
+        {"key": "972501111111$10:00", "customer_name": "Dana", "customer_number": "972501111111",
+         "appointment_time": "10:00", "time_hhmm": "10:00", "date_bucket": "2025-01-31",
+         "operator": "972500000000", "created_at": datetime.now(timezone.utc)},
+        {"key": "972502222222$10:00", "customer_name": "Avi", "customer_number": "972502222222",
+         "appointment_time": "10:00", "time_hhmm": "10:00", "date_bucket": "2025-02-01",
+         "operator": "972500000000", "created_at": datetime.now(timezone.utc)},
+    ]
+    mock_db = MagicMock()
+    mock_collection = MagicMock()
+    mock_collection.find.side_effect = lambda *args, **kwargs: _AsyncCursor(
+        [d for d in rows if d["date_bucket"] >= "2025-02-01"]
+    )
+    mock_db.pending_confirmations = mock_collection
+
+    manager = PendingConfirmationManager(mock_db)
+    docs = await manager.find_pending(operator="972500000000", time_hhmm="10:00", from_day=date(2025, 2, 1))
+    query = mock_collection.find.call_args[0][0]
+    assert query["$or"] == [{"date_bucket": {"$gte": "2025-02-01"}}, {"date_bucket": None}]
+    assert [d["key"] for d in docs] == ["972502222222$10:00"]
+
+    mock_collection.find.side_effect = lambda *args, **kwargs: _AsyncCursor(list(rows))
+    cached = PendingConfirmationManager(mock_db, cache=ConfirmationCache(ttl_seconds=3600))
+    await cached.warm_cache()
+    docs = await cached.find_pending(operator="972500000000", time_hhmm="10:00", from_day=date(2025, 2, 1))
+    assert [d["key"] for d in docs] == ["972502222222$10:00"]
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_creates_expected_indexes():
+    mock_db = MagicMock()
+    mock_collection = AsyncMock()
+    mock_db.pending_confirmations = mock_collection
+
+    manager = PendingConfirmationManager(mock_db, ttl_seconds=3600)
+    results = await manager.ensure_indexes()
+
+    assert results == {
+        "key_unique": "ok",
+        "customer_appointment_at": "ok",
+        "operator_date_time": "ok",
+        "created_at_ttl": "ok",
+    }
+    created = {call.args[0][0].document["name"]: call.args[0][0].document
+               for call in mock_collection.create_indexes.await_args_list}
+    assert created["key_unique"]["unique"] is True
+    assert created["created_at_ttl"]["expireAfterSeconds"] == 3600
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_updates_changed_ttl():
+    from pymongo.errors import OperationFailure
+
+    mock_db = MagicMock()
+    mock_collection = AsyncMock()
+    mock_collection.name = "pending_confirmations"
+    mock_collection.database = AsyncMock()
+    mock_db.pending_confirmations = mock_collection
+
+    async def create_indexes(models):
+        if models[0].document["name"] == "created_at_ttl":
+            raise OperationFailure("options conflict", code=85)
+    mock_collection.create_indexes.side_effect = create_indexes
+
+    manager = PendingConfirmationManager(mock_db, ttl_seconds=600)
+    results = await manager.ensure_indexes()
+
+    assert results["created_at_ttl"] == "ttl_updated"
+    mock_collection.database.command.assert_awaited_once_with({
+        "collMod": "pending_confirmations",
+        "index": {"name": "created_at_ttl", "expireAfterSeconds": 600},
+    })
+
+
+@pytest.mark.asyncio
+async def test_index_report_flags_in_progress_builds():
+    mock_db = MagicMock()
+    mock_collection = MagicMock()
+    mock_collection.name = "pending_confirmations"
+    mock_collection.database.command = AsyncMock(return_value={"cursor": {"firstBatch": [
+        {"v": 2, "key": {"_id": 1}, "name": "_id_"},
+        {"v": 2, "key": {"key": 1}, "name": "key_unique", "unique": True},
+        {"v": 2, "key": {"created_at": 1}, "name": "created_at_ttl", "expireAfterSeconds": 172800},
+        {"spec": {"v": 2, "key": {"operator": 1, "date_bucket": 1, "time_hhmm": 1}, "name": "operator_date_time"},
+         "buildUUID": "abc"},
+    ]}})
+    mock_db.pending_confirmations = mock_collection
+
+    manager = PendingConfirmationManager(mock_db)
+    report = await manager.index_report()
+
+    assert report["ready"] is False
+    assert report["indexes"]["key_unique"] == {"exists": True, "ready": True, "key": {"key": 1}}
+    assert report["indexes"]["operator_date_time"]["exists"] is True
+    assert report["indexes"]["operator_date_time"]["ready"] is False
+    assert report["indexes"]["customer_appointment_at"]["exists"] is False
+    assert report["indexes"]["created_at_ttl"]["expire_after_seconds"] == 172800
+
+
+@pytest.mark.asyncio
+async def test_claim_confirmation_single_round_trip():
+    mock_db = MagicMock()
+    mock_collection = AsyncMock()
+    mock_db.pending_confirmations = mock_collection
+    mock_collection.find_one_and_delete.side_effect = [
+        {"customer_name": "Dana", "customer_number": "972501111111", "appointment_time": "9:30"},
+        None,
+    ]
+
+    manager = PendingConfirmationManager(mock_db)
+    first = await manager.claim_confirmation("972501111111$9:30")
+    second = await manager.claim_confirmation("972501111111$9:30")
+
+    assert first == {"customer_name": "Dana", "customer_number": "972501111111", "start_time": "9:30",
+                     "start_at": None, "date_bucket": None, "operator": None}
+    assert second is None
+    query = mock_collection.find_one_and_delete.await_args
+    assert query.args[0] == {"key": "972501111111$9:30"}
+    assert query.kwargs["projection"]["_id"] == 0
+    mock_collection.find_one.assert_not_awaited()
+    mock_collection.delete_one.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_claimed_confirmation_can_be_put_back_unchanged():
+    """
+    A claimed confirmation handed back to add_confirmation() keeps its appointment_at and
+    date_bucket, even though MongoDB returns appointment_at as a naive UTC datetime.
+    """
+    mock_db = MagicMock()
+    mock_collection = AsyncMock()
+    mock_collection.update_one.return_value = MagicMock(matched_count=0)
+    mock_db.pending_confirmations = mock_collection
+    # 01:00 on Feb 1st in Israel is still Jan 31st in UTC
+    mock_collection.find_one_and_delete.return_value = {
+        "customer_name": "Dana", "customer_number": "972501111111", "appointment_time": "1:00",
+        "appointment_at": datetime(2025, 1, 31, 23, 0), "date_bucket": "2025-02-01",
+        "operator": "972500000000",
+    }
+
+    manager = PendingConfirmationManager(mock_db)
+    claimed = await manager.claim_confirmation("972501111111$1:00")
+    await manager.add_confirmation("972501111111$1:00", claimed)
+
+    projection = mock_collection.find_one_and_delete.await_args.kwargs["projection"]
+    assert projection["appointment_at"] == projection["date_bucket"] == 1
+    set_operation = mock_collection.update_one.await_args[0][1]["$set"]
+    assert set_operation["appointment_at"] == datetime(2025, 1, 31, 23, 0)
+    assert set_operation["date_bucket"] == "2025-02-01"
+    assert set_operation["time_hhmm"] == "01:00"
+    assert set_operation["operator"] == "972500000000"
+
+
+@pytest.mark.asyncio
+async def test_add_confirmations_bulk_reports_per_key():
+    from pymongo.errors import BulkWriteError
+
+    mock_db = MagicMock()
+    mock_collection = AsyncMock()
+    mock_db.pending_confirmations = mock_collection
+    mock_collection.bulk_write.side_effect = BulkWriteError({
+        "writeErrors": [{"index": 2, "code": 11000, "errmsg": "E11000 duplicate key"}],
+        "upserted": [{"index": 0, "_id": "x"}],
+        "nMatched": 1,
+    })
+
+    manager = PendingConfirmationManager(mock_db)
+    data = {"customer_name": "Dana", "customer_number": "972501111111", "start_time": "9:30"}
+    report = await manager.add_confirmations_bulk({"a": data, "b": data, "c": data})
+
+    operations = mock_collection.bulk_write.await_args[0][0]
+    assert len(operations) == 3
+    assert mock_collection.bulk_write.await_args.kwargs["ordered"] is False
+    assert report["keys"] == {"a": "inserted", "b": "updated", "c": "failed"}
+    assert (report["inserted"], report["updated"], report["failed"]) == (1, 1, 1)
+    assert report["errors"] == {"c": "E11000 duplicate key"}
+
+
+@pytest.mark.asyncio
+async def test_add_confirmation_stores_structured_fields():
+    mock_db = MagicMock()
+    mock_collection = AsyncMock()
+    mock_collection.update_one.return_value = MagicMock(matched_count=0)
+    mock_db.pending_confirmations = mock_collection
+
+    manager = PendingConfirmationManager(mock_db)
+    start_at = datetime(2025, 2, 1, 9, 30, tzinfo=timezone(timedelta(hours=2)))
+    await manager.add_confirmation("972501234567$9:30", {
+        "customer_name": "Dana",
+        "customer_number": "972501234567",
+        "start_time": "9:30",
+        "start_at": start_at,
+    })
+
+    set_operation = mock_collection.update_one.await_args[0][1]["$set"]
+    assert set_operation["appointment_at"] == start_at
+    assert set_operation["date_bucket"] == "2025-02-01"
+    assert set_operation["customer_number"] == "972501234567"
+
+
+@pytest.mark.asyncio
+async def test_migrate_legacy_documents():
+    mock_db = MagicMock()
+    mock_collection = MagicMock()
+    mock_collection.find.return_value = _AsyncCursor([
+        {"_id": 1, "key": "972501111111$2025-02-01T10:00:00", "customer_name": "Dana",
+         "appointment_time": "2025-02-01T10:00:00"},
+        {"_id": 2, "key": "972502222222$9:30", "customer_name": "Avi",
+         "customer_number": "972502222222", "appointment_time": "9:30"},
+    ])
+    mock_collection.bulk_write = AsyncMock(return_value=MagicMock(modified_count=2))
+    mock_db.pending_confirmations = mock_collection
+
+    manager = PendingConfirmationManager(mock_db)
+    migrated = await manager.migrate_legacy_documents()
+
+    assert migrated == 2
+    assert mock_collection.find.call_args[0][0] == {"date_bucket": {"$exists": False}}
+    first, second = [op._doc["$set"] for op in mock_collection.bulk_write.await_args[0][0]]
+    assert first["customer_number"] == "972501111111"
+    assert first["appointment_at"] == datetime(2025, 2, 1, 10, 0)
+    assert first["date_bucket"] == "2025-02-01"
+    assert first["time_hhmm"] == "10:00"
+    assert second["date_bucket"] is None
+    assert second["time_hhmm"] == "09:30"
+
+
+@pytest.mark.asyncio
+async def test_migrate_legacy_documents_nothing_to_do():
+    mock_db = MagicMock()
+    mock_collection = MagicMock()
+    mock_collection.find.return_value = _AsyncCursor([])
+    mock_collection.bulk_write = AsyncMock()
+    mock_db.pending_confirmations = mock_collection
+
+    manager = PendingConfirmationManager(mock_db)
+    assert await manager.migrate_legacy_documents() == 0
+    mock_collection.bulk_write.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_list_keys_for_sender_uses_equality_match():
+    mock_db = MagicMock()
+    mock_collection = MagicMock()
+    mock_collection.find.return_value = _AsyncCursor([{"key": "972501111111$9:30"}])
+    mock_db.pending_confirmations = mock_collection
+
+    manager = PendingConfirmationManager(mock_db)
+    keys = await manager.list_keys_for_sender("972501111111")
+
+    assert keys == ["972501111111$9:30"]
+    assert mock_collection.find.call_args[0][0] == {"customer_number": "972501111111"}
+
+
+@pytest.mark.asyncio
+async def test_cached_find_pending_skips_mongo_and_stays_consistent():
+    from app.confirmation_cache import ConfirmationCache
+
+    mock_db = MagicMock()
+    mock_collection = MagicMock()
+    mock_collection.find.return_value = _AsyncCursor([
+        {"key": "972501111111$9:30", "customer_name": "Dana", "customer_number": "972501111111",
+         "appointment_time": "9:30", "time_hhmm": "09:30", "operator": "972500000000",
+         "created_at": datetime.now(timezone.utc)},
+    ])
+    mock_collection.update_one = AsyncMock(return_value=MagicMock(matched_count=0))
+    mock_collection.find_one_and_delete = AsyncMock(return_value={
+        "customer_name": "Dana", "customer_number": "972501111111", "appointment_time": "9:30",
+    })
+    mock_db.pending_confirmations = mock_collection
+
+    manager = PendingConfirmationManager(mock_db, operator="972500000000",
+                                         cache=ConfirmationCache(ttl_seconds=3600))
+    await manager.warm_cache()
+    mock_collection.find.reset_mock()
+
+    pending = await manager.find_pending(operator="972500000000")
+    assert [d["key"] for d in pending] == ["972501111111$9:30"]
+
+    await manager.add_confirmation("972502222222$14:00", {
+        "customer_name": "Avi", "customer_number": "972502222222", "start_time": "14:00",
+    })
+    await manager.claim_confirmation("972501111111$9:30")
+
+    pending = await manager.find_pending(operator="972500000000")
+    assert [d["key"] for d in pending] == ["972502222222$14:00"]
+    mock_collection.find.assert_not_called()
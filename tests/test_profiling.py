@@ -0,0 +1,134 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.profiling import ProfileStore, ProfilingMiddleware, is_profiling
+
+pytest.importorskip("pyinstrument")
+
+
+def _app(store):
+    app = FastAPI()
+
+    @app.post("/run-check")
+    async def run_check():
+        await asyncio.sleep(0.01)
+        return {"profiling": is_profiling()}
+
+    @app.get("/health")
+    async def health():
+        return {"profiling": is_profiling()}
+
+    app.add_middleware(ProfilingMiddleware, store=store, token="secret")
+    return app
+
+
+async def _request(app, method, url, **kwargs):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.request(method, url, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_request_with_token_is_profiled():
+    store = ProfileStore()
+    response = await _request(_app(store), "POST", "/run-check", headers={"X-Profile": "secret"})
+
+    assert response.json() == {"profiling": True}
+    profile_id = response.headers["x-profile-id"]
+    [profile] = store.list()
+    assert profile["id"] == profile_id
+    assert profile["path"] == "/run-check"
+    assert profile["status"] == 200
+    assert "session" not in profile
+
+    speedscope = json.loads(store.render(profile_id))
+    assert "speedscope" in speedscope["$schema"]
+    assert "<html" in store.render(profile_id, "html").lower()
+
+
+@pytest.mark.asyncio
+async def test_requests_without_token_or_on_other_paths_are_not_profiled():
+    store = ProfileStore()
+    app = _app(store)
+
+    plain = await _request(app, "POST", "/run-check")
+    wrong = await _request(app, "POST", "/run-check?profile=wrong")
+    other = await _request(app, "GET", "/health?profile=secret")
+
+    assert plain.json() == wrong.json() == other.json() == {"profiling": False}
+    assert "x-profile-id" not in plain.headers
+    assert store.list() == []
+
+
+@pytest.mark.asyncio
+async def test_store_keeps_only_recent_profiles():
+    store = ProfileStore(max_profiles=2)
+    app = _app(store)
+    ids = [
+        (await _request(app, "POST", "/run-check?profile=secret")).headers["x-profile-id"]
+        for _ in range(3)
+    ]
+
+    assert [p["id"] for p in store.list()] == ids[:0:-1]
+    assert store.render(ids[0]) is None
+
+
+def test_admin_endpoints_require_token():
+    from types import SimpleNamespace
+    from unittest.mock import patch
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    store = ProfileStore()
+    services = {"config": SimpleNamespace(PROFILING_TOKEN="secret"), "profiles": store}
+    client = TestClient(app)
+    with patch("app.routers.profiles.router.services", services):
+        assert client.get("/admin/profiles").status_code == 401
+        assert client.get("/admin/profiles", headers={"X-Profile": "secret"}).json() == {"profiles": []}
+        assert client.get("/admin/profiles/unknown?profile=secret").status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_profiled_webhook_reply_is_processed_inline():
+    """
+    A profiled /webhook/wa request bypasses the dispatcher queue, so the reply's
+    MongoDB lookup and adapter sends run inside the profiled request.
+    """
+    from unittest.mock import AsyncMock, MagicMock, patch
+
+    from app.routers import webhook
+
+    config = MagicMock()
+    config.WA_SHARED_SECRET = "wa-secret"
+    config.TIMEZONE = "Asia/Jerusalem"
+    confirmation_manager = AsyncMock()
+    confirmation_manager.find_pending.return_value = [
+        {"key": "972501111111$9:30", "customer_name": "Dana", "customer_number": "972501111111",
+         "appointment_time": "9:30", "time_hhmm": "09:30"},
+    ]
+    confirmation_manager.claim_confirmation.return_value = {
+        "customer_name": "Dana", "customer_number": "972501111111", "start_time": "9:30",
+    }
+    dispatcher = MagicMock(running=True)
+    services = {"config": config, "confirmation_manager": confirmation_manager,
+                "messaging_service": AsyncMock(), "webhook_dispatcher": dispatcher}
+
+    store = ProfileStore()
+    app = FastAPI()
+    app.include_router(webhook.router)
+    app.add_middleware(ProfilingMiddleware, store=store, token="secret")
+    body = {"from": "972500000000", "text": "כן"}
+    with patch.object(webhook.router, "services", services):
+        queued = await _request(app, "POST", "/webhook/wa", json=body, headers={"X-Token": "wa-secret"})
+        profiled = await _request(app, "POST", "/webhook/wa", json=body,
+                                  headers={"X-Token": "wa-secret", "X-Profile": "secret"})
+
+    assert queued.json() == {"status": "queued"}
+    dispatcher.submit.assert_called_once()
+    assert profiled.json() == {"status": "reminder_sent", "key": "972501111111$9:30"}
+    services["messaging_service"].send_customer_whatsapp_reminder.assert_awaited_once_with("972501111111", "9:30")
+    assert [p["path"] for p in store.list()] == ["/webhook/wa"]
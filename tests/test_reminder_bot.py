@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 from unittest.mock import AsyncMock, MagicMock
 from app.reminder_bot import ReminderBot
@@ -131,3 +132,237 @@ def test_extract_customer_name_not_enough_parts():
     bot = ReminderBot(None, None, None)
     name = bot._extract_customer_name("טיפול")
     assert name == "Unknown"
+
+
+@pytest.mark.asyncio
+async def test_run_daily_check_bounded_concurrency_and_ordered_results():
+    """
+    Appointments are processed concurrently, never more than max_concurrency at once,
+    and results come back in calendar order with per-status counts.
+    """
+    mock_calendar_service = MagicMock()
+    mock_calendar_service.fetch_tomorrow_appointments = AsyncMock(return_value=[
+        ("טיפול A", "0501111111", "9:00"),
+        ("טיפול B", "no phone here", "10:00"),
+        ("טיפול C", "0502222222", "11:00"),
+        ("טיפול D", "0503333333", "12:00"),
+    ])
+
+    in_flight = 0
+    peak = 0
+
+    async def slow_send(start_time, customer_name):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if customer_name == "C":
+            raise RuntimeError("adapter down")
+
+    mock_messaging_service = MagicMock()
+    mock_messaging_service.send_confirmation_request = AsyncMock(side_effect=slow_send)
+    mock_confirmation_manager = AsyncMock()
+    mock_confirmation_manager.add_confirmations_bulk.side_effect = lambda confirmations: {
+        "keys": {key: "inserted" for key in confirmations}, "errors": {},
+    }
+
+    bot = ReminderBot(mock_calendar_service, mock_messaging_service, mock_confirmation_manager,
+                      max_concurrency=2)
+    summary = await bot.run_daily_check()
+
+    assert peak == 2
+    assert summary["total"] == 4
+    assert summary["processed"] == 2
+    assert summary["skipped"] == 1
+    assert summary["failed"] == 1
+    assert [r["summary"] for r in summary["results"]] == ["טיפול A", "טיפול B", "טיפול C", "טיפול D"]
+    assert [r["status"] for r in summary["results"]] == ["processed", "skipped", "failed", "processed"]
+    assert summary["results"][2]["error"] == "adapter down"
+    assert "total" in summary["timings_ms"]
+
+
+@pytest.mark.asyncio
+async def test_run_daily_check_stores_confirmations_in_one_bulk_write():
+    """
+    All confirmations are written with one add_confirmations_bulk call; appointments
+    whose confirmation failed to store are not messaged.
+    """
+    mock_calendar_service = MagicMock()
+    mock_calendar_service.fetch_tomorrow_appointments = AsyncMock(return_value=[
+        ("טיפול A", "0501111111", "9:00"),
+        ("טיפול B", "0502222222", "10:00"),
+        ("טיפול A", "0501111111", "9:00"),
+    ])
+    mock_messaging_service = AsyncMock()
+    mock_confirmation_manager = AsyncMock()
+    mock_confirmation_manager.add_confirmations_bulk.return_value = {
+        "inserted": 1, "updated": 0, "failed": 1,
+        "keys": {"972501111111$9:00": "inserted", "972502222222$10:00": "failed"},
+        "errors": {"972502222222$10:00": "E11000 duplicate key"},
+    }
+
+    bot = ReminderBot(mock_calendar_service, mock_messaging_service, mock_confirmation_manager)
+    summary = await bot.run_daily_check()
+
+    mock_calendar_service.fetch_tomorrow_appointments.assert_awaited_once_with(with_start=True, strict=True)
+    mock_confirmation_manager.add_confirmations_bulk.assert_awaited_once()
+    stored = mock_confirmation_manager.add_confirmations_bulk.await_args[0][0]
+    assert list(stored) == ["972501111111$9:00", "972502222222$10:00"]
+    mock_confirmation_manager.add_confirmation.assert_not_awaited()
+    mock_messaging_service.send_confirmation_request.assert_awaited_once_with("9:00", "A")
+    assert [r["status"] for r in summary["results"]] == ["processed", "failed", "skipped"]
+    assert summary["results"][1]["error"] == "E11000 duplicate key"
+    assert summary["results"][2]["reason"] == "duplicate appointment"
+
+
+def _run_once_bot(run_store):
+    import datetime
+
+    calendar_service = MagicMock()
+    calendar_service.get_tomorrow_time.return_value = (datetime.datetime(2025, 1, 2),) * 2
+    return ReminderBot(calendar_service, MagicMock(), AsyncMock(), run_store=run_store)
+
+
+@pytest.mark.asyncio
+async def test_run_once_coalesces_concurrent_triggers():
+    from app.daily_runs import DailyRunStore
+
+    bot = _run_once_bot(DailyRunStore())
+    release = asyncio.Event()
+
+    async def run_daily_check(**kwargs):
+        await release.wait()
+        return {"total": 3, "processed": 3, "skipped": 0, "failed": 0}
+
+    bot.run_daily_check = AsyncMock(side_effect=run_daily_check)
+
+    first = asyncio.create_task(bot.run_once())
+    second = asyncio.create_task(bot.run_once())
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(first, second)
+
+    bot.run_daily_check.assert_awaited_once()
+    assert sorted(r["run"] for r in results) == ["executed", "joined"]
+    assert all(r["processed"] == 3 for r in results)
+
+
+@pytest.mark.asyncio
+async def test_run_once_coalesces_triggers_while_the_marker_lookup_is_pending():
+    from app.daily_runs import DailyRunStore
+
+    class SlowStore(DailyRunStore):
+        async def get(self, day):
+            await asyncio.sleep(0)
+            return await super().get(day)
+
+    bot = _run_once_bot(SlowStore())
+    bot.run_daily_check = AsyncMock(return_value={"total": 1, "processed": 1, "skipped": 0, "failed": 0})
+
+    results = await asyncio.gather(bot.run_once(), bot.run_once())
+
+    bot.run_daily_check.assert_awaited_once()
+    assert sorted(r["run"] for r in results) == ["executed", "joined"]
+
+
+@pytest.mark.asyncio
+async def test_run_once_skips_completed_day_unless_forced():
+    from app.daily_runs import DailyRunStore
+
+    bot = _run_once_bot(DailyRunStore())
+    bot.run_daily_check = AsyncMock(return_value={"total": 1, "processed": 1, "skipped": 0, "failed": 0})
+
+    assert (await bot.run_once())["run"] == "executed"
+    skipped = await bot.run_once()
+    assert skipped["run"] == "skipped"
+    assert skipped["date"] == "2025-01-02"
+    assert skipped["processed"] == 1
+    assert bot.run_daily_check.await_count == 1
+
+    assert (await bot.run_once(force=True))["run"] == "executed"
+    assert bot.run_daily_check.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_run_once_does_not_mark_failed_runs():
+    from app.daily_runs import DailyRunStore
+
+    store = DailyRunStore()
+    bot = _run_once_bot(store)
+    bot.run_daily_check = AsyncMock(side_effect=RuntimeError("calendar down"))
+
+    with pytest.raises(RuntimeError):
+        await bot.run_once()
+    assert await store.get("2025-01-02") is None
+
+
+def _calendar_bot(store, fetch):
+    import datetime
+
+    calendar_service = MagicMock()
+    calendar_service.get_tomorrow_time.return_value = (datetime.datetime(2025, 1, 2),) * 2
+    calendar_service.fetch_tomorrow_appointments = AsyncMock(side_effect=fetch)
+    confirmation_manager = AsyncMock()
+    confirmation_manager.add_confirmations_bulk.side_effect = lambda confirmations: {
+        "keys": {key: "inserted" for key in confirmations}, "errors": {},
+    }
+    return ReminderBot(calendar_service, AsyncMock(), confirmation_manager, run_store=store)
+
+
+@pytest.mark.asyncio
+async def test_run_once_unreadable_calendar_is_not_reported_as_empty_day():
+    """
+    When the calendar cannot be read at all, the operator is not told there are no
+    appointments and the day stays open for a retry.
+    """
+    from app.calendar_service import CalendarFetchError
+    from app.daily_runs import DailyRunStore
+
+    store = DailyRunStore()
+    bot = _calendar_bot(store, CalendarFetchError(["calendar discovery failed: 401"], []))
+
+    with pytest.raises(CalendarFetchError):
+        await bot.run_once()
+    bot.messaging_service.send_no_appointments_message.assert_not_awaited()
+    assert await store.get("2025-01-02") is None
+
+
+@pytest.mark.asyncio
+async def test_run_once_partial_fetch_or_failed_sends_are_retried():
+    """A retry of an unfinished day only stores and sends what an earlier run did not send."""
+    from app.calendar_service import CalendarFetchError
+    from app.daily_runs import DailyRunStore
+
+    store = DailyRunStore()
+    dana = ("טיפול Dana", "0501111111", "9:00")
+    avi = ("טיפול Avi", "0502222222", "10:00")
+    bot = _calendar_bot(store, [
+        CalendarFetchError(["calendar Work failed: timeout"], [dana]),
+        [dana, avi],
+        [dana, avi],
+    ])
+    send = bot.messaging_service.send_confirmation_request
+
+    partial = await bot.run_once()
+    assert partial["processed"] == 1
+    assert partial["fetch_errors"] == ["calendar Work failed: timeout"]
+    assert await store.get("2025-01-02") is None
+    assert await store.get_prompted("2025-01-02") == {"972501111111$9:00"}
+
+    send.side_effect = RuntimeError("adapter 503")
+    send.reset_mock()
+    failed = await bot.run_once()
+    assert (failed["run"], failed["processed"], failed["skipped"], failed["failed"]) == ("executed", 0, 1, 1)
+    assert failed["results"][0]["reason"] == "already prompted"
+    send.assert_awaited_once_with("10:00", "Avi")
+    stored = bot.confirmation_manager.add_confirmations_bulk.await_args[0][0]
+    assert list(stored) == ["972502222222$10:00"]
+    assert await store.get("2025-01-02") is None
+
+    send.side_effect = None
+    send.reset_mock()
+    assert (await bot.run_once())["run"] == "executed"
+    send.assert_awaited_once_with("10:00", "Avi")
+    assert (await store.get("2025-01-02"))["processed"] == 1
+    assert (await bot.run_once())["run"] == "skipped"
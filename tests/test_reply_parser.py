@@ -0,0 +1,43 @@
+from app.reply_parser import (
+    NO_CONFIRMATION,
+    YES_CONFIRMATION,
+    build_time_index,
+    match_pending,
+    parse_reply,
+)
+
+
+def test_parse_reply_intent():
+    assert parse_reply("כן").action == YES_CONFIRMATION
+    assert parse_reply("כן.").action == YES_CONFIRMATION
+    assert parse_reply("OK").action == YES_CONFIRMATION
+    assert parse_reply("ביטול").action == NO_CONFIRMATION
+    assert parse_reply("לא בטוח").action is None
+    assert parse_reply("").action is None
+
+
+def test_parse_reply_extracts_all_times():
+    reply = parse_reply("*כן 9:30, 11.00 ו-9:30*")
+
+    assert reply.action is None  # "ו" is not an intent word
+    assert reply.times == ["09:30", "11:00"]
+    assert parse_reply("לא 14:30") == (NO_CONFIRMATION, ["14:30"])
+
+
+def test_parse_reply_ignores_times_inside_longer_numbers():
+    assert parse_reply("כן 110:00").times == []
+    assert parse_reply("כן 10:000").times == []
+    assert parse_reply("כן 24:00").times == []
+
+
+def test_match_pending_uses_time_index():
+    pending = [
+        {"key": "a", "time_hhmm": "09:30"},
+        {"key": "b", "time_hhmm": "10:00"},
+        {"key": "legacy"},
+    ]
+    index = build_time_index(pending)
+
+    assert match_pending(["10:00"], index)["key"] == "b"
+    assert match_pending(["12:00", "09:30"], index)["key"] == "a"
+    assert match_pending(["12:00"], index) is None
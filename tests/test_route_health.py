@@ -9,3 +9,16 @@ def test_health_check():
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
+
+def test_wa_pool_stats():
+    from unittest.mock import patch
+    from app import config
+    from app.whatsapp_messaging_service import WhatsappMessagingService
+
+    # Services are built in the lifespan, which TestClient only runs as a context manager
+    with patch("app.routers.health.router.services", {"messaging_service": WhatsappMessagingService(config)}):
+        response = client.get("/health/wa-pool")
+    assert response.status_code == 200
+    data = response.json()
+    assert "connections_open" in data
+    assert "connections_reused" in data
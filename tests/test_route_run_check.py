@@ -1,5 +1,6 @@
 # tests/test_run_check.py
 
+import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import MagicMock, AsyncMock, patch
 from app.main import app
@@ -9,30 +10,101 @@ client = TestClient(app)
 def test_run_check_success():
     with patch("app.routers.run_check.router.services") as mock_services:
         mock_bot = MagicMock()
-        # Make sure run_daily_check is async so we can await it without error
-        mock_bot.run_daily_check = AsyncMock(return_value=None)
+        # Make sure run_once is async so we can await it without error
+        mock_bot.run_once = AsyncMock(return_value=None)
 
         # Return the mock_bot when the code asks for "bot"
         mock_services.__getitem__.side_effect = lambda key: mock_bot if key == "bot" else None
 
-        response = client.post("/run-check")
+        response = client.post("/run-check?wait=true")
         assert response.status_code == 200
         assert response.json()["status"] == "Check completed successfully"
-        # verify we awaited run_daily_check
-        mock_bot.run_daily_check.assert_awaited_once()
+        # verify we awaited run_once
+        mock_bot.run_once.assert_awaited_once()
 
 def test_run_check_exception():
     with patch("app.routers.run_check.router.services") as mock_services:
         mock_bot = MagicMock()
-        # Force run_daily_check to raise an exception
-        async def raise_exception():
+        # Force run_once to raise an exception
+        async def raise_exception(**kwargs):
             raise ValueError("Some error")
 
-        mock_bot.run_daily_check.side_effect = raise_exception
+        mock_bot.run_once.side_effect = raise_exception
         mock_services.__getitem__.side_effect = lambda key: mock_bot if key == "bot" else None
 
-        response = client.post("/run-check")
+        response = client.post("/run-check?wait=true")
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "error"
         assert "Some error" in data["message"]
+
+
+@pytest.mark.asyncio
+async def test_run_check_starts_background_job_and_reports_status():
+    import httpx
+    from app.job_manager import JobManager
+
+    async def run_once(force=False, progress=None):
+        progress("fetched", {"appointments": 2, "duration_ms": 12.5})
+        return {"total": 2, "processed": 2}
+
+    mock_bot = MagicMock()
+    mock_bot.run_once = AsyncMock(side_effect=run_once)
+    services = {"bot": mock_bot, "jobs": JobManager()}
+
+    # One event loop for the request and the background job
+    transport = httpx.ASGITransport(app=app)
+    with patch("app.routers.run_check.router.services", services):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+            response = await async_client.post("/run-check")
+            assert response.status_code == 202
+            job_id = response.json()["job_id"]
+
+            # The SSE stream ends when the job finishes
+            events = (await async_client.get(f"/run-check/{job_id}/events")).text
+            status = (await async_client.get(f"/run-check/{job_id}")).json()
+
+    assert "event: started" in events
+    assert "event: fetched" in events
+    assert "event: finished" in events
+    assert status["status"] == "succeeded"
+    assert status["result"] == {"total": 2, "processed": 2}
+    assert status["timings_ms"]["fetched"] == 12.5
+
+
+@pytest.mark.asyncio
+async def test_run_check_joins_running_job():
+    import asyncio
+    import httpx
+    from app.job_manager import JobManager
+
+    release = asyncio.Event()
+
+    async def run_once(force=False, progress=None):
+        await release.wait()
+        return {"total": 0}
+
+    mock_bot = MagicMock()
+    mock_bot.run_once = AsyncMock(side_effect=run_once)
+    services = {"bot": mock_bot, "jobs": JobManager()}
+
+    transport = httpx.ASGITransport(app=app)
+    with patch("app.routers.run_check.router.services", services):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+            first = (await async_client.post("/run-check")).json()
+            second = (await async_client.post("/run-check?force=true")).json()
+            release.set()
+            await services["jobs"].get(first["job_id"]).task
+
+    assert second["job_id"] == first["job_id"]
+    assert first["joined"] is False
+    assert second["joined"] is True
+    mock_bot.run_once.assert_awaited_once()
+
+
+def test_run_check_unknown_job():
+    from app.job_manager import JobManager
+
+    with patch("app.routers.run_check.router.services", {"bot": MagicMock(), "jobs": JobManager()}):
+        response = client.get("/run-check/does-not-exist")
+    assert response.status_code == 404
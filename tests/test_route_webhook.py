@@ -1,3 +1,6 @@
+import pytest
+import pytz
+from datetime import datetime
 from fastapi.testclient import TestClient
 from unittest.mock import MagicMock, patch, AsyncMock
 from app.main import app
@@ -103,3 +106,182 @@ def test_handle_webhook_yes_confirmation():
         "2025-02-01T10:00:00", 
         "yes_confirmation"
     )
+
+
+def _wa_services(pending):
+    mock_config = MagicMock()
+    mock_config.WA_SHARED_SECRET = "secret"
+    mock_config.TIMEZONE = "Asia/Jerusalem"
+    mock_confirmation_manager = AsyncMock()
+    mock_confirmation_manager.find_pending.return_value = pending
+    mock_confirmation_manager.claim_confirmation.side_effect = lambda key: next(
+        {"customer_name": d["customer_name"], "customer_number": d["customer_number"],
+         "start_time": d["appointment_time"]}
+        for d in pending if d["key"] == key
+    )
+    return {
+        "config": mock_config,
+        "confirmation_manager": mock_confirmation_manager,
+        "messaging_service": AsyncMock(),
+    }
+
+
+PENDING = [
+    {"key": "972501111111$9:30", "customer_name": "Dana", "customer_number": "972501111111",
+     "appointment_time": "9:30", "time_hhmm": "09:30"},
+    {"key": "972502222222$14:00", "customer_name": "Avi", "customer_number": "972502222222",
+     "appointment_time": "14:00", "time_hhmm": "14:00"},
+]
+
+
+def test_wa_inbound_single_pending_uses_indexed_lookup():
+    services = _wa_services(PENDING[:1])
+    with patch.object(webhook_router, "services", services):
+        response = client.post(
+            "/webhook/wa",
+            json={"from": "972500000000@s.whatsapp.net", "text": "כן"},
+            headers={"X-Token": "secret"},
+        )
+
+    assert response.json() == {"status": "reminder_sent", "key": "972501111111$9:30"}
+    find_kwargs = services["confirmation_manager"].find_pending.await_args.kwargs
+    assert find_kwargs["operator"] == "972500000000"
+    assert find_kwargs["from_day"] == datetime.now(pytz.timezone("Asia/Jerusalem")).date()
+    services["messaging_service"].send_customer_whatsapp_reminder.assert_awaited_once_with("972501111111", "9:30")
+    services["confirmation_manager"].claim_confirmation.assert_awaited_once_with("972501111111$9:30")
+    services["confirmation_manager"].delete_confirmation.assert_not_awaited()
+
+
+def test_wa_inbound_already_claimed_does_not_send():
+    services = _wa_services(PENDING[:1])
+    services["confirmation_manager"].claim_confirmation.side_effect = None
+    services["confirmation_manager"].claim_confirmation.return_value = None
+    with patch.object(webhook_router, "services", services):
+        response = client.post(
+            "/webhook/wa",
+            json={"from": "972500000000", "text": "כן"},
+            headers={"X-Token": "secret"},
+        )
+
+    assert response.json()["status"] == "ignored"
+    assert response.json()["reason"] == "already handled"
+    services["messaging_service"].send_customer_whatsapp_reminder.assert_not_awaited()
+
+
+def test_wa_inbound_multiple_pending_sends_clarification_without_extra_queries():
+    services = _wa_services(PENDING)
+    with patch.object(webhook_router, "services", services):
+        response = client.post(
+            "/webhook/wa",
+            json={"from": "972500000000", "text": "כן"},
+            headers={"X-Token": "secret"},
+        )
+
+    assert response.json()["status"] == "multiple_pending"
+    text = services["messaging_service"].send_acknowledgement.await_args[0][2]
+    assert "09:30 - Dana" in text and "14:00 - Avi" in text
+    services["confirmation_manager"].claim_confirmation.assert_not_awaited()
+
+
+def test_wa_inbound_bad_token():
+    services = _wa_services(PENDING)
+    with patch.object(webhook_router, "services", services):
+        response = client.post("/webhook/wa", json={"from": "1", "text": "כן"}, headers={"X-Token": "nope"})
+    assert response.status_code == 401
+
+
+def test_wa_inbound_matches_mentioned_time():
+    services = _wa_services(PENDING)
+    with patch.object(webhook_router, "services", services):
+        response = client.post(
+            "/webhook/wa",
+            json={"from": "972500000000", "text": "כן 14:00"},
+            headers={"X-Token": "secret"},
+        )
+
+    assert response.json() == {"status": "reminder_sent", "key": "972502222222$14:00"}
+
+
+def test_wa_inbound_time_inside_longer_number_is_not_a_match():
+    services = _wa_services(PENDING)
+    with patch.object(webhook_router, "services", services):
+        response = client.post(
+            "/webhook/wa",
+            json={"from": "972500000000", "text": "כן 114:00"},
+            headers={"X-Token": "secret"},
+        )
+
+    assert response.json()["status"] == "multiple_pending"
+
+
+def test_wa_inbound_queues_reply_when_dispatcher_runs():
+    services = _wa_services(PENDING)
+    dispatcher = MagicMock()
+    dispatcher.running = True
+    dispatcher.submit.return_value = True
+    services["webhook_dispatcher"] = dispatcher
+    with patch.object(webhook_router, "services", services):
+        response = client.post(
+            "/webhook/wa",
+            json={"from": "972500000000@s.whatsapp.net", "text": "כן 9:30"},
+            headers={"X-Token": "secret"},
+        )
+
+    assert response.json() == {"status": "queued"}
+    sender, reply = dispatcher.submit.call_args[0]
+    assert sender == "972500000000"
+    assert reply.times == ["09:30"]
+    services["confirmation_manager"].find_pending.assert_not_awaited()
+
+
+def test_wa_inbound_full_queue_returns_429():
+    services = _wa_services(PENDING)
+    dispatcher = MagicMock()
+    dispatcher.running = True
+    dispatcher.submit.return_value = False
+    services["webhook_dispatcher"] = dispatcher
+    with patch.object(webhook_router, "services", services):
+        response = client.post(
+            "/webhook/wa",
+            json={"from": "972500000000", "text": "כן"},
+            headers={"X-Token": "secret"},
+        )
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1"
+
+
+def test_wa_inbound_duplicate_message_is_dropped_before_lookup():
+    from app.inbound_dedup import InboundDeduplicator
+
+    services = _wa_services(PENDING[:1])
+    services["inbound_dedup"] = InboundDeduplicator()
+    with patch.object(webhook_router, "services", services):
+        body = {"id": "3EB0C767D097B7", "from": "972500000000", "text": "כן"}
+        first = client.post("/webhook/wa", json=body, headers={"X-Token": "secret"})
+        second = client.post("/webhook/wa", json=body, headers={"X-Token": "secret"})
+
+    assert first.json()["status"] == "reminder_sent"
+    assert second.json() == {"status": "duplicate", "id": "3EB0C767D097B7"}
+    services["confirmation_manager"].find_pending.assert_awaited_once()
+    services["messaging_service"].send_customer_whatsapp_reminder.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_failed_reminder_puts_the_claimed_confirmation_back():
+    from app.reply_parser import parse_reply
+    from app.routers.webhook import process_reply
+
+    claimed = {"customer_name": "Dana", "customer_number": "972501111111", "start_time": "9:30",
+               "start_at": datetime(2025, 2, 1, 7, 30), "date_bucket": "2025-02-01",
+               "operator": "972500000000"}
+    services = _wa_services(PENDING[:1])
+    services["confirmation_manager"].claim_confirmation.side_effect = None
+    services["confirmation_manager"].claim_confirmation.return_value = claimed
+    services["messaging_service"].send_customer_whatsapp_reminder.side_effect = RuntimeError("adapter 503")
+
+    with pytest.raises(RuntimeError):
+        await process_reply(services, "972500000000", parse_reply("כן"))
+
+    services["confirmation_manager"].add_confirmation.assert_awaited_once_with("972501111111$9:30", claimed)
+    services["messaging_service"].send_acknowledgement.assert_not_awaited()
@@ -0,0 +1,70 @@
+import datetime
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.scheduler import DailyScheduler, parse_hhmm
+
+SUMMARY = {"total": 1, "processed": 1, "skipped": 0, "failed": 0, "timings_ms": {"total": 1.0}, "results": []}
+
+
+def _calendar(tomorrow=datetime.datetime(2025, 1, 2)):
+    calendar_service = MagicMock()
+    calendar_service.get_tomorrow_time.return_value = (tomorrow, tomorrow)
+    calendar_service.fetch_tomorrow_appointments = AsyncMock(return_value=[("טיפול A", "0501111111", "9:00")])
+    return calendar_service
+
+
+def test_parse_hhmm():
+    assert parse_hhmm("20:00") == (20, 0)
+    assert parse_hhmm(" 7:05") == (7, 5)
+    with pytest.raises(ValueError):
+        parse_hhmm("25:00")
+
+
+@pytest.mark.asyncio
+async def test_run_uses_prefetched_appointments():
+    calendar_service = _calendar()
+    bot = MagicMock()
+    bot.run_once = AsyncMock(return_value=SUMMARY)
+    scheduler = DailyScheduler(bot, calendar_service, "Asia/Jerusalem")
+
+    await scheduler.prefetch()
+    await scheduler.run_daily_check()
+
+    calendar_service.fetch_tomorrow_appointments.assert_awaited_once_with(with_start=True, strict=True)
+    bot.run_once.assert_awaited_once_with(appointments=[("טיפול A", "0501111111", "9:00")])
+    assert scheduler.last_prefetch["appointments"] == 1
+    assert scheduler.last_run["prefetched"] is True
+    assert scheduler.last_run["processed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_run_fetches_itself_when_prefetch_is_for_another_day():
+    calendar_service = _calendar()
+    bot = MagicMock()
+    bot.run_once = AsyncMock(return_value=SUMMARY)
+    scheduler = DailyScheduler(bot, calendar_service, "Asia/Jerusalem")
+
+    await scheduler.prefetch()
+    calendar_service.get_tomorrow_time.return_value = (datetime.datetime(2025, 1, 3),) * 2
+    await scheduler.run_daily_check()
+
+    bot.run_once.assert_awaited_once_with(appointments=None)
+    assert scheduler.last_run["prefetched"] is False
+
+
+@pytest.mark.asyncio
+async def test_status_reports_next_runs():
+    bot = MagicMock()
+    bot.run_once = AsyncMock(return_value=SUMMARY)
+    scheduler = DailyScheduler(bot, _calendar(), "Asia/Jerusalem", send_time="20:05", prefetch_minutes=10)
+
+    scheduler.start()
+    try:
+        status = scheduler.status()
+    finally:
+        scheduler.shutdown()
+
+    assert status["running"] is True
+    assert "T19:55:00" in status["next_prefetch"]
+    assert "T20:05:00" in status["next_run"]
+    assert status["last_run"] is None
@@ -0,0 +1,98 @@
+import asyncio
+import subprocess
+import sys
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.startup import StartupReport, warmup_steps
+
+
+@pytest.mark.asyncio
+async def test_warm_up_runs_steps_concurrently_and_records_failures():
+    started = {"a": asyncio.Event(), "b": asyncio.Event()}
+
+    def overlapping(name, other):
+        # Only finishes if the other step started meanwhile, i.e. the steps overlap
+        async def step():
+            started[name].set()
+            await asyncio.wait_for(started[other].wait(), timeout=1)
+            return 3
+        return step
+
+    async def broken():
+        raise RuntimeError("mongo down")
+
+    report = StartupReport()
+    await report.warm_up({"a": overlapping("a", "b"), "b": overlapping("b", "a"), "broken": broken})
+
+    assert report.warmup["a"] == {"status": "ok", "result": 3, "duration_ms": report.warmup["a"]["duration_ms"]}
+    assert report.warmup["b"]["status"] == "ok"
+    assert report.warmup["broken"]["status"] == "error"
+    assert report.warmup["broken"]["error"] == "mongo down"
+
+
+def _services(caldav_warmup=False):
+    config = MagicMock(CALDAV_WARMUP=caldav_warmup, STARTUP_BACKGROUND_WARMUP=False)
+    return {
+        "config": config,
+        "confirmation_manager": AsyncMock(),
+        "daily_runs": AsyncMock(),
+        "inbound_dedup": AsyncMock(),
+        "outbox": None,
+        "calendar_service": MagicMock(warm_up=AsyncMock(return_value=2)),
+        "messaging_service": AsyncMock(),
+        "webhook_dispatcher": MagicMock(stop=AsyncMock()),
+        "scheduler": None,
+        "jobs": AsyncMock(),
+    }
+
+
+def test_caldav_warm_up_is_optional():
+    assert "caldav" not in warmup_steps(_services())
+    assert "caldav" in warmup_steps(_services(caldav_warmup=True))
+
+
+@pytest.mark.asyncio
+async def test_lifespan_builds_services_and_reports_startup():
+    from app import main
+
+    built = _services()
+    with patch("app.initialization.initialize_services", return_value=built), \
+         patch.dict(main.services, clear=True):
+        async with main.lifespan(main.app):
+            assert main.services["confirmation_manager"] is built["confirmation_manager"]
+            report = main.services["startup"].to_dict()
+        built["messaging_service"].aclose.assert_awaited_once()
+
+    assert set(report["stages_ms"]) == {"build_services", "start", "warmup"}
+    assert report["ready_ms"] is not None
+    assert report["warmup"]["pending_confirmations_indexes"]["status"] == "ok"
+    built["confirmation_manager"].migrate_legacy_documents.assert_awaited_once()
+    built["confirmation_manager"].warm_cache.assert_awaited_once()
+    built["webhook_dispatcher"].start.assert_called_once()
+
+
+def test_importing_the_app_does_not_load_caldav_or_build_services():
+    code = (
+        "import sys\n"
+        "import app.main\n"
+        "assert 'caldav' not in sys.modules, 'caldav imported'\n"
+        "assert 'motor.motor_asyncio' not in sys.modules, 'motor imported'\n"
+        "assert app.main.services == {}\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+
+
+@pytest.mark.parametrize("web_concurrency, cached", [(1, True), (2, False)])
+def test_pending_cache_is_only_used_with_a_single_worker(web_concurrency, cached):
+    from app import config
+    from app.initialization import initialize_services
+
+    with patch.object(config, "MONGO_URI", "mongodb://localhost:27017/reminders"), \
+         patch.object(config, "PENDING_CACHE", True), \
+         patch.object(config, "WEB_CONCURRENCY", web_concurrency):
+        services = initialize_services()
+
+    assert (services["confirmation_manager"].cache is not None) == cached
@@ -0,0 +1,68 @@
+import asyncio
+import pytest
+from app.webhook_dispatcher import WebhookDispatcher
+
+
+@pytest.mark.asyncio
+async def test_messages_of_one_sender_keep_order_and_senders_run_in_parallel():
+    handled = []
+    in_flight = 0
+    peak = 0
+
+    async def handler(sender, item):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        handled.append((sender, item))
+
+    dispatcher = WebhookDispatcher(handler, workers=4, queue_size=10)
+    dispatcher.start()
+    senders = ["972501111111", "972502222222", "972503333333", "972504444444"]
+    for i in range(3):
+        for sender in senders:
+            assert dispatcher.submit(sender, i)
+    await dispatcher.stop()
+
+    for sender in senders:
+        assert [item for s, item in handled if s == sender] == [0, 1, 2]
+    assert len(handled) == 12
+    assert dispatcher.stats["processed"] == 12
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_and_failures_do_not_stop_workers():
+    release = asyncio.Event()
+
+    async def handler(sender, item):
+        await release.wait()
+        if item == "bad":
+            raise RuntimeError("boom")
+
+    dispatcher = WebhookDispatcher(handler, workers=1, queue_size=1)
+    dispatcher.start()
+    assert dispatcher.submit("a", "bad")
+    await asyncio.sleep(0)  # worker takes the first message
+    assert dispatcher.submit("a", "ok")
+    assert not dispatcher.submit("a", "overflow")
+    assert dispatcher.stats["rejected"] == 1
+
+    release.set()
+    await dispatcher.stop()
+    assert dispatcher.stats["failed"] == 1
+    assert dispatcher.stats["processed"] == 1
+    assert not dispatcher.running
+
+
+@pytest.mark.asyncio
+async def test_stop_cancels_after_drain_timeout():
+    async def handler(sender, item):
+        await asyncio.sleep(10)
+
+    dispatcher = WebhookDispatcher(handler, workers=1, queue_size=5)
+    dispatcher.start()
+    dispatcher.submit("a", 1)
+    await dispatcher.stop(timeout=0.01)
+
+    assert not dispatcher.running
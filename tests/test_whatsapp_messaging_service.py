@@ -1,4 +1,5 @@
 import pytest
+import httpx
 from unittest.mock import patch, MagicMock
 from app.whatsapp_messaging_service import WhatsappMessagingService
 
@@ -109,3 +110,109 @@ def test_test_method(mock_post, whatsapp_service):
     _, kwargs = mock_post.call_args
     assert kwargs["json"]["to"] == "972527332808"
     assert kwargs["json"]["text"]["body"] == "This is a test message."
+
+
+class PooledConfig:
+    MY_PHONE_NUMBER = "972501234567"
+    REMINDER_BODY = "Reminder! Your appointment is at {start_time}."
+    WA_ADAPTER_URL = "http://wa-adapter:3001"
+    WA_SHARED_SECRET = "secret"
+    WA_HTTP_MAX_CONNECTIONS = 3
+    WA_HTTP_MAX_KEEPALIVE = 2
+
+
+def _recording_transport(calls):
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"ok": True})
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.asyncio
+async def test_pooled_client_reused_across_sends():
+    """
+    All sends should go through one shared client instead of a client per message.
+    """
+    calls = []
+    service = WhatsappMessagingService(PooledConfig(), transport=_recording_transport(calls))
+    await service.start()
+    client = service._client
+
+    await service.send_customer_whatsapp_reminder("0501234567", "10:00")
+    await service.send_no_appointments_message()
+
+    assert service._client is client
+    assert len(calls) == 2
+    assert calls[0].headers["X-Token"] == "secret"
+    assert calls[0].url == "http://wa-adapter:3001/send/text"
+    assert service.pool_stats()["requests"] == 2
+
+    await service.aclose()
+    assert service._client is None
+    assert client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_reports_limits():
+    service = WhatsappMessagingService(PooledConfig(), transport=_recording_transport([]))
+    stats = service.pool_stats()
+    assert stats["client_open"] is False
+    assert stats["max_connections"] == 3
+    assert stats["max_keepalive_connections"] == 2
+    assert stats["connections_open"] == 0
+
+
+def test_http2_falls_back_without_h2(monkeypatch):
+    """
+    Enabling HTTP/2 without the optional h2 package should not break startup.
+    """
+    import builtins
+    real_import = builtins.__import__
+
+    def fake_import(name, *args, **kwargs):
+        if name == "h2":
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", fake_import)
+
+    class Http2Config(PooledConfig):
+        WA_HTTP2 = True
+
+    service = WhatsappMessagingService(Http2Config())
+    assert service.http2 is False
+
+
+@pytest.mark.asyncio
+async def test_sends_go_through_outbox_when_attached():
+    from unittest.mock import AsyncMock
+
+    service = WhatsappMessagingService(PooledConfig())
+    service.outbox = AsyncMock()
+    service._post = AsyncMock()
+
+    await service.send_confirmation_request("15:00", "Dana")
+
+    service.outbox.enqueue.assert_awaited_once()
+    to, text = service.outbox.enqueue.await_args[0]
+    assert to == "972501234567"
+    assert "15:00" in text
+    service._post.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_customer_reminder_bypasses_the_outbox():
+    """The operator's ack and the put-back on failure depend on the reminder's actual delivery."""
+    from unittest.mock import AsyncMock
+
+    service = WhatsappMessagingService(PooledConfig())
+    service.outbox = AsyncMock()
+    service._post = AsyncMock(side_effect=RuntimeError("adapter 503"))
+
+    with pytest.raises(RuntimeError):
+        await service.send_customer_whatsapp_reminder("+972-50-1234567", "15:00")
+
+    service.outbox.enqueue.assert_not_awaited()
+    path, body = service._post.await_args[0]
+    assert path == "/send/text"
+    assert body["to"] == "972501234567" and "15:00" in body["text"]
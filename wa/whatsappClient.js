@@ -55,6 +55,7 @@ async function startBaileys() {
       if (!msg || msg.key.fromMe) return;
       
       let payload = {
+        id: msg.key.id,
         from: msg.key.remoteJid,
         timestamp: Number(msg.messageTimestamp || Date.now())
       };
@@ -72,14 +73,22 @@ async function startBaileys() {
 
       console.log("Forwarding message to Python webhook:", payload);
 
-      try {
-        await fetch(pyWebhook, {
-          method: "POST",
-          headers: { "Content-Type": "application/json", "X-Token": shared },
-          body: JSON.stringify(payload)
-        });
-      } catch (e) {
-        console.error("Failed to call Python webhook", e);
+      // The backend answers 429 when its queue is full; retry a few times
+      for (let attempt = 1; attempt <= 3; attempt++) {
+        try {
+          const res = await fetch(pyWebhook, {
+            method: "POST",
+            headers: { "Content-Type": "application/json", "X-Token": shared },
+            body: JSON.stringify(payload)
+          });
+          if (res.status !== 429) break;
+          const retryAfter = Number(res.headers.get("retry-after")) || attempt;
+          console.warn(`Python webhook busy, retrying in ${retryAfter}s`);
+          await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000));
+        } catch (e) {
+          console.error("Failed to call Python webhook", e);
+          break;
+        }
       }
     });
   }